@@ -0,0 +1,256 @@
+# ai_engine/balancer.py
+"""Spread completions over several llama.cpp servers.
+
+Each endpoint has its own slots (see _SlotPool), a circuit breaker and
+a window of recent time-to-first-token samples. A request goes to the
+endpoint holding its affinity key if that has a free slot, else to the
+one with the fewest outstanding requests per slot (or the lowest
+latency, with ``balance = "latency"``). Endpoints that fail
+``failures`` times in a row are ejected and probed on ``/health`` in
+the background until they answer again.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Union
+from urllib.parse import urljoin
+
+import requests
+
+BALANCE_MODES = ("least-outstanding", "latency")
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 10  # no hedging until an endpoint has this many latency samples
+EWMA_ALPHA = 0.2
+MAX_COOLDOWN = 60.0
+
+class EndpointsUnavailable(Exception):
+    """Every endpoint is ejected by its circuit breaker."""
+
+class _SlotPool:
+    """Hands out server slot ids, preferring the slot that last served the same affinity key.
+
+    A slot keeps the KV cache of its last prompt, so sending a file's
+    chunks to the slot that already holds that file's prefix skips
+    re-evaluating it. When that slot is busy another free one is used
+    rather than waiting: parallelism matters more than a cache hit.
+    """
+
+    MAX_KEYS = 1024
+
+    def __init__(self, slots: int):
+        self._cond = threading.Condition()
+        self._free = list(range(slots))  # least recently released first
+        self._last = OrderedDict()  # affinity key -> slot
+
+    @property
+    def free(self) -> int:
+        return len(self._free)
+
+    def holds(self, key) -> bool:
+        """Whether the slot that last served ``key`` is free now."""
+        with self._cond:
+            return key is not None and self._last.get(key) in self._free
+
+    def try_acquire(self, key=None) -> Optional[int]:
+        with self._cond:
+            if not self._free:
+                return None
+            preferred = self._last.get(key) if key is not None else None
+            slot = preferred if preferred in self._free else self._free[0]
+            self._free.remove(slot)
+            if key is not None:
+                self._last[key] = slot
+                self._last.move_to_end(key)
+                while len(self._last) > self.MAX_KEYS:
+                    self._last.popitem(last=False)
+            return slot
+
+    def acquire(self, key=None) -> int:
+        with self._cond:
+            while not self._free:
+                self._cond.wait()
+            return self.try_acquire(key)
+
+    def release(self, slot: int):
+        with self._cond:
+            self._free.append(slot)
+            self._cond.notify()
+
+class CircuitBreaker:
+    """closed -> open after ``failures`` consecutive errors -> half-open once a probe succeeds.
+
+    A half-open endpoint takes traffic again; its next result closes the
+    breaker or re-opens it with twice the cooldown.
+    """
+
+    def __init__(self, failures: int = 3, cooldown: float = 5.0):
+        self.threshold = max(1, failures)
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.state != "open"
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+            self.cooldown = self.base_cooldown
+
+    def failure(self) -> bool:
+        """Record an error; True if this opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open":
+                self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+            elif self.state == "open" or self.failures < self.threshold:
+                return False
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            return True
+
+    def probe_result(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.state = "half-open"
+            else:
+                self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+
+class Endpoint:
+    def __init__(self, url: str, slots: int, breaker: CircuitBreaker):
+        self.url = url
+        self.slots = max(1, int(slots))
+        self.pool = _SlotPool(self.slots)
+        self.breaker = breaker
+        self.pin_slots = True
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.ewma = None
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.url!r}, slots={self.slots}, {self.breaker.state})"
+
+    def sibling(self, name: str) -> str:
+        # The URL points at .../completion; other endpoints share its base
+        return urljoin(self.url, name)
+
+    @property
+    def outstanding(self) -> int:
+        return self.slots - self.pool.free
+
+    def record_latency(self, seconds: float):
+        self.samples.append(seconds)
+        self.ewma = seconds if self.ewma is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def parse_endpoints(endpoints: list, remote_url: str, slots: int) -> list[tuple[str, int]]:
+    """(url, slots) pairs from ``[ai] endpoints`` (URLs or ``{url, slots}`` tables), else remote_url."""
+    parsed = []
+    for entry in endpoints or []:
+        if isinstance(entry, str):
+            parsed.append((entry, slots))
+        elif isinstance(entry, dict) and entry.get("url"):
+            parsed.append((entry["url"], int(entry.get("slots", slots))))
+    return parsed or [(remote_url, slots)]
+
+class Balancer:
+    def __init__(self, endpoints: list[tuple[str, int]], balance: str = "least-outstanding",
+                 failures: int = 3, cooldown: float = 5.0, probe_timeout: float = 2.0):
+        self.endpoints = [Endpoint(url, slots, CircuitBreaker(failures, cooldown)) for url, slots in endpoints]
+        self.balance = balance if balance in BALANCE_MODES else BALANCE_MODES[0]
+        self.probe_timeout = probe_timeout
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @property
+    def slots(self) -> int:
+        return sum(e.slots for e in self.endpoints)
+
+    def healthy(self, exclude=()) -> list[Endpoint]:
+        return [e for e in self.endpoints if e.breaker.available and e not in exclude]
+
+    def _rank(self, endpoint: Endpoint) -> tuple:
+        load = endpoint.outstanding / endpoint.slots
+        # Unmeasured endpoints rank as fastest, so each gets tried
+        latency = endpoint.ewma or 0.0
+        return (latency, load) if self.balance == "latency" else (load, latency)
+
+    def _pick(self, key, exclude) -> Optional[tuple[Endpoint, int]]:
+        candidates = [e for e in self.healthy(exclude) if e.pool.free]
+        if not candidates:
+            return None
+        endpoint = next((e for e in candidates if e.pool.holds(key)), None) or min(candidates, key=self._rank)
+        return endpoint, endpoint.pool.try_acquire(key)
+
+    def acquire(self, key=None, exclude=(), wait: bool = True) -> Optional[tuple[Endpoint, int]]:
+        """(endpoint, slot) to send a request to; None if ``wait`` is False and nothing is free.
+
+        Raises EndpointsUnavailable if every endpoint (outside ``exclude``) is ejected.
+        """
+        with self._cond:
+            while True:
+                if not self.healthy(exclude):
+                    raise EndpointsUnavailable(
+                        "no healthy model endpoint: " + ", ".join(f"{e.url} ({e.breaker.state})" for e in self.endpoints))
+                picked = self._pick(key, exclude)
+                if picked is not None or not wait:
+                    return picked
+                # Time out now and then: a breaker may have closed without a release to wake us
+                self._cond.wait(0.5)
+
+    def release(self, endpoint: Endpoint, slot: int):
+        with self._cond:
+            endpoint.pool.release(slot)
+            self._cond.notify_all()
+
+    def success(self, endpoint: Endpoint, ttft: Optional[float]):
+        if ttft is not None:
+            endpoint.record_latency(ttft)
+        endpoint.breaker.success()
+
+    def failure(self, endpoint: Endpoint, error: Union[str, Exception]):
+        if endpoint.breaker.failure():
+            print(f"[WARN] Model endpoint {endpoint.url} ejected after {endpoint.breaker.failures} "
+                  f"failures ({error}); probing again in {endpoint.breaker.cooldown:.0f}s.", file=sys.stderr)
+            self._schedule_probe(endpoint)
+
+    def _schedule_probe(self, endpoint: Endpoint):
+        if self._closed:
+            return
+        timer = threading.Timer(endpoint.breaker.cooldown, self._probe, args=(endpoint,))
+        timer.daemon = True
+        timer.start()
+
+    def _probe(self, endpoint: Endpoint):
+        try:
+            # llama.cpp answers 503 while loading a model; a 404 from a server without /health still means it is up
+            ok = requests.get(endpoint.sibling("health"), timeout=self.probe_timeout).status_code < 500
+        except requests.RequestException:
+            ok = False
+        endpoint.breaker.probe_result(ok)
+        if ok:
+            print(f"[INFO] Model endpoint {endpoint.url} is answering again.", file=sys.stderr)
+            with self._cond:
+                self._cond.notify_all()
+        else:
+            self._schedule_probe(endpoint)
+
+    def hedge_delay(self, endpoint: Endpoint, percentile: float, floor: float) -> Optional[float]:
+        """How long to wait for a first token before hedging, or None if hedging is off or premature."""
+        if percentile <= 0 or len(self.endpoints) < 2:
+            return None
+        delay = endpoint.percentile(percentile)
+        return None if delay is None else max(delay, floor)
+
+    def close(self):
+        self._closed = True
@@ -0,0 +1,137 @@
+# ai_engine/cache.py
+"""Content-addressed, size-capped response cache for model completions."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from project_assistant.config import get_config
+from project_assistant.utils import state_dir
+
+DEFAULT_MAX_MB = 64
+
+def make_key(content: str, task: str, model: str, temperature: float, n_predict: int) -> str:
+    """Cache key: the content hash plus everything that changes the model's answer."""
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    material = json.dumps([content_hash, task, model, float(temperature), int(n_predict)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """SQLite-backed cache with least-recently-used eviction past ``max_bytes``."""
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+
+    def _count(self, name: str):
+        self._db.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock, self._db:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self._count("misses")
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            self._count("hits")
+            return row[0]
+
+    def put(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+        }
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM counters")
+
+    def close(self):
+        self._db.close()
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_cache(config_path: Optional[str] = None) -> Optional[ResponseCache]:
+    """Return the process-wide cache, or None when [cache] enabled = false."""
+    global _default_cache
+    settings = get_config(config_path).cache
+    if not settings.enabled:
+        return None
+    max_bytes = int(settings.max_mb * 1024 * 1024)
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(state_dir() / "cache" / "responses.sqlite3", max_bytes)
+        _default_cache.max_bytes = max_bytes
+        return _default_cache
+
+def cmd_cache(args) -> int:
+    cache = get_cache()
+    if cache is None:
+        print("[WARN] Response cache is disabled in config.project.toml.")
+        return 0
+    if args.action == "clear":
+        cache.clear()
+        print("[INFO] Response cache cleared.")
+    else:
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / lookups * 100 if lookups else 0.0
+        print(f"Entries: {stats['entries']} ({stats['bytes'] / 1024:.1f} KiB of {stats['max_bytes'] / 1024 / 1024:.0f} MiB)")
+        print(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {ratio:.1f}%")
+    return 0
@@ -0,0 +1,441 @@
+# ai_engine/client.py
+"""Pooled, concurrency-bounded client for one or more llama.cpp completion servers."""
+import itertools
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional, Sequence, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ai_engine.balancer import Balancer, Endpoint, EndpointsUnavailable, parse_endpoints
+from project_assistant.config import AISettings, get_config
+from project_assistant.tracing import span
+
+DEFAULT_N_CTX = 2048
+CONNECT_TIMEOUT = 3.0
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for when the server cannot tokenize for us (~3 chars per token for code)."""
+    return len(text) // 3 + 1
+
+# Stream statistics copied onto the request's trace span
+TRACE_STATS = ("endpoint", "slot", "queued", "ttft", "tokens", "prompt_tokens", "cached_tokens", "hedged")
+
+@dataclass
+class CompletionResult:
+    """Outcome of one completion request, with per-request timing."""
+    content: str = ""
+    tokens: int = 0
+    elapsed: float = 0.0
+    queued: float = 0.0
+    error: Optional[str] = None
+    timings: dict = field(default_factory=dict)
+    prompt_tokens: int = 0  # prompt tokens the server had to evaluate
+    prompt_ms: float = 0.0
+    cached_tokens: int = 0  # prompt tokens reused from the slot's KV cache
+    slot: Optional[int] = None
+    endpoint: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """The completion, or the error string callers have always received."""
+        if self.error:
+            return f"[ERROR] Failed to query model: {self.error}"
+        return self.content
+
+def iter_sse_events(lines):
+    """Decode llama.cpp server-sent event lines into JSON payloads."""
+    for raw in lines:
+        if not raw:
+            continue
+        line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        yield json.loads(data)
+
+def prompt_stats(event: dict) -> dict:
+    """prompt_tokens, prompt_ms and cached_tokens from a final llama.cpp event."""
+    timings = event.get("timings") or {}
+    return {
+        "prompt_tokens": int(timings.get("prompt_n", 0)),
+        "prompt_ms": float(timings.get("prompt_ms", 0.0)),
+        # Older servers report tokens_cached on the event, newer ones cache_n in timings
+        "cached_tokens": int(event.get("tokens_cached", timings.get("cache_n", 0))),
+    }
+
+class _Attempt:
+    """One request to one endpoint. open() reads up to the first event, so attempts can race."""
+
+    def __init__(self, client: "LlamaClient", endpoint: Endpoint, slot: int, prompt: str, max_tokens: int):
+        self.client = client
+        self.endpoint = endpoint
+        self.slot = slot
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.response = None
+        self.events = None
+        self.ttft = None
+        self.cancelled = False
+        self._released = False
+        self._lock = threading.Lock()
+
+    def open(self) -> Optional[dict]:
+        started = time.perf_counter()
+        self.response = self.client._post(self.endpoint, self.slot, self.prompt, self.max_tokens)
+        self.response.raise_for_status()
+        # chunk_size=None hands over each chunk of the chunked response as it arrives
+        self.events = iter_sse_events(self.response.iter_lines(chunk_size=None))
+        first = next(self.events, None)
+        self.ttft = time.perf_counter() - started
+        return first
+
+    def race(self, results: queue.Queue):
+        try:
+            results.put((self, self.open(), None))
+        except Exception as e:
+            results.put((self, None, e))
+        if self.cancelled:
+            self.close()
+
+    def cancel(self):
+        self.cancelled = True
+        self.close()
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.client.balancer.release(self.endpoint, self.slot)
+
+def _client_error(error: Exception) -> bool:
+    """A 4xx is about the request, not the endpoint: no failover, no breaker."""
+    response = getattr(error, "response", None)
+    return response is not None and 400 <= response.status_code < 500
+
+class LlamaClient:
+    """Keeps a keep-alive connection pool and caps in-flight requests at ``slots`` per endpoint.
+
+    ``slots`` should match each server's parallel slot count (``--parallel``);
+    more concurrent requests than that would only queue on the server.
+    Requests carry ``cache_prompt`` and, with ``pin_slots``, an explicit
+    ``id_slot`` chosen by affinity (see _SlotPool).
+
+    With several ``endpoints`` a Balancer picks one per request. A request
+    that fails before its first token moves on to another endpoint, and
+    one still waiting for its first token after the ``hedge_percentile``
+    of that endpoint's recent first-token latencies is also sent to a
+    second endpoint; whichever answers first is used.
+    """
+
+    def __init__(self, remote_url: str, temperature: float = 0.8, slots: int = 1, timeout: float = 60,
+                 model: Optional[str] = None, n_ctx: Optional[int] = None, max_n_predict: Optional[int] = None,
+                 cache_prompt: bool = True, pin_slots: bool = True, endpoints: Optional[list] = None,
+                 balance: str = "least-outstanding", hedge_percentile: float = 95, hedge_min_delay: float = 0.25,
+                 breaker_failures: int = 3, breaker_cooldown: float = 5.0):
+        self.balancer = Balancer(parse_endpoints(endpoints, remote_url, max(1, int(slots))), balance,
+                                 breaker_failures, breaker_cooldown)
+        self.remote_url = self.balancer.endpoints[0].url
+        self.model = model
+        self.n_ctx = n_ctx
+        self.max_n_predict = max_n_predict
+        self._can_tokenize = True
+        self.temperature = temperature
+        self.slots = self.balancer.slots
+        self.timeout = timeout
+        self.session = requests.Session()
+        per_host = max(e.slots for e in self.balancer.endpoints) * 2  # room for hedged duplicates
+        adapter = HTTPAdapter(pool_connections=len(self.balancer.endpoints), pool_maxsize=per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache_prompt = cache_prompt
+        self.pin_slots = pin_slots
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._active = 0  # calls running or queued on the executor
+        self._retired = self._closed = False
+
+    @classmethod
+    def from_settings(cls, ai: AISettings) -> "LlamaClient":
+        return cls(ai.remote_url, temperature=ai.temperature, slots=ai.slots, timeout=ai.timeout,
+                   model=ai.model, n_ctx=ai.n_ctx, max_n_predict=ai.max_n_predict,
+                   cache_prompt=ai.cache_prompt, pin_slots=ai.pin_slots, endpoints=ai.endpoints,
+                   balance=ai.balance, hedge_percentile=ai.hedge_percentile, hedge_min_delay=ai.hedge_min_delay,
+                   breaker_failures=ai.breaker_failures, breaker_cooldown=ai.breaker_cooldown)
+
+    @classmethod
+    def from_config(cls, config_path: Optional[str] = None) -> "LlamaClient":
+        return cls.from_settings(get_config(config_path).ai)
+
+    def _endpoint(self, name: str) -> str:
+        endpoint = (self.balancer.healthy() or self.balancer.endpoints)[0]
+        return endpoint.sibling(name)
+
+    def context_size(self) -> int:
+        """Per-slot context window, from the server's /props, else [ai] n_ctx."""
+        if self.n_ctx is None:
+            try:
+                response = self.session.get(self._endpoint("props"), timeout=self.timeout)
+                response.raise_for_status()
+                self.n_ctx = int(response.json()["default_generation_settings"]["n_ctx"])
+            except Exception:
+                self.n_ctx = DEFAULT_N_CTX
+        return self.n_ctx
+
+    def _tokenize(self, text: str) -> int:
+        if self._can_tokenize:
+            try:
+                response = self.session.post(self._endpoint("tokenize"), json={"content": text},
+                                             timeout=self.timeout)
+                response.raise_for_status()
+                return len(response.json()["tokens"])
+            except Exception:
+                # Older servers or proxies without /tokenize: stop asking
+                self._can_tokenize = False
+        return estimate_tokens(text)
+
+    def count_tokens(self, texts: Sequence[str]) -> list[int]:
+        """Token counts from the server's /tokenize endpoint, estimated if it is unavailable."""
+        if len(texts) <= 1:
+            return [self._tokenize(t) for t in texts]
+        with ThreadPoolExecutor(max_workers=self.slots) as pool:
+            return list(pool.map(self._tokenize, texts))
+
+    def _payload(self, prompt: str, max_tokens: int, slot: Optional[int] = None) -> dict:
+        payload = {
+            "prompt": prompt,
+            "n_predict": max_tokens,
+            "temperature": self.temperature,
+            "stream": True,
+            "cache_prompt": self.cache_prompt,
+        }
+        if slot is not None and self.pin_slots:
+            payload["id_slot"] = slot
+        return payload
+
+    def _post(self, endpoint: Endpoint, slot: int, prompt: str, max_tokens: int):
+        payload = self._payload(prompt, max_tokens, slot if endpoint.pin_slots else None)
+        # A dead host should fail in seconds, not after the full read timeout
+        timeout = (min(CONNECT_TIMEOUT, self.timeout), self.timeout)
+        response = self.session.post(endpoint.url, json=payload, timeout=timeout, stream=True)
+        if "id_slot" in payload and 400 <= response.status_code < 500:
+            # The server has fewer slots than [ai] slots says; let it choose from now on
+            print(f"[WARN] {endpoint.url} rejected id_slot {slot}; disabling slot pinning for it.",
+                  file=sys.stderr)
+            response.close()
+            endpoint.pin_slots = False
+            response = self.session.post(endpoint.url, json=self._payload(prompt, max_tokens),
+                                         timeout=timeout, stream=True)
+        return response
+
+    def _failed(self, attempt: _Attempt, error: Exception):
+        attempt.close()
+        if not _client_error(error):
+            self.balancer.failure(attempt.endpoint, error)
+
+    def _first_event(self, primary: _Attempt, affinity, tried: list, stats: dict) -> tuple[_Attempt, Optional[dict]]:
+        """Open ``primary``, hedging to another endpoint if its first token is late; (winner, first event)."""
+        delay = self.balancer.hedge_delay(primary.endpoint, self.hedge_percentile, self.hedge_min_delay)
+        if delay is None:
+            try:
+                return primary, primary.open()
+            except Exception as e:
+                self._failed(primary, e)
+                raise
+        results = queue.Queue()
+        running = [primary]
+        threading.Thread(target=primary.race, args=(results,), daemon=True).start()
+        try:
+            message = results.get(timeout=delay)
+        except queue.Empty:
+            try:
+                picked = self.balancer.acquire(affinity, exclude=tried, wait=False)
+            except EndpointsUnavailable:
+                picked = None
+            if picked is not None:
+                hedge = _Attempt(self, *picked, primary.prompt, primary.max_tokens)
+                tried.append(hedge.endpoint)
+                running.append(hedge)
+                stats["hedged"] = True
+                threading.Thread(target=hedge.race, args=(results,), daemon=True).start()
+            message = results.get()
+        while True:
+            attempt, first, error = message
+            running.remove(attempt)
+            if error is None:
+                for loser in running:
+                    loser.cancel()
+                return attempt, first
+            self._failed(attempt, error)
+            if not running:
+                raise error
+            message = results.get()
+
+    def complete(self, prompt: str, max_tokens: int = 200, affinity=None) -> CompletionResult:
+        """Blocking completion over the stream. Errors are reported on the result, not raised."""
+        result = CompletionResult()
+        stats = {}
+        try:
+            result.content = "".join(self.stream(prompt, max_tokens, stats=stats, affinity=affinity)).strip()
+        except Exception as e:
+            result.error = str(e)
+        result.tokens = stats.get("tokens", 0)
+        result.elapsed = stats.get("elapsed", 0.0)
+        result.queued = stats.get("queued", 0.0)
+        result.timings = stats.get("timings", {})
+        result.prompt_tokens = stats.get("prompt_tokens", 0)
+        result.prompt_ms = stats.get("prompt_ms", 0.0)
+        result.cached_tokens = stats.get("cached_tokens", 0)
+        result.slot = stats.get("slot")
+        result.endpoint = stats.get("endpoint")
+        return result
+
+    def stream(self, prompt: str, max_tokens: int = 200, stats: dict = None, affinity=None) -> Iterator[str]:
+        """Yield completion text chunks as the server produces them.
+
+        If ``stats`` is given it is filled with ``ttft`` (seconds to the first
+        token), ``tokens``, ``elapsed`` and ``queued`` (time spent waiting for
+        a free slot) once the stream is exhausted, plus the server's
+        ``timings`` and, from them, ``prompt_tokens``, ``prompt_ms`` and
+        ``cached_tokens``; ``endpoint``, ``slot`` and ``hedged`` say where
+        the answer came from. Requests with the same ``affinity`` key (e.g. a
+        file path) go to the same endpoint and slot when it is free.
+        """
+        if stats is None:
+            stats = {}
+        self._enter()
+        try:
+            with span("llama.completion", cat="http", max_tokens=max_tokens) as trace:
+                try:
+                    yield from self._stream(prompt, max_tokens, stats, affinity)
+                finally:
+                    trace.set(**{key: stats.get(key) for key in TRACE_STATS})
+        finally:
+            self._leave()
+
+    def _stream(self, prompt: str, max_tokens: int, stats: dict, affinity) -> Iterator[str]:
+        stats.update(ttft=None, tokens=0, elapsed=0.0, queued=0.0, hedged=False)
+        waited = time.perf_counter()
+        tried = []
+        attempt = first = None
+        start = None
+        while attempt is None:
+            endpoint, slot = self.balancer.acquire(affinity, exclude=tried)
+            if start is None:
+                start = time.perf_counter()
+                stats["queued"] = start - waited
+            tried.append(endpoint)
+            try:
+                attempt, first = self._first_event(_Attempt(self, endpoint, slot, prompt, max_tokens),
+                                                   affinity, tried, stats)
+            except Exception as e:
+                # Nothing was yielded yet, so another endpoint can still take the request
+                if _client_error(e) or not self.balancer.healthy(tried):
+                    stats["elapsed"] = time.perf_counter() - start
+                    raise
+        stats["endpoint"] = attempt.endpoint.url
+        stats["slot"] = attempt.slot
+        try:
+            for event in itertools.chain([first] if first is not None else [], attempt.events):
+                content = event.get("content", "")
+                if content:
+                    if stats["ttft"] is None:
+                        stats["ttft"] = time.perf_counter() - start
+                    stats["tokens"] += 1
+                    yield content
+                if event.get("stop"):
+                    # The final event carries the server's own token count
+                    stats["tokens"] = event.get("tokens_predicted", stats["tokens"])
+                    stats["timings"] = event.get("timings", {})
+                    stats.update(prompt_stats(event))
+                    break
+            self.balancer.success(attempt.endpoint, attempt.ttft)
+        except Exception as e:
+            if not _client_error(e):
+                self.balancer.failure(attempt.endpoint, e)
+            raise
+        finally:
+            stats["elapsed"] = time.perf_counter() - start
+            attempt.close()
+
+    def submit(self, prompt: str, max_tokens: int = 200, affinity=None) -> Future:
+        """Schedule a completion on the client's worker pool."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="llama")
+            self._active += 1
+            future = self._executor.submit(self.complete, prompt, max_tokens, affinity)
+        future.add_done_callback(lambda _: self._leave())
+        return future
+
+    def map(self, prompts: Iterable[str], max_tokens: Union[int, Sequence[int]] = 200) -> list[CompletionResult]:
+        """Run many prompts concurrently and return their results in input order.
+
+        ``max_tokens`` may be a single value or one value per prompt.
+        """
+        prompts = list(prompts)
+        if isinstance(max_tokens, int):
+            max_tokens = [max_tokens] * len(prompts)
+        futures = [self.submit(p, n) for p, n in zip(prompts, max_tokens)]
+        return [f.result() for f in futures]
+
+    def _enter(self):
+        with self._executor_lock:
+            self._active += 1
+
+    def _leave(self):
+        with self._executor_lock:
+            self._active -= 1
+            idle = self._retired and not self._active and not self._closed
+        if idle:
+            self.close()
+
+    def retire(self):
+        """Close the client once the calls already running or queued on it have finished."""
+        with self._executor_lock:
+            self._retired = True
+            idle = not self._active and not self._closed
+        if idle:
+            self.close()
+
+    def close(self):
+        with self._executor_lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.balancer.close()
+        self.session.close()
+
+_default_client = None
+_default_settings = None
+_default_lock = threading.Lock()
+
+def get_client() -> LlamaClient:
+    """Return the process-wide client, rebuilt if [ai] changed since it was created.
+
+    Calls already running keep the client they started with; it is closed
+    once they have finished.
+    """
+    global _default_client, _default_settings
+    ai = get_config().ai
+    with _default_lock:
+        if _default_client is None or ai != _default_settings:
+            if _default_client is not None:
+                _default_client.retire()
+            _default_client = LlamaClient.from_settings(ai)
+            _default_settings = ai
+        return _default_client
@@ -1,22 +1,13 @@
-import requests
-import toml
+from ai_engine.client import get_client
+from project_assistant.tracing import traced
 
-# Load config values from the project config file
-def load_config():
-    config = toml.load("config.project.toml")
-    return config["ai"]["remote_url"], config["ai"].get("temperature", 0.8)
+def stream_llama(prompt: str, max_tokens: int = 200, stats: dict = None):
+    """Yield completion text chunks as the server produces them (see LlamaClient.stream)."""
+    yield from get_client().stream(prompt, max_tokens, stats=stats)
 
+@traced(cat="http")
 def query_llama(prompt: str, max_tokens: int = 200):
-    remote_url, temperature = load_config()
-    payload = {
-        "prompt": prompt,
-        "n_predict": max_tokens,
-        "temperature": temperature
-    }
-
     try:
-        response = requests.post(remote_url, json=payload, timeout=60)
-        response.raise_for_status()
-        return response.json().get("content", "").strip()
+        return get_client().complete(prompt, max_tokens).text
     except Exception as e:
         return f"[ERROR] Failed to query model: {e}"
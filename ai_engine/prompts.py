@@ -0,0 +1,44 @@
+# ai_engine/prompts.py
+"""Prompt layout that keeps the llama.cpp server's KV cache warm.
+
+With ``cache_prompt`` the server only evaluates what follows the longest
+prefix a slot already holds. So every prompt is laid out from most to
+least shared: the same SYSTEM_PREFIX for every request, then the task,
+then the file, its outline and related code from other files, and the
+chunk's own lines last. Chunks of one file sent to the same slot pay
+only for their code.
+"""
+from typing import Optional
+
+# Bump when the layout or wording changes, so cached answers to old prompts are not reused
+PROMPT_VERSION = 2
+
+SYSTEM_PREFIX = (
+    "You are an experienced software engineer reviewing source code. "
+    "Give concrete, actionable suggestions, and show corrected code where it helps. "
+    "Keep the original behaviour unless asked otherwise.\n\n"
+)
+
+def task_instruction(task: str, language: str) -> str:
+    return f"{task.capitalize()} the following {language} code."
+
+def build_prompt(content: str, task: str, language: str = "Python",
+                 lines: Optional[tuple[int, int]] = None, file_name: Optional[str] = None,
+                 context: Optional[str] = None, notes: Optional[str] = None, related: Optional[str] = None) -> str:
+    """``context`` (e.g. the file's outline) and ``related`` (code from other files) are shared by every chunk, so they go before it.
+
+    ``notes`` are about this chunk alone (e.g. what static analysis flagged), so they follow its line range.
+    """
+    parts = [SYSTEM_PREFIX, task_instruction(task, language), "\n"]
+    if file_name:
+        parts.append(f"File: {file_name}\n")
+    if context:
+        parts.append(f"Outline of the file:\n{context}\n")
+    if related:
+        parts.append(f"Related code elsewhere in the project, for reference only:\n{related}\n")
+    if lines:
+        parts.append(f"It is lines {lines[0]}-{lines[1]} of a larger file; answer for this part only.\n")
+    if notes:
+        parts.append(f"Static analysis flagged: {notes}.\n")
+    parts.append(f"\n{content}")
+    return "".join(parts)
@@ -0,0 +1,59 @@
+# benchmarks/compare.py
+"""Compare two benchmark reports from benchmarks/run.py.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.1
+
+A metric regresses when its median grew by more than ``threshold``
+(relative) and by more than MIN_DELTA seconds, so a few milliseconds of
+noise on a fast command do not fail the comparison. Exits 1 on any
+regression.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+MIN_DELTA = 0.005
+
+def load_report(path) -> dict:
+    report = json.loads(Path(path).read_text(encoding="utf-8"))
+    if "results" not in report:
+        raise SystemExit(f"[ERROR] {path} is not a benchmark report.")
+    return report
+
+def compare(old: dict, new: dict, threshold: float = 0.10) -> list[dict]:
+    rows = []
+    for name, after in new["results"].items():
+        before = old["results"].get(name)
+        if before is None:
+            continue
+        delta = after["median"] - before["median"]
+        ratio = after["median"] / before["median"] if before["median"] else float("inf")
+        rows.append({"name": name, "before": before["median"], "after": after["median"], "ratio": ratio,
+                     "regression": ratio > 1 + threshold and delta > MIN_DELTA,
+                     "improvement": ratio < 1 - threshold and -delta > MIN_DELTA})
+    return rows
+
+def print_comparison(rows: list[dict], out=sys.stdout):
+    width = max((len(row["name"]) for row in rows), default=10)
+    for row in rows:
+        mark = "REGRESSION" if row["regression"] else "improved" if row["improvement"] else ""
+        print(f"{row['name']:<{width}}  {row['before'] * 1000:>9.1f}ms -> {row['after'] * 1000:>9.1f}ms  "
+              f"({(row['ratio'] - 1) * 100:+6.1f}%)  {mark}", file=out)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown counted as a regression.")
+    args = parser.parse_args(argv)
+    old, new = load_report(args.before), load_report(args.after)
+    if old.get("params") != new.get("params"):
+        print("[WARN] The reports were taken with different parameters; timings may not be comparable.",
+              file=sys.stderr)
+    rows = compare(old, new, args.threshold)
+    print_comparison(rows)
+    return 1 if any(row["regression"] for row in rows) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
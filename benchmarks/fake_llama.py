@@ -0,0 +1,198 @@
+# benchmarks/fake_llama.py
+"""A stand-in llama.cpp server for offline benchmarks.
+
+Serves /completion (streamed as server-sent events, or one JSON body),
+/tokenize, /props and /health. Latency is synthetic but shaped like the
+real thing: the first token waits ``prompt_ms`` per prompt token not
+already in the slot's KV cache (with ``cache_prompt``), then tokens
+follow every ``token_ms``. Requests for the same slot queue behind each
+other, as on a server started with ``--parallel N``.
+
+    python -m benchmarks.fake_llama --port 8799 --slots 4 --token-ms 5
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+
+@dataclass
+class Latency:
+    base_ms: float = 5.0      # fixed time to first token
+    prompt_ms: float = 0.05   # per uncached prompt token
+    token_ms: float = 2.0     # per generated token
+    tokens: int = 32          # generated tokens (capped by n_predict)
+    jitter: float = 0.0       # +- fraction applied to every delay
+
+    def scaled(self, ms: float) -> float:
+        if self.jitter:
+            ms *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(ms, 0.0) / 1000
+
+def _common_prefix(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, obj, status: int = 200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n" % len(data) + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.endswith("/props"):
+            return self._json({"default_generation_settings": {"n_ctx": self.server.n_ctx},
+                               "total_slots": self.server.slots})
+        if self.path.endswith("/health"):
+            return self._json({"status": "ok"})
+        self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/tokenize"):
+            return self._json({"tokens": list(range(len(request.get("content", "")) // CHARS_PER_TOKEN + 1))})
+        if not self.path.endswith("/completion"):
+            return self._json({"error": "not found"}, 404)
+        self.server.count()
+        slot = request.get("id_slot", -1)
+        if slot >= self.server.slots:
+            return self._json({"error": f"invalid slot id {slot}"}, 400)
+        latency = self.server.latency
+        with self.server.take_slot(slot) as slot:
+            prompt = request.get("prompt", "")
+            cached = 0
+            if request.get("cache_prompt"):
+                cached = _common_prefix(self.server.kv[slot], prompt) // CHARS_PER_TOKEN
+            total = len(prompt) // CHARS_PER_TOKEN + 1
+            evaluated = total - cached
+            started = time.perf_counter()
+            time.sleep(latency.scaled(latency.base_ms + evaluated * latency.prompt_ms))
+            self.server.kv[slot] = prompt
+            prompt_ms = (time.perf_counter() - started) * 1000
+            n_predict = int(request.get("n_predict", -1))
+            n = max(1, latency.tokens if n_predict < 0 else min(latency.tokens, n_predict))
+            words = [f"tok{i} " for i in range(n)]
+            final = {"content": "", "stop": True, "tokens_predicted": n, "tokens_evaluated": total,
+                     "tokens_cached": cached, "id_slot": slot,
+                     "timings": {"prompt_n": evaluated, "prompt_ms": prompt_ms, "cache_n": cached,
+                                 "predicted_n": n, "predicted_ms": n * latency.token_ms}}
+            if not request.get("stream"):
+                time.sleep(latency.scaled(n * latency.token_ms))
+                return self._json(dict(final, content="".join(words)))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(latency.scaled(latency.token_ms))
+                    self._chunk(b"data: " + json.dumps({"content": word, "stop": False}).encode() + b"\n\n")
+                self._chunk(b"data: " + json.dumps(final).encode() + b"\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client hung up (a hedged request that lost, or a cancel)
+
+class _Slot:
+    def __init__(self, server, slot: int):
+        self.server, self.slot = server, slot
+
+    def __enter__(self) -> int:
+        return self.slot
+
+    def __exit__(self, *exc):
+        self.server.release_slot(self.slot)
+
+class FakeLlamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, slots: int = 4, n_ctx: int = 4096, latency: Latency = None,
+                 host: str = "127.0.0.1"):
+        super().__init__((host, port), _Handler)
+        self.slots = max(1, slots)
+        self.n_ctx = n_ctx
+        self.latency = latency or Latency()
+        self.kv = [""] * self.slots
+        self.requests = 0
+        self._cond = threading.Condition()
+        self._free = list(range(self.slots))
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/completion"
+
+    def count(self):
+        with self._cond:
+            self.requests += 1
+
+    def take_slot(self, slot: int) -> _Slot:
+        """The requested slot once it is idle, or any idle one for ``slot`` < 0."""
+        with self._cond:
+            while not (self._free if slot < 0 else slot in self._free):
+                self._cond.wait()
+            slot = self._free[0] if slot < 0 else slot
+            self._free.remove(slot)
+        return _Slot(self, slot)
+
+    def release_slot(self, slot: int):
+        with self._cond:
+            self._free.append(slot)
+            self._cond.notify_all()
+
+    def handle_error(self, request, client_address):
+        pass
+
+    def start(self) -> "FakeLlamaServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fake llama.cpp server for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--n-ctx", type=int, default=4096)
+    parser.add_argument("--base-ms", type=float, default=Latency.base_ms, help="Fixed time to first token.")
+    parser.add_argument("--prompt-ms", type=float, default=Latency.prompt_ms, help="Per uncached prompt token.")
+    parser.add_argument("--token-ms", type=float, default=Latency.token_ms, help="Per generated token.")
+    parser.add_argument("--tokens", type=int, default=Latency.tokens, help="Tokens generated per request.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +- fraction on every delay.")
+    args = parser.parse_args(argv)
+    latency = Latency(args.base_ms, args.prompt_ms, args.token_ms, args.tokens, args.jitter)
+    server = FakeLlamaServer(args.port, args.slots, args.n_ctx, latency, args.host)
+    print(f"[INFO] Fake llama.cpp server on {server.url} ({server.slots} slots)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,343 @@
+# benchmarks/run.py
+"""Time the CLI on a synthetic project against a fake model server; write the results as JSON.
+
+Everything runs offline: the project comes from benchmarks/workspace.py,
+the model from benchmarks/fake_llama.py, and each measurement is a fresh
+``python main.py ...`` process, as a user would run it.
+
+    python -m benchmarks.run --services 2000 --out before.json
+    python -m benchmarks.run --services 2000 --compare before.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.fake_llama import FakeLlamaServer, Latency
+from benchmarks.workspace import HTTP_SERVICE, REPO_ROOT, build_project, python_module, write_http_service
+
+RESULTS_VERSION = 1
+MAIN = REPO_ROOT / "main.py"
+WATCH_SERVICE = "bench-watch"
+
+class BenchmarkError(Exception):
+    pass
+
+class Context:
+    def __init__(self, root: Path, server: FakeLlamaServer, repeat: int, args):
+        self.root = root
+        self.server = server
+        self.repeat = repeat
+        self.args = args
+        # Keep the caller's LOCALDEV_* settings out of the measurements
+        self.env = {k: v for k, v in os.environ.items() if not k.startswith("LOCALDEV_")}
+        self.env["PYTHONUNBUFFERED"] = "1"
+
+    def cli(self, *argv) -> list[str]:
+        return [sys.executable, str(MAIN), *argv]
+
+    def run(self, argv: list[str], ok=(0,)) -> float:
+        """Seconds one command takes; raises BenchmarkError if it exits with a code outside ``ok``."""
+        started = time.perf_counter()
+        proc = subprocess.run(argv, cwd=self.root, env=self.env, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, text=True)
+        elapsed = time.perf_counter() - started
+        if proc.returncode not in ok:
+            tail = "\n".join(proc.stderr.strip().splitlines()[-5:])
+            raise BenchmarkError(f"{' '.join(argv[2:])} exited with {proc.returncode}: {tail}")
+        return elapsed
+
+    def clear_state(self, *names: str):
+        for name in names:
+            path = self.root / ".localdev" / name
+            if path.is_dir():
+                shutil.rmtree(path)
+            elif path.exists():
+                path.unlink()
+
+def bench_cold_start(ctx: Context) -> dict:
+    return {
+        "python": [ctx.run([sys.executable, "-c", "pass"]) for _ in range(ctx.repeat)],
+        "version": [ctx.run(ctx.cli("--version")) for _ in range(ctx.repeat)],
+        "help": [ctx.run(ctx.cli("check", "--help")) for _ in range(ctx.repeat)],
+    }
+
+def bench_serve(ctx: Context) -> dict:
+    """Warm `check` and `cache stats` forwarded to a running `serve` daemon (compare with bench_check)."""
+    if not hasattr(socket, "send_fds"):
+        raise BenchmarkError("skipped: serve needs Unix descriptor passing")
+    server = subprocess.Popen(ctx.cli("serve"), cwd=ctx.root, env=ctx.env, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, text=True)
+    try:
+        if "Listening" not in server.stdout.readline():
+            raise BenchmarkError("serve daemon did not start")
+        ctx.run(ctx.cli("check", "--json"), ok=(0, 1))
+        return {
+            "check_warm": [ctx.run(ctx.cli("check", "--json"), ok=(0, 1)) for _ in range(ctx.repeat)],
+            "cache_stats": [ctx.run(ctx.cli("cache", "stats")) for _ in range(ctx.repeat)],
+        }
+    finally:
+        # --stop rather than a signal, so the socket is removed and later benchmarks run in-process
+        subprocess.run(ctx.cli("serve", "--stop"), cwd=ctx.root, env=ctx.env, capture_output=True)
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+        server.stdout.close()
+
+def bench_check(ctx: Context) -> dict:
+    cold = []
+    for _ in range(ctx.repeat):
+        ctx.clear_state("check_cache.json")
+        cold.append(ctx.run(ctx.cli("check", "--json"), ok=(0, 1)))
+    return {
+        "cold": cold,
+        "warm": [ctx.run(ctx.cli("check", "--json"), ok=(0, 1)) for _ in range(ctx.repeat)],
+        "changed_only": [ctx.run(ctx.cli("check", "--changed-only"), ok=(0, 1)) for _ in range(ctx.repeat)],
+    }
+
+def bench_lint(ctx: Context) -> dict:
+    if not (shutil.which("ruff") or shutil.which("flake8")):
+        raise BenchmarkError("skipped: neither ruff nor flake8 is installed")
+    argv = ctx.cli("lint", "--all", "--format", "json")
+    cold = []
+    for _ in range(ctx.repeat):
+        ctx.clear_state("lint_cache.json")
+        cold.append(ctx.run(argv, ok=(0, 1, 2)))
+    return {"cold": cold, "warm": [ctx.run(argv, ok=(0, 1, 2)) for _ in range(ctx.repeat)]}
+
+def bench_suggest(ctx: Context) -> dict:
+    import random
+    rng = random.Random(1)
+    target = ctx.root / "suggest"
+    big = target / "single" / "large_module.py"
+    big.parent.mkdir(parents=True, exist_ok=True)
+    big.write_text(python_module(rng, 60), encoding="utf-8")
+    batch = target / "batch"
+    batch.mkdir(exist_ok=True)
+    for i in range(ctx.args.suggest_files):
+        (batch / f"module_{i}.py").write_text(python_module(rng, 8), encoding="utf-8")
+    before = ctx.server.requests
+    single = [ctx.run(ctx.cli("suggest", str(big), "--no-cache")) for _ in range(ctx.repeat)]
+    batch_times = [ctx.run(ctx.cli("suggest", str(batch), "--no-cache", "--out", os.devnull))
+                   for _ in range(ctx.repeat)]
+    if ctx.server.requests == before:
+        raise BenchmarkError("suggest never reached the fake model server")
+    return {"single": single, "batch": batch_times,
+            "batch_per_file": [t / ctx.args.suggest_files for t in batch_times]}
+
+def bench_init(ctx: Context) -> dict:
+    count = ctx.args.init_count
+    batch = []
+    for i in range(ctx.repeat):
+        batch.append(ctx.run(ctx.cli("init", f"bench-init-{i}", "--count", str(count), "--port", "40000",
+                                     "--offline")))
+    return {"batch": batch, "per_service": [t / count for t in batch]}
+
+def _get(port: int, timeout: float = 0.2):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=timeout) as response:
+            pid, version = response.read().decode().split()
+            return int(pid), int(version)
+    except (OSError, ValueError, http.client.HTTPException):
+        # Not up yet, or the old process went away mid-reply
+        return None
+
+def _poll(port: int, done, deadline: float):
+    while time.perf_counter() < deadline:
+        reply = _get(port)
+        if reply is not None and done(reply):
+            return reply
+        time.sleep(0.005)
+    return None
+
+def _start_group(argv, ctx: Context) -> subprocess.Popen:
+    # A group of its own, so stopping `run` takes the service with it and never signals us
+    if os.name == "nt":
+        return subprocess.Popen(argv, cwd=ctx.root, env=ctx.env, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+    return subprocess.Popen(argv, cwd=ctx.root, env=ctx.env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+
+def _stop_group(proc: subprocess.Popen):
+    if os.name == "nt":
+        proc.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        os.killpg(proc.pid, signal.SIGINT)
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        if os.name == "nt":
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+def _watch_latency(ctx: Context, port: int, zero_downtime: bool) -> list[float]:
+    """Seconds from saving the service's code to the new version answering on its port."""
+    main_py = write_http_service(ctx.root, WATCH_SERVICE, port, version=0)
+    argv = ctx.cli("run", WATCH_SERVICE, "--watch", *(["--zero-downtime"] if zero_downtime else []))
+    proc = _start_group(argv, ctx)
+    try:
+        if _poll(port, lambda reply: reply[1] == 0, time.perf_counter() + 30) is None:
+            raise BenchmarkError(f"{WATCH_SERVICE} never came up on port {port}")
+        # Let the observer settle before the first edit
+        time.sleep(0.5)
+        samples = []
+        for version in range(1, ctx.repeat + 1):
+            started = time.perf_counter()
+            main_py.write_text(HTTP_SERVICE.format(version=version, port=port), encoding="utf-8")
+            if _poll(port, lambda reply, v=version: reply[1] == v, started + 30) is None:
+                raise BenchmarkError(f"version {version} of {WATCH_SERVICE} never answered")
+            samples.append(time.perf_counter() - started)
+            time.sleep(0.2)
+        return samples
+    finally:
+        _stop_group(proc)
+        main_py.unlink(missing_ok=True)
+
+def bench_watch(ctx: Context) -> dict:
+    try:
+        import watchdog  # noqa: F401
+    except ImportError:
+        raise BenchmarkError("skipped: run --watch needs watchdog")
+    port = ctx.args.watch_port
+    return {"stop_start": _watch_latency(ctx, port, False),
+            "zero_downtime": _watch_latency(ctx, port, True)}
+
+# Run in this order; init goes last because it adds services to the workspace
+BENCHMARKS = {
+    "cold_start": bench_cold_start,
+    "check": bench_check,
+    "serve": bench_serve,
+    "lint": bench_lint,
+    "suggest": bench_suggest,
+    "watch": bench_watch,
+    "init": bench_init,
+}
+
+def summarize(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "unit": "s",
+        "n": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+        "samples": samples,
+    }
+
+def git_revision() -> dict:
+    def git(*argv):
+        proc = subprocess.run(["git", *argv], cwd=REPO_ROOT, capture_output=True, text=True)
+        return proc.stdout.strip() if proc.returncode == 0 else ""
+    return {"commit": git("rev-parse", "HEAD") or None,
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def run_benchmarks(args) -> dict:
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"[ERROR] Unknown benchmark(s): {', '.join(sorted(unknown))}. "
+                         f"Choose from {', '.join(BENCHMARKS)}.")
+    latency = Latency(args.base_ms, args.prompt_ms, args.token_ms, args.tokens)
+    server = FakeLlamaServer(slots=args.slots, latency=latency).start()
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="localdev-bench-"))
+    results, skipped = {}, {}
+    try:
+        started = time.perf_counter()
+        counts = build_project(workdir, args.services, args.files, server.url, args.slots, args.seed)
+        print(f"[INFO] Generated {counts['services']} services ({counts['files']} files) in {workdir} "
+              f"in {time.perf_counter() - started:.1f}s.", file=sys.stderr)
+        ctx = Context(workdir, server, args.repeat, args)
+        for name in (n for n in BENCHMARKS if n in selected):
+            print(f"[INFO] {name}...", file=sys.stderr)
+            try:
+                metrics = BENCHMARKS[name](ctx)
+            except BenchmarkError as e:
+                print(f"[WARN] {name}: {e}", file=sys.stderr)
+                skipped[name] = str(e)
+                continue
+            for metric, samples in metrics.items():
+                results[f"{name}.{metric}"] = summarize(samples)
+    finally:
+        server.stop()
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {k: getattr(args, k) for k in ("services", "files", "repeat", "seed", "slots", "base_ms",
+                                                 "prompt_ms", "token_ms", "tokens", "suggest_files", "init_count")},
+        "results": results,
+        "skipped": skipped,
+    }
+
+def print_table(report: dict, out=sys.stdout):
+    width = max((len(name) for name in report["results"]), default=10)
+    print(f"{'benchmark':<{width}}  {'median':>10}  {'min':>10}  {'p95':>10}", file=out)
+    for name, r in report["results"].items():
+        print(f"{name:<{width}}  {r['median'] * 1000:>8.1f}ms  {r['min'] * 1000:>8.1f}ms  "
+              f"{r['p95'] * 1000:>8.1f}ms", file=out)
+    for name, reason in report["skipped"].items():
+        print(f"{name:<{width}}  {reason}", file=out)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the localdev CLI offline.")
+    parser.add_argument("--services", type=int, default=2000, help="Services in the synthetic workspace.")
+    parser.add_argument("--files", type=int, default=5, help="Source files per service.")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per measurement.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", type=str, default=None, help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}.")
+    parser.add_argument("--out", type=str, default=None, help="Write the JSON report here (default: stdout).")
+    parser.add_argument("--compare", type=str, default=None, help="A previous report to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown counted as a regression.")
+    parser.add_argument("--workdir", type=str, default=None, help="Generate the project here and keep it.")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary project for inspection.")
+    group = parser.add_argument_group("fake model server")
+    group.add_argument("--slots", type=int, default=4)
+    group.add_argument("--base-ms", type=float, default=Latency.base_ms)
+    group.add_argument("--prompt-ms", type=float, default=Latency.prompt_ms)
+    group.add_argument("--token-ms", type=float, default=Latency.token_ms)
+    group.add_argument("--tokens", type=int, default=Latency.tokens)
+    group = parser.add_argument_group("workload sizes")
+    group.add_argument("--suggest-files", type=int, default=40, help="Files in the batch suggest run.")
+    group.add_argument("--init-count", type=int, default=20, help="Services scaffolded per init run.")
+    group.add_argument("--watch-port", type=int, default=38271, help="Port for the run --watch service.")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+        print(f"[INFO] Wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    print_table(report, sys.stderr)
+    if args.compare:
+        from benchmarks.compare import compare, load_report, print_comparison
+        rows = compare(load_report(args.compare), report, args.threshold)
+        print_comparison(rows, sys.stderr)
+        return 1 if any(row["regression"] for row in rows) else 0
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,159 @@
+# benchmarks/workspace.py
+"""Synthetic projects for benchmarks: a config plus thousands of services.
+
+Every service is deterministic for a given seed, so two commits are
+timed on identical trees. Services alternate between Node (express,
+with every ``require_dirs`` folder) and Python; a few carry forbidden
+files or lint findings so `check` and `lint` have something to report.
+The first Node service has a small node_modules that fills the package
+store, which lets `init --offline` link instead of download.
+"""
+import json
+import random
+from pathlib import Path
+from typing import Optional
+
+import toml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FIRST_PORT = 20000
+
+# name -> (version, transitive dependencies)
+VENDOR = {
+    "express": ("4.18.2", {"body-parser": "^1.20.1", "cookie": "^0.5.0"}),
+    "body-parser": ("1.20.1", {"bytes": "3.1.2"}),
+    "cookie": ("0.5.0", {}),
+    "bytes": ("3.1.2", {}),
+    "ejs": ("3.1.9", {}),
+}
+
+def project_config(remote_url: str, slots: int = 4, **ai) -> dict:
+    """The repo's own config.project.toml, pointed at ``remote_url``."""
+    config = toml.load(REPO_ROOT / "config.project.toml")
+    config["ai"].update(remote_url=remote_url, slots=slots, timeout=30, **ai)
+    config["ai"].pop("endpoints", None)
+    config["cache"]["enabled"] = False
+    return config
+
+def python_module(rng: random.Random, functions: int, lint_errors: bool = False) -> str:
+    lines = ['"""Synthetic module."""', "import os", "import json"]
+    if lint_errors:
+        lines.append("import sys")  # unused
+    lines.append("")
+    for i in range(functions):
+        name = f"handler_{i}_{rng.randrange(10 ** 6)}"
+        lines += ["", "", f"def {name}(payload, limit={rng.randrange(1, 100)}):",
+                  f'    """Handle request variant {i}."""',
+                  "    items = [x for x in payload if x is not None]",
+                  "    total = 0",
+                  "    for item in items[:limit]:",
+                  f"        total += len(json.dumps(item)) * {rng.randrange(1, 9)}",
+                  "    if os.environ.get('DEBUG'):",
+                  "        print(total)",
+                  "    return total"]
+    return "\n".join(lines) + "\n"
+
+def js_module(rng: random.Random, routes: int) -> str:
+    lines = ["const express = require('express');", "const router = express.Router();", ""]
+    for i in range(routes):
+        lines += [f"router.get('/r{i}', (req, res) => {{",
+                  f"  const limit = Number(req.query.limit || {rng.randrange(1, 100)});",
+                  "  const items = Array.from({ length: limit }, (_, n) => n * 2);",
+                  "  res.json({ total: items.reduce((a, b) => a + b, 0) });",
+                  "});", ""]
+    lines.append("module.exports = router;")
+    return "\n".join(lines) + "\n"
+
+def _write(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+def _vendor(node_modules: Path):
+    for name, (version, deps) in VENDOR.items():
+        pkg = node_modules / name
+        _write(pkg / "package.json", json.dumps({"name": name, "version": version, "main": "index.js",
+                                                 "dependencies": deps}, indent=2))
+        _write(pkg / "index.js", f"module.exports = function {name.replace('-', '_')}() {{ return '{name}'; }};\n")
+        for i in range(8):
+            _write(pkg / "lib" / f"part{i}.js", f"// {name} {version} part {i}\n" + "exports.x = 1;\n" * 40)
+
+def _node_service(root: Path, name: str, port: int, rng: random.Random, files: int, dirs: list[str]):
+    for d in dirs:
+        (root / d).mkdir(parents=True, exist_ok=True)
+    _write(root / "package.json", json.dumps({
+        "name": name, "version": "1.0.0", "main": "src/app.js",
+        "dependencies": {"express": "^4.18.0", "ejs": "^3.1.8"}}, indent=2))
+    _write(root / "src" / "app.js", "const express = require('express');\nconst app = express();\n"
+           f"app.listen(process.env.PORT || {port});\n")
+    for i in range(files):
+        _write(root / "src" / "routes" / f"route{i}.js", js_module(rng, 4))
+    _write(root / "views" / "index.ejs", f"<h1>{name}</h1>\n")
+    return "src/app.js"
+
+def _python_service(root: Path, name: str, rng: random.Random, files: int, lint_errors: bool):
+    _write(root / "main.py", "from src import handlers_0\n\nprint(handlers_0.__name__)\n")
+    for i in range(files):
+        _write(root / "src" / f"handlers_{i}.py", python_module(rng, 6, lint_errors and i == 0))
+    (root / "tests").mkdir(exist_ok=True)
+    return "main.py"
+
+def build_project(root, services: int = 2000, files: int = 5, remote_url: str = "http://127.0.0.1:8799/completion",
+                  slots: int = 4, seed: int = 0, config: Optional[dict] = None) -> dict:
+    """Write a project (config.project.toml + workspace/) under ``root``; returns counts."""
+    root = Path(root)
+    rng = random.Random(seed)
+    config = config or project_config(remote_url, slots)
+    _write(root / "config.project.toml", toml.dumps(config))
+    dirs = config["integrity"]["require_dirs"]
+    registry = []
+    written = 0
+    for n in range(services):
+        name = f"svc-{n:05d}"
+        path = root / "workspace" / name
+        port = FIRST_PORT + n
+        if n % 2 == 0:
+            entrypoint = _node_service(path, name, port, rng, files, dirs)
+            if n == 0:
+                _vendor(path / "node_modules")
+        else:
+            entrypoint = _python_service(path, name, rng, files, lint_errors=n % 10 == 1)
+        if n % 20 == 3:
+            _write(path / "notes.tmp", "scratch\n")  # forbidden by [integrity] forbid_files
+        _write(path / "service.toml", toml.dumps({"service_name": name, "port": port, "entrypoint": entrypoint}))
+        registry.append({"name": name, "path": f"workspace/{name}", "port": port, "entrypoint": entrypoint})
+        written += files + 2
+    _write(root / "workspace" / "index.toml", toml.dumps({"service": registry}))
+    return {"services": services, "files": written}
+
+HTTP_SERVICE = '''import os
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+VERSION = {version}
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = ("%d %d" % (os.getpid(), VERSION)).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+HTTPServer(("127.0.0.1", int(os.environ.get("PORT", {port}))), Handler).serve_forever()
+'''
+
+def write_http_service(root, name: str, port: int, version: int = 0) -> Path:
+    """A Python service answering GET with "<pid> <version>", registered in ``root``'s workspace."""
+    root = Path(root)
+    path = root / "workspace" / name
+    _write(path / "main.py", HTTP_SERVICE.format(version=version, port=port))
+    _write(path / "service.toml", toml.dumps({"service_name": name, "port": port, "entrypoint": "main.py"}))
+    registry = root / "workspace" / "index.toml"
+    entries = toml.load(registry).get("service", []) if registry.exists() else []
+    if not any(e["name"] == name for e in entries):
+        entries.append({"name": name, "path": f"workspace/{name}", "port": port, "entrypoint": "main.py"})
+        _write(registry, toml.dumps({"service": entries}))
+    return path / "main.py"
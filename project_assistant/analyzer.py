@@ -0,0 +1,575 @@
+# project_assistant/analyzer.py
+"""Static hotspot analysis for Python and JavaScript sources.
+
+Every function gets the metrics that point at slow or hard-to-change
+code: cyclomatic complexity, length, nesting depth, loops nested inside
+loops, and I/O (or other blocking) calls made inside a loop. Python is
+parsed with ``ast``; JavaScript/TypeScript with a brace-matching scanner
+over the source with strings and comments blanked out.
+
+Files are parsed in worker processes and the results cached per file
+by content hash under .localdev/, so a re-run parses only what changed.
+"""
+import ast
+import bisect
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from project_assistant.config import get_config
+from project_assistant.tracing import span
+from project_assistant.utils import VersionedCache, state_dir
+
+# Bump when metrics change, so cached results from older rules are dropped
+ANALYZER_VERSION = 1
+PYTHON_EXTENSIONS = (".py",)
+JS_EXTENSIONS = (".js", ".mjs", ".cjs", ".jsx", ".ts", ".tsx")
+# Fewer files than this are parsed in-process: starting workers would cost more than it saves
+PARALLEL_MIN_FILES = 64
+
+# Score weights: a loop doing I/O or a loop inside a loop outweighs a few extra branches
+NESTING_FREE = 2  # nesting levels that cost nothing
+NESTING_WEIGHT = 2.0
+NESTED_LOOP_WEIGHT = 5.0
+LOOP_IO_WEIGHT = 8.0
+LINES_PER_POINT = 25
+
+@dataclass
+class FunctionMetrics:
+    """One function; ``start``/``end`` are 1-based, inclusive."""
+    path: str
+    name: str
+    start: int
+    end: int
+    complexity: int = 1
+    nesting: int = 0
+    nested_loops: int = 0
+    loop_io: list[str] = field(default_factory=list)
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def score(self) -> float:
+        return round(self.complexity
+                     + NESTING_WEIGHT * max(0, self.nesting - NESTING_FREE)
+                     + NESTED_LOOP_WEIGHT * self.nested_loops
+                     + LOOP_IO_WEIGHT * len(self.loop_io)
+                     + self.length / LINES_PER_POINT, 1)
+
+    def reasons(self) -> list[str]:
+        found = []
+        if self.loop_io:
+            calls = sorted(set(self.loop_io))
+            found.append(f"I/O in a loop: {', '.join(calls[:4])}{', ...' if len(calls) > 4 else ''}")
+        if self.nested_loops:
+            found.append(f"{self.nested_loops} loop(s) inside a loop")
+        if self.complexity >= 10:
+            found.append(f"complexity {self.complexity}")
+        if self.nesting > NESTING_FREE + 1:
+            found.append(f"nested {self.nesting} deep")
+        if self.length >= 60:
+            found.append(f"{self.length} lines")
+        return found
+
+    def to_dict(self) -> dict:
+        return dict(asdict(self), length=self.length, score=self.score, reasons=self.reasons())
+
+# --- Python -----------------------------------------------------------------
+
+_PY_IO_CALLS = {"open", "print", "input", "urlopen"}
+_PY_IO_MODULES = {"requests", "httpx", "subprocess", "socket", "shutil", "sqlite3", "urllib", "aiohttp"}
+_PY_IO_METHODS = {
+    "read", "readline", "readlines", "write", "writelines", "read_text", "read_bytes", "write_text",
+    "write_bytes", "exists", "is_file", "is_dir", "stat", "listdir", "scandir", "walk", "iterdir", "glob",
+    "makedirs", "mkdir", "unlink", "remove", "rename", "execute", "executemany", "fetchone", "fetchall",
+    "commit", "recv", "sendall", "urlopen", "sleep", "load", "dump", "system", "popen",
+}
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+_BLOCKS = (ast.With, ast.AsyncWith, ast.Try) + ((ast.TryStar,) if hasattr(ast, "TryStar") else ())
+
+def _dotted(node) -> Optional[str]:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    elif isinstance(node, ast.Call):
+        inner = _dotted(node.func)
+        parts.append(f"{inner}()" if inner else "()")
+    elif not parts:
+        return None
+    else:
+        parts.append("(...)")
+    return ".".join(reversed(parts))
+
+def _python_io(name: str) -> bool:
+    parts = name.split(".")
+    return name in _PY_IO_CALLS or parts[0] in _PY_IO_MODULES or (len(parts) > 1 and parts[-1] in _PY_IO_METHODS)
+
+def _python_function(node, qualname: str, path: str, found: list):
+    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+    metrics = FunctionMetrics(path, qualname, start, node.end_lineno)
+    found.append(metrics)
+
+    def visit(child, depth: int, loops: int):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            _python_function(child, f"{qualname}.<locals>.{child.name}", path, found)
+            return
+        if isinstance(child, ast.ClassDef):
+            _python_class(child, f"{qualname}.<locals>.{child.name}", path, found)
+            return
+        if isinstance(child, (ast.For, ast.AsyncFor)):
+            metrics.complexity += 1
+            metrics.nested_loops += loops > 0
+            metrics.nesting = max(metrics.nesting, depth + 1)
+            # The iterable is evaluated once, outside the loop
+            visit(child.target, depth, loops)
+            visit(child.iter, depth, loops)
+            for stmt in child.body + child.orelse:
+                visit(stmt, depth + 1, loops + 1)
+            return
+        if isinstance(child, ast.While):
+            metrics.complexity += 1
+            metrics.nested_loops += loops > 0
+            depth, loops = depth + 1, loops + 1
+        elif isinstance(child, _COMPREHENSIONS):
+            generators = len(child.generators)
+            metrics.complexity += sum(1 + len(g.ifs) for g in child.generators)
+            metrics.nested_loops += generators - 1 + (loops > 0)
+            depth, loops = depth + 1, loops + generators
+        elif isinstance(child, ast.If):
+            metrics.complexity += 1
+            depth += 1
+        elif isinstance(child, (ast.IfExp, ast.ExceptHandler)) or type(child).__name__ == "match_case":
+            metrics.complexity += 1
+        elif isinstance(child, ast.BoolOp):
+            metrics.complexity += len(child.values) - 1
+        elif isinstance(child, _BLOCKS):
+            depth += 1
+        elif isinstance(child, ast.Call) and loops:
+            name = _dotted(child.func)
+            if name and _python_io(name):
+                metrics.loop_io.append(name)
+        elif isinstance(child, ast.Await) and loops:
+            awaited = _dotted(child.value.func) if isinstance(child.value, ast.Call) else None
+            if not (awaited and _python_io(awaited)):  # else the call itself is reported
+                metrics.loop_io.append("await")
+        metrics.nesting = max(metrics.nesting, depth)
+        for grandchild in ast.iter_child_nodes(child):
+            visit(grandchild, depth, loops)
+
+    for child in ast.iter_child_nodes(node):
+        visit(child, 0, 0)
+
+def _python_class(node: ast.ClassDef, qualname: str, path: str, found: list):
+    for child in node.body:
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            _python_function(child, f"{qualname}.{child.name}", path, found)
+        elif isinstance(child, ast.ClassDef):
+            _python_class(child, f"{qualname}.{child.name}", path, found)
+
+def analyze_python(path: str, source: str) -> list[FunctionMetrics]:
+    tree = ast.parse(source, filename=path)
+    found = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            _python_function(node, node.name, path, found)
+        elif isinstance(node, ast.ClassDef):
+            _python_class(node, node.name, path, found)
+    return found
+
+# --- JavaScript ---------------------------------------------------------------
+
+_JS_TOKEN = re.compile(r"[A-Za-z_$][\w$]*|=>|&&|\|\||\?\?|\?\.|[{}()?]")
+_JS_CONTROL = {"if", "switch", "catch", "with"}
+_JS_LOOPS = {"for", "while"}
+_JS_KEYWORDS = _JS_CONTROL | _JS_LOOPS | {
+    "function", "return", "typeof", "instanceof", "new", "await", "async", "yield", "case", "in", "of",
+    "delete", "void", "throw", "else", "do", "try", "finally", "class", "extends", "const", "let", "var"}
+_JS_LOOP_METHODS = {"forEach", "map", "filter", "reduce", "reduceRight", "some", "every", "find",
+                    "findIndex", "flatMap"}
+_JS_IO = re.compile(r"^(?:fetch|axios(?:\.\w+)?|(?:fs|fsp|http|https|net|child_process)\.\w+|\w+Sync|console\.\w+"
+                    r"|.*\.(?:query|execute|readFile|writeFile|appendFile|readdir|stat|findOne|insertOne"
+                    r"|updateOne|deleteOne|save|request))$")
+_CALLEE = re.compile(r"([A-Za-z_$][\w$]*(?:\s*\??\.\s*[A-Za-z_$][\w$]*)*)\s*$")
+_ARROW_NAME = re.compile(r"([A-Za-z_$][\w$]*)\s*[:=]\s*(?:async\s*)?(?:\([^()]*\)|[A-Za-z_$][\w$]*)\s*$")
+_ASSIGNED_NAME = re.compile(r"([A-Za-z_$][\w$]*)\s*[:=]\s*(?:async\s+)?$")
+_RETURN_TYPE = re.compile(r"\s*(?::[^{};=()]*)?\s*")
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+# How far back to look for a callee or function name before "(" / "{"
+LOOKBEHIND = 160
+_CLASS_HEAD = re.compile(r"\bclass\s+([A-Za-z_$][\w$]*)[^{}]*$")
+# A "/" after one of these keywords starts a regex literal, not a division
+_JS_BEFORE_REGEX = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case",
+                    "do", "else", "yield", "await"}
+
+def mask_js(source: str) -> str:
+    """``source`` with comments and string, template and regex literal contents blanked.
+
+    Offsets and newlines are kept. A ``/`` starts a regex when what precedes
+    it cannot end a value: an operator, ``(``, ``,``, ``=``, the start of
+    the file or a keyword such as ``return``.
+    """
+    out = list(source)
+    i, n = 0, len(source)
+
+    def blank(start, end):
+        for k in range(start, end):
+            if out[k] != "\n":
+                out[k] = " "
+
+    def regex_allowed(pos):
+        k = pos - 1
+        while k >= 0 and out[k].isspace():
+            k -= 1
+        if k < 0:
+            return True
+        if out[k] in ")]}'\"`":
+            return False
+        if out[k].isalnum() or out[k] in "_$":
+            start = k
+            while start > 0 and (out[start - 1].isalnum() or out[start - 1] in "_$"):
+                start -= 1
+            return source[start:k + 1] in _JS_BEFORE_REGEX
+        return True
+
+    while i < n:
+        c = source[i]
+        if c == "/" and source.startswith("//", i):
+            end = source.find("\n", i)
+            end = n if end < 0 else end
+            blank(i, end)
+            i = end
+        elif c == "/" and source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            blank(i, end)
+            i = end
+        elif c in "'\"`":
+            j = i + 1
+            while j < n and source[j] != c:
+                if source[j] == "\\":
+                    j += 1
+                elif source[j] == "\n" and c != "`":
+                    break
+                j += 1
+            blank(i + 1, min(j, n))
+            i = j + 1
+        elif c == "/" and regex_allowed(i):
+            j = i + 1
+            in_class = False
+            while j < n and source[j] != "\n" and (in_class or source[j] != "/"):
+                if source[j] == "\\":
+                    j += 1
+                elif source[j] == "[":
+                    in_class = True
+                elif source[j] == "]":
+                    in_class = False
+                j += 1
+            blank(i + 1, min(j, n))
+            i = j + 1
+        else:
+            i += 1
+    return "".join(out)
+
+class _Frame:
+    """An open ``(`` or ``{``: kind is call, header, loop-call, function, loop, control, class or block."""
+    __slots__ = ("kind", "metrics", "name", "start", "prev", "prev2", "callee")
+
+    def __init__(self, kind, start, metrics=None, name=None, prev=None, prev2=None, callee=None):
+        self.kind, self.start, self.metrics, self.name = kind, start, metrics, name
+        self.prev, self.prev2, self.callee = prev, prev2, callee
+
+def analyze_js(path: str, source: str) -> list[FunctionMetrics]:
+    text = mask_js(source)
+    line_starts = [0] + [m.end() for m in re.finditer("\n", text)]
+
+    def line(offset: int) -> int:
+        return bisect.bisect_right(line_starts, offset)
+
+    found = []
+    stack = []
+    prev = prev2 = None
+    last_paren = None  # frame of the most recently closed "("
+    last_paren_end = -1
+    last_arrow = -1
+
+    def current():
+        """(function metrics, depth of control blocks, loops) for the innermost recorded function."""
+        depth = loops = 0
+        for frame in reversed(stack):
+            if frame.metrics is not None:
+                return frame.metrics, depth, loops
+            if frame.kind in ("loop", "control"):
+                depth += 1
+            if frame.kind in ("loop", "loop-call"):
+                loops += 1
+        return None, depth, loops
+
+    def class_name() -> Optional[str]:
+        for frame in reversed(stack):
+            if frame.kind == "class":
+                return frame.name
+            if frame.metrics is not None:
+                return None
+        return None
+
+    last_closed = None  # kind of the most recently closed "{"
+    for match in _JS_TOKEN.finditer(text):
+        token, pos = match.group(), match.start()
+        window = max(0, pos - LOOKBEHIND)
+        metrics, depth, loops = current()
+        if token == "(":
+            found_callee = _CALLEE.search(text, window, pos)
+            callee = re.sub(r"\s+", "", found_callee.group(1)) if found_callee else None
+            # a.b.forEach( or a(...).forEach(: a method, not a bare function call
+            method = callee and ("." in callee or text[window:found_callee.start()].rstrip().endswith("."))
+            kind = "call"
+            if prev in _JS_LOOPS or prev in _JS_CONTROL or (prev == "await" and prev2 == "for"):
+                kind = "header"
+            elif method and callee.rsplit(".", 1)[-1] in _JS_LOOP_METHODS:
+                kind = "loop-call"
+                if metrics is not None:
+                    metrics.complexity += 1
+                    metrics.nested_loops += loops > 0
+            elif metrics is not None and loops and callee and callee not in _JS_KEYWORDS and _JS_IO.match(callee):
+                if prev2 == "await" and metrics.loop_io[-1:] == ["await"]:
+                    metrics.loop_io.pop()  # report the awaited call, not the await
+                metrics.loop_io.append(callee)
+            stack.append(_Frame(kind, pos, prev=prev, prev2=prev2, callee=callee))
+        elif token == ")":
+            while stack and stack[-1].kind not in ("call", "header", "loop-call"):
+                stack.pop()  # unbalanced braces inside parentheses; resync
+            if stack:
+                last_paren = stack.pop()
+                last_paren_end = pos + 1
+        elif token == "{":
+            kind, frame_metrics, name = "block", None, None
+            class_head = _CLASS_HEAD.search(text, window, pos)
+            after_paren = last_paren is not None and _RETURN_TYPE.fullmatch(text, last_paren_end, pos) is not None
+            if class_head and prev != "=>":
+                kind, name = "class", class_head.group(1)
+            elif prev == "=>":
+                kind = "function"
+                named = _ARROW_NAME.search(text, max(0, last_arrow - LOOKBEHIND), last_arrow)
+                name = named.group(1) if named else None
+            elif after_paren:
+                head = last_paren
+                if head.prev in _JS_LOOPS or (head.prev == "await" and head.prev2 == "for"):
+                    kind = "loop"
+                elif head.prev in _JS_CONTROL:
+                    kind = "control"
+                elif head.prev == "function":
+                    kind = "function"
+                    keyword = text.rfind("function", 0, head.start)
+                    named = _ASSIGNED_NAME.search(text, max(0, keyword - LOOKBEHIND), max(keyword, 0))
+                    name = named.group(1) if named else None
+                elif head.prev2 == "function" or (head.prev and head.prev not in _JS_KEYWORDS
+                                                   and _IDENTIFIER.fullmatch(head.prev)):
+                    # function name(...) {, or a method: name(...) { is only valid in a class or object literal
+                    kind, name = "function", head.prev
+            elif prev in ("else", "try", "finally"):
+                kind = "control"
+            elif prev == "do":
+                kind = "loop"
+            if kind == "function" and metrics is None:
+                owner = class_name()
+                if name is None:
+                    caller = next((f.callee for f in reversed(stack)
+                                   if f.kind in ("call", "loop-call") and f.callee), None)
+                    name = f"{caller} callback" if caller else "<anonymous>"
+                frame_metrics = FunctionMetrics(path, f"{owner}.{name}" if owner else name, line(pos), line(pos))
+                found.append(frame_metrics)
+            elif kind == "function":
+                kind = "block"  # closures count towards the function that contains them
+            stack.append(_Frame(kind, pos, frame_metrics, name))
+            if metrics is not None and kind in ("loop", "control"):
+                metrics.nesting = max(metrics.nesting, depth + 1)
+        elif token == "}":
+            while stack and stack[-1].kind in ("call", "header", "loop-call"):
+                stack.pop()
+            if stack:
+                frame = stack.pop()
+                last_closed = frame.kind
+                if frame.metrics is not None:
+                    frame.metrics.end = line(pos)
+        elif metrics is not None:
+            if token in ("if", "case", "catch", "&&", "||", "??", "?"):
+                metrics.complexity += 1
+            elif token in ("for", "do") or (token == "while" and not (prev == "}" and last_closed == "loop")):
+                # "} while (...)" closes a do-loop that was already counted
+                metrics.complexity += 1
+                metrics.nested_loops += loops > 0
+            elif token == "await" and loops:
+                metrics.loop_io.append("await")
+        if token == "=>":
+            last_arrow = pos
+        prev2, prev = prev, token
+    return found
+
+# --- Files, cache and ranking ------------------------------------------------------
+
+def supported(path: str) -> bool:
+    return path.endswith(PYTHON_EXTENSIONS + JS_EXTENSIONS)
+
+def analyze_source(path: str, source: str) -> list[FunctionMetrics]:
+    if path.endswith(PYTHON_EXTENSIONS):
+        return analyze_python(path, source)
+    return analyze_js(path, source)
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _analyze_file(task: tuple[str, Optional[str]]) -> tuple[str, str, Optional[list], Optional[str]]:
+    """(path, sha, function dicts or None if the content matches ``known_sha``, error) -- runs in workers."""
+    path, known_sha = task
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return path, "", None, str(e)
+    sha = _sha256(data)
+    if sha == known_sha:
+        return path, sha, None, None
+    try:
+        functions = analyze_source(path, data.decode("utf-8", errors="replace"))
+    except (SyntaxError, ValueError, RecursionError) as e:
+        return path, sha, [], f"{type(e).__name__}: {e}"
+    return path, sha, [asdict(m) for m in functions], None
+
+class _AnalysisCache(VersionedCache):
+    """abs path -> {stat, sha, functions} from previous runs."""
+
+    def __init__(self, path: Optional[Path]):
+        super().__init__(path, ANALYZER_VERSION)
+
+    def lookup(self, abs_path: str) -> tuple[Optional[list], Optional[list], Optional[str]]:
+        """(cached functions if the stat is unchanged, current stat, cached sha)."""
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            return None, None, None
+        stat = [st.st_mtime_ns, st.st_size]
+        entry = self.files.get(abs_path)
+        if entry is None:
+            return None, stat, None
+        if entry["stat"] == stat:
+            return entry["functions"], stat, entry["sha"]
+        return None, stat, entry["sha"]
+
+    def store(self, abs_path: str, stat, sha: str, functions: list):
+        with self._lock:
+            self.files[abs_path] = {"stat": stat, "sha": sha, "functions": functions}
+            self._dirty = True
+
+@dataclass
+class AnalysisReport:
+    functions: list[FunctionMetrics]
+    files: int
+    parsed: int
+    errors: list[str]
+
+def analyze_files(paths: Iterable[str], cache_path: Optional[Path] = None,
+                  workers: Optional[int] = None) -> AnalysisReport:
+    """Metrics for every function in ``paths``, re-parsing only files whose content changed."""
+    cache = _AnalysisCache(cache_path)
+    results = {}
+    pending = []
+    stats = {}
+    paths = [p for p in paths if supported(p)]
+    for path in paths:
+        abs_path = os.path.abspath(path)
+        functions, stat, sha = cache.lookup(abs_path)
+        if functions is not None:
+            results[abs_path] = functions
+        elif stat is not None:
+            stats[abs_path] = stat
+            pending.append((abs_path, sha))
+    errors = []
+    parsed = 0
+    with span("analyze.parse", files=len(pending)):
+        if len(pending) >= PARALLEL_MIN_FILES and (workers or os.cpu_count() or 1) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                done = list(pool.map(_analyze_file, pending, chunksize=max(1, len(pending) // 64)))
+        else:
+            done = [_analyze_file(task) for task in pending]
+    previous = {p: cache.files.get(p, {}).get("functions", []) for p, _ in pending}
+    for abs_path, sha, functions, error in done:
+        if error:
+            errors.append(f"{abs_path}: {error}")
+        if functions is None and not error:
+            functions = previous[abs_path]  # touched, but the content is unchanged
+        else:
+            parsed += 1
+        if sha:
+            cache.store(abs_path, stats[abs_path], sha, functions or [])
+        results[abs_path] = functions or []
+    cache.save()
+    by_path = {os.path.abspath(p): p for p in paths}
+    functions = [FunctionMetrics(**dict(m, path=by_path.get(abs_path, abs_path)))
+                 for abs_path, items in results.items() for m in items]
+    return AnalysisReport(functions, len(paths), parsed, errors)
+
+def rank(functions: Iterable[FunctionMetrics], top: Optional[int] = None,
+         min_score: float = 0.0) -> list[FunctionMetrics]:
+    """Highest score first; ties go to the longer function."""
+    ranked = sorted((f for f in functions if f.score >= min_score),
+                    key=lambda f: (-f.score, -f.length, f.path, f.start))
+    return ranked[:top] if top else ranked
+
+def source_files(targets: list[str]) -> list[str]:
+    """Analyzable files under ``targets`` (files, directories, globs or service names); default: the workspace."""
+    from project_assistant.batch import expand_targets
+    from project_assistant.linter import resolve_service_dir
+    ignore_dirs = get_config().integrity.ignore_dirs
+    paths = []
+    for target in targets or ["workspace"]:
+        if not os.path.exists(target) and not any(c in target for c in "*?["):
+            root = resolve_service_dir(target)
+            if root is None:
+                print(f"[WARN] '{target}' is neither a path nor a service; skipped.", file=sys.stderr)
+                continue
+            target = str(root)
+        paths.append(target)
+    return [p for p in expand_targets(paths, ignore_dirs) if supported(p)]
+
+def file_hotspots(path: str, top: int, min_score: float) -> list[FunctionMetrics]:
+    """The ``top`` highest-scoring functions of one file, through the cache."""
+    report = analyze_files([path], state_dir() / "analyze_cache.json", workers=1)
+    return rank(report.functions, top, min_score)
+
+def cmd_analyze(args) -> int:
+    settings = get_config().analyze
+    files = source_files(args.target)
+    if not files:
+        print("[ERROR] No Python or JavaScript sources found.")
+        return 2
+    report = analyze_files(files, state_dir() / "analyze_cache.json", workers=args.workers)
+    min_score = settings.min_score if args.min_score is None else args.min_score
+    hotspots = rank(report.functions, args.top, min_score)
+    for error in report.errors:
+        print(f"[WARN] Could not parse {error}", file=sys.stderr)
+    if args.json:
+        print(json.dumps({"files": report.files, "functions": len(report.functions),
+                          "hotspots": [h.to_dict() for h in hotspots]}, indent=2))
+    else:
+        if hotspots:
+            print(f"{'score':>6} {'cc':>4} {'lines':>5} {'depth':>5}  location")
+        for h in hotspots:
+            print(f"{h.score:>6.1f} {h.complexity:>4} {h.length:>5} {h.nesting:>5}  {h.path}:{h.start} {h.name}")
+            for reason in h.reasons():
+                print(f"{'':>25}- {reason}")
+        if not hotspots:
+            print(f"[INFO] No function scores {min_score} or more.")
+    print(f"[INFO] {len(report.functions)} function(s) in {report.files} file(s); "
+          f"{report.parsed} file(s) parsed, the rest from cache.", file=sys.stderr)
+    return 0
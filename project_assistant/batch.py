@@ -0,0 +1,228 @@
+# project_assistant/batch.py
+"""Batch `suggest` over files, directories and globs, streamed as JSON Lines."""
+import glob
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Optional, TextIO
+
+from project_assistant.chunker import LANGUAGES
+from project_assistant.config import get_config
+
+def load_ignore_dirs(config_path: Optional[str] = None) -> list[str]:
+    return get_config(config_path).integrity.ignore_dirs
+
+def _ignored(path: str, ignore_dirs: set) -> bool:
+    parts = os.path.normpath(path).split(os.sep)
+    return any(part in ignore_dirs for part in parts[:-1])
+
+def _walk_sources(root: str, ignore_dirs: set):
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in ignore_dirs)
+        for name in sorted(files):
+            if os.path.splitext(name)[1] in LANGUAGES:
+                yield os.path.join(dirpath, name)
+
+def expand_targets(targets: Iterable[str], ignore_dirs: Iterable[str] = ()) -> list[str]:
+    """Resolve files, directories and glob patterns into a de-duplicated file list.
+
+    Directories contribute every source file below them; anything under one
+    of ``ignore_dirs`` is skipped unless it was named explicitly.
+    """
+    ignore = set(ignore_dirs)
+    files = []
+    for target in targets:
+        if os.path.isfile(target):
+            files.append(target)
+        elif os.path.isdir(target):
+            files.extend(_walk_sources(target, ignore))
+        else:
+            for match in sorted(glob.glob(target, recursive=True)):
+                if os.path.isdir(match):
+                    files.extend(_walk_sources(match, ignore))
+                elif not _ignored(match, ignore):
+                    files.append(match)
+    seen = set()
+    unique = []
+    for f in files:
+        key = os.path.abspath(f)
+        if key not in seen:
+            seen.add(key)
+            unique.append(f)
+    return unique
+
+class _Progress:
+    """Single self-overwriting status line on stderr (only when it is a terminal)."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.enabled = sys.stderr.isatty()
+        self._lock = threading.Lock()
+
+    def update(self, failed: bool):
+        with self._lock:
+            self.done += 1
+            self.failed += failed
+            if self.enabled:
+                sys.stderr.write(f"\r[{self.done}/{self.total}] files done, {self.failed} failed")
+                sys.stderr.flush()
+
+    def close(self):
+        if self.enabled and self.total:
+            sys.stderr.write("\n")
+            sys.stderr.flush()
+
+def prompt_summary(prompt_tokens: int, prompt_ms: float, cached_tokens: int) -> str:
+    """One line on prompt evaluation: what the server computed and what it reused from the KV cache."""
+    total = prompt_tokens + cached_tokens
+    share = 100.0 * cached_tokens / total if total else 0.0
+    return (f"[INFO] Prompt: {prompt_tokens} tokens evaluated in {prompt_ms:.0f} ms, "
+            f"{cached_tokens} reused from the KV cache ({share:.0f}%)")
+
+def _hotspot_count(args) -> int:
+    if args.task != "optimize":
+        return 0
+    return args.hotspots if args.hotspots is not None else get_config().analyze.hotspots
+
+def select_hotspots(files: list[str], top: int) -> dict:
+    """The ``top`` highest-scoring functions across ``files``, grouped by file.
+
+    Analyzable files without one map to an empty list; files the analyzer
+    cannot read are absent and get sent whole.
+    """
+    from project_assistant.analyzer import analyze_files, rank, supported
+    from project_assistant.utils import state_dir
+    report = analyze_files(files, state_dir() / "analyze_cache.json")
+    selected = {f: [] for f in files if supported(f)}
+    for metrics in rank(report.functions, top, get_config().analyze.min_score):
+        selected[metrics.path].append(metrics)
+    return selected
+
+def _suggest_one(file_path: str, task: str, use_cache: bool, refresh: bool, hotspots: Optional[list] = None,
+                 related: Optional[int] = None):
+    from project_assistant.suggester import Suggestion, run_suggestion
+    try:
+        return run_suggestion(file_path, task, use_cache, refresh, hotspots, related)
+    except Exception as e:
+        # One unreadable file must not abort the rest of the batch
+        return Suggestion(file_path, task, f"[ERROR] {e}", 0.0, 0, False)
+
+def run_batch(files: list[str], task: str, out: TextIO, workers: Optional[int] = None,
+              use_cache: bool = True, refresh: bool = False, hotspots: Optional[dict] = None,
+              related: Optional[int] = None) -> int:
+    """Suggest for every file on a bounded pool, writing one JSON line per file as it finishes.
+
+    With ``hotspots`` (from select_hotspots) only the listed functions are
+    sent, and analyzable files with none are skipped. ``related`` is the
+    number of functions from other files added to each prompt. Returns 1
+    if any file failed, else 0.
+    """
+    from ai_engine.client import get_client
+
+    # Chunks from all files share the client's slots, so more file workers
+    # than slots would only queue; wall time follows server parallelism.
+    workers = workers or get_client().slots
+    if hotspots is not None:
+        files = [f for f in files if hotspots.get(f, True)]
+    progress = _Progress(len(files))
+    totals = [0, 0.0, 0]  # prompt tokens, prompt ms, cached tokens
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="suggest") as pool:
+        futures = [pool.submit(_suggest_one, f, task, use_cache, refresh,
+                               hotspots.get(f) if hotspots is not None else None, related)
+                   for f in files]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                record = {
+                    "file": result.file,
+                    "task": result.task,
+                    "latency": round(result.latency, 3),
+                    "tokens": result.tokens,
+                    "cached": result.cached,
+                    "prompt_tokens": result.prompt_tokens,
+                    "prompt_ms": round(result.prompt_ms, 1),
+                    "cached_tokens": result.cached_tokens,
+                    "output": result.output,
+                }
+                totals[0] += result.prompt_tokens
+                totals[1] += result.prompt_ms
+                totals[2] += result.cached_tokens
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                progress.update(result.failed)
+        finally:
+            progress.close()
+    if totals[0] or totals[2]:
+        print(prompt_summary(*totals), file=sys.stderr)
+    return 1 if progress.failed else 0
+
+def _stream_single(args) -> int:
+    from project_assistant.analyzer import file_hotspots, supported
+    from project_assistant.suggester import stream_code_improvement
+    stats = {}
+    hotspots = None
+    top = _hotspot_count(args)
+    path = args.filename[0]
+    if top > 0 and supported(path) and os.path.isfile(path):
+        hotspots = file_hotspots(path, top, get_config().analyze.min_score)
+    outf = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        outf.write(f"\n=== Suggested Improvements ({args.task}) ===\n\n")
+        outf.flush()
+        try:
+            for chunk in stream_code_improvement(args.filename[0], args.task, stats=stats,
+                                                 use_cache=args.use_cache, refresh=args.refresh,
+                                                 hotspots=hotspots, related=args.related):
+                outf.write(chunk)
+                outf.flush()
+        except Exception as e:
+            outf.write(f"[ERROR] Failed to query model: {e}")
+        outf.write("\n")
+    finally:
+        if args.out:
+            outf.close()
+    if args.out:
+        print(f"Suggestions written to {args.out}")
+    if stats.get("cached"):
+        print("[INFO] Served from cache (use --refresh to regenerate).")
+    elif stats.get("ttft") is not None:
+        rate = stats["tokens"] / stats["elapsed"] if stats["elapsed"] else 0.0
+        print(f"[INFO] First token after {stats['ttft']:.2f}s, "
+              f"{stats['tokens']} tokens in {stats['elapsed']:.2f}s ({rate:.1f} tok/s)")
+        if stats.get("prompt_tokens") or stats.get("cached_tokens"):
+            print(prompt_summary(stats["prompt_tokens"], stats["prompt_ms"], stats["cached_tokens"]))
+    return 0
+
+def cmd_suggest(args) -> int:
+    """One plain file streams to the terminal; anything else runs as a JSON Lines batch."""
+    target = args.filename[0]
+    single = len(args.filename) == 1 and not os.path.isdir(target) and not glob.has_magic(target)
+    if single and not args.jsonl:
+        return _stream_single(args)
+    files = expand_targets(args.filename, load_ignore_dirs())
+    if not files:
+        print(f"[ERROR] No source files matched: {' '.join(args.filename)}")
+        return 2
+    hotspots = None
+    top = _hotspot_count(args)
+    if top > 0:
+        hotspots = select_hotspots(files, top)
+        chosen = sum(len(v) for v in hotspots.values())
+        print(f"[INFO] Sending the top {chosen} hotspot function(s) from "
+              f"{sum(1 for v in hotspots.values() if v)} of {len(files)} file(s) (--hotspots 0 sends whole files).",
+              file=sys.stderr)
+    outf = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        code = run_batch(files, args.task, outf, workers=args.workers,
+                         use_cache=args.use_cache, refresh=args.refresh, hotspots=hotspots,
+                         related=args.related)
+    finally:
+        if args.out:
+            outf.close()
+    if args.out:
+        print(f"Suggestions for {len(files)} file(s) written to {args.out}")
+    return code
@@ -0,0 +1,197 @@
+# project_assistant/chunker.py
+"""Split source files into model-sized chunks along function and class boundaries."""
+import ast
+import re
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+LINE_WINDOW = 80
+MIN_N_PREDICT = 128
+# Share of the context window a chunk may take; the rest is left for the answer
+INPUT_SHARE = 0.6
+OUTLINE_MAX_LINES = 60
+# Imports and declarations in languages we do not parse
+_OUTLINE_LINE = re.compile(r"^\s*(import\b|from\s+\S+\s+import\b|export\b|(async\s+)?function\b|class\b"
+                           r"|(const|let|var)\s+\w+\s*=\s*require\()")
+
+LANGUAGES = {
+    ".py": "Python",
+    ".js": "JavaScript",
+    ".mjs": "JavaScript",
+    ".cjs": "JavaScript",
+    ".ts": "TypeScript",
+    ".tsx": "TypeScript",
+    ".jsx": "JavaScript",
+    ".ejs": "EJS template",
+}
+
+@dataclass
+class Chunk:
+    """A contiguous slice of a source file; ``start``/``end`` are 1-based, inclusive."""
+    name: str
+    start: int
+    end: int
+    text: str
+    tokens: int = 0
+    n_predict: int = 0
+
+def language_for(path: str) -> str:
+    for ext, language in LANGUAGES.items():
+        if path.endswith(ext):
+            return language
+    return "source"
+
+def _slice(lines: list[str], start: int, end: int, name: str) -> Chunk:
+    return Chunk(name, start, end, "".join(lines[start - 1:end]))
+
+def _split_body(body, lines: list[str], first: int, last: int, offset: int = 0) -> list[Chunk]:
+    """Cut lines ``first..last`` at every function/class in ``body``; the rest is glue."""
+    chunks = []
+    cursor = first
+    for node in body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list]) + offset
+        end = node.end_lineno + offset
+        if start > cursor:
+            chunks.append(_slice(lines, cursor, start - 1, "module"))
+        kind = "class" if isinstance(node, ast.ClassDef) else "def"
+        chunks.append(_slice(lines, start, end, f"{kind} {node.name}"))
+        cursor = end + 1
+    if cursor <= last:
+        chunks.append(_slice(lines, cursor, last, "module"))
+    return [c for c in chunks if c.text.strip()]
+
+def split_python(source: str) -> list[Chunk]:
+    """One chunk per top-level function or class, plus the module code between them."""
+    lines = source.splitlines(keepends=True)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return split_lines(source)
+    return _split_body(tree.body, lines, 1, len(lines))
+
+def split_lines(source: str, window: int = LINE_WINDOW, first: int = 1) -> list[Chunk]:
+    """Fixed-size line windows, for languages we cannot parse."""
+    lines = source.splitlines(keepends=True)
+    window = max(1, window)
+    chunks = []
+    for i in range(0, len(lines), window):
+        start = first + i
+        end = first + min(i + window, len(lines)) - 1
+        chunks.append(Chunk("lines", start, end, "".join(lines[i:i + window])))
+    return [c for c in chunks if c.text.strip()]
+
+def split_source(path: str, source: str) -> list[Chunk]:
+    if path.endswith(".py"):
+        return split_python(source)
+    return split_lines(source)
+
+def outline(path: str, source: str, max_lines: int = OUTLINE_MAX_LINES) -> str:
+    """Imports and top-level signatures of a file: context every chunk of it can share."""
+    lines = source.splitlines()
+    keep = []
+    if path.endswith(".py"):
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            tree = None
+        if tree is not None:
+            for node in tree.body:
+                if isinstance(node, (ast.Import, ast.ImportFrom)):
+                    keep.extend(range(node.lineno, node.end_lineno + 1))
+                elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    keep.append(node.lineno)
+                    if isinstance(node, ast.ClassDef):
+                        keep.extend(n.lineno for n in node.body
+                                    if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)))
+    if not keep:
+        keep = [i for i, line in enumerate(lines, 1) if _OUTLINE_LINE.match(line)]
+    return "\n".join(lines[i - 1].rstrip() for i in keep[:max_lines])
+
+def _split_oversized(chunk: Chunk, budget: int) -> list[Chunk]:
+    """Break a chunk that alone exceeds the budget: classes into members, else line windows."""
+    if chunk.name.startswith("class "):
+        lines = chunk.text.splitlines(keepends=True)
+        try:
+            tree = ast.parse(chunk.text)
+        except SyntaxError:
+            tree = None
+        if tree and tree.body and isinstance(tree.body[-1], ast.ClassDef):
+            offset = chunk.start - 1
+            # Re-slice against the file's numbering so ranges stay correct
+            padded = [""] * offset + lines
+            parts = _split_body(tree.body[-1].body, padded, chunk.start, chunk.end, offset)
+            if len(parts) > 1:
+                for part in parts:
+                    if part.name == "module":
+                        part.name = chunk.name
+                    else:
+                        part.name = f"{chunk.name}.{part.name.split(' ', 1)[1]}"
+                return parts
+    n_lines = chunk.end - chunk.start + 1
+    window = max(1, n_lines * budget // max(chunk.tokens, 1))
+    if window >= n_lines:
+        window = max(1, n_lines // 2)
+    parts = split_lines(chunk.text, window, first=chunk.start)
+    for part in parts:
+        part.name = chunk.name
+    return parts
+
+def fit_to_budget(chunks: list[Chunk], budget: int, count_tokens: Callable[[list[str]], list[int]],
+                  merge: bool = True) -> list[Chunk]:
+    """Split chunks larger than ``budget`` tokens and, with ``merge``, merge neighbours that fit together."""
+    for chunk, tokens in zip(chunks, count_tokens([c.text for c in chunks])):
+        chunk.tokens = tokens
+    fitted = []
+    pending = list(chunks)
+    while pending:
+        chunk = pending.pop(0)
+        if chunk.tokens > budget and chunk.end > chunk.start:
+            parts = _split_oversized(chunk, budget)
+            for part, tokens in zip(parts, count_tokens([p.text for p in parts])):
+                part.tokens = tokens
+            pending[:0] = parts
+            continue
+        fitted.append(chunk)
+    if not merge:
+        return fitted
+
+    merged = []
+    for chunk in fitted:
+        last = merged[-1] if merged else None
+        if last is not None and last.tokens + chunk.tokens <= budget:
+            names = last.name if chunk.name in last.name.split(", ") else f"{last.name}, {chunk.name}"
+            merged[-1] = Chunk(names, last.start, chunk.end, last.text + chunk.text, last.tokens + chunk.tokens)
+        else:
+            merged.append(chunk)
+    return merged
+
+def span_chunks(source: str, spans: list[tuple[str, int, int]]) -> list[Chunk]:
+    """Chunks for the given (name, start, end) line ranges of ``source`` only."""
+    lines = source.splitlines(keepends=True)
+    return [_slice(lines, start, end, name) for name, start, end in spans]
+
+def plan_chunks(path: str, source: str, n_ctx: int, overhead: int,
+                count_tokens: Callable[[list[str]], list[int]], max_n_predict: Optional[int] = None,
+                chunks: Optional[list[Chunk]] = None) -> list[Chunk]:
+    """Chunk ``source`` so each prompt plus its answer fits in ``n_ctx`` tokens.
+
+    ``overhead`` is the token cost of the instruction wrapped around every
+    chunk. Each chunk gets its own ``n_predict``, sized to its input.
+    Given ``chunks`` (e.g. from span_chunks) only those are fitted, and
+    never merged with each other.
+    """
+    available = max(n_ctx - overhead, 2 * MIN_N_PREDICT)
+    budget = int(available * INPUT_SHARE)
+    if chunks is None:
+        chunks = fit_to_budget(split_source(path, source), budget, count_tokens)
+    else:
+        chunks = fit_to_budget(chunks, budget, count_tokens, merge=False)
+    for chunk in chunks:
+        room = available - chunk.tokens
+        n_predict = max(MIN_N_PREDICT, chunk.tokens)
+        if max_n_predict:
+            n_predict = min(n_predict, max_n_predict)
+        chunk.n_predict = max(1, min(n_predict, room))
+    return chunks
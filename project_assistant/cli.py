@@ -0,0 +1,240 @@
+# project_assistant/cli.py
+"""Command-line entry point: a registry of subcommands whose handlers are imported on dispatch.
+
+Only argparse is needed to build the parser. Each command names its
+handler as ``"module:function"``; that module is imported when the
+command actually runs, so `check` never pays for the model client.
+"""
+import argparse
+import contextlib
+import importlib
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+@dataclass
+class Command:
+    name: str
+    handler: str  # "package.module:function", imported on dispatch
+    help: str
+    add_arguments: Callable[[argparse.ArgumentParser], None]
+
+COMMANDS: dict[str, Command] = {}
+
+def command(name: str, handler: str, help: str):
+    """Register the decorated function as the argument builder for ``name``."""
+    def register(add_arguments):
+        COMMANDS[name] = Command(name, handler, help, add_arguments)
+        return add_arguments
+    return register
+
+@command("suggest", "project_assistant.batch:cmd_suggest",
+         help="Get code suggestions for files, directories or globs.")
+def _suggest_arguments(p):
+    p.add_argument('filename', nargs='+', help="Files, directories or glob patterns to analyze. More than one file switches to JSON Lines output.")
+    p.add_argument('--task', choices=["refactor", "optimize", "explain"], default="refactor", help="Type of suggestion: refactor, optimize, or explain. Default is refactor.")
+    p.add_argument('--out', type=str, default=None, help="Optional output file to write suggestions.")
+    p.add_argument('--no-cache', dest='use_cache', action='store_false', help="Neither read nor write the response cache.")
+    p.add_argument('--refresh', action='store_true', help="Ignore cached answers and overwrite them with fresh ones.")
+    p.add_argument('--jsonl', action='store_true', help="Emit JSON Lines even for a single file.")
+    p.add_argument('--workers', type=int, default=None, help="Files processed concurrently in batch mode (default: [ai] slots).")
+    p.add_argument('--related', type=int, default=None, help="Add the N functions from other files most related to each file to its prompt (default: [retrieval] top_k; 0 = none).")
+    p.add_argument('--hotspots', type=int, default=None, help="With --task optimize: send only the N top-scoring functions instead of whole files; one file keeps its own top N, several files share N (default: [analyze] hotspots; 0 = whole files).")
+
+@command("cache", "ai_engine.cache:cmd_cache", help="Inspect or clear the suggestion response cache.")
+def _cache_arguments(p):
+    p.add_argument('action', choices=["stats", "clear"], help="Show hit/miss statistics or drop all entries.")
+
+@command("check", "project_assistant.folder_checker:cmd_check", help="Check folder integrity.")
+def _check_arguments(p):
+    p.add_argument('--fix', action='store_true', help="Automatically create missing required folders.")
+    p.add_argument('--json', action='store_true', help="Output folder integrity results as JSON.")
+    p.add_argument('--changed-only', dest='changed_only', action='store_true', help="Only report services whose directories changed since the last check.")
+
+@command("init", "project_assistant.scaffolder:cmd_init", help="Scaffold a new microservice.")
+def _init_arguments(p):
+    p.add_argument('servicename', nargs='*', help="Names of the microservices to initialize; each gets the next free port.")
+    p.add_argument('--count', type=int, default=None, help="Scaffold N services named <name>-1 .. <name>-N.")
+    p.add_argument('--port', type=int, default=3000, help="First port to assign (default 3000); registered ports are skipped.")
+    p.add_argument('--no-install', dest='install', action='store_false', help="Do not populate node_modules.")
+    p.add_argument('--offline', action='store_true', help="Only link packages from the local store; never run npm.")
+    p.add_argument('--docker-compose', dest='docker_compose', action='store_true', help="Add service to docker-compose.yml.")
+    p.add_argument('--git', dest='git', action='store_true', help="Initialize a git repository in the new service directory.")
+    p.add_argument('--no-git', dest='git', action='store_false', help="Do not initialize git (default).")
+    p.add_argument('--interactive', action='store_true', help="Use interactive wizard to configure the microservice.")
+    p.set_defaults(docker_compose=False, git=False)
+
+@command("store", "project_assistant.package_store:cmd_store", help="Manage the shared Node package store.")
+def _store_arguments(p):
+    p.add_argument('action', choices=["add", "link", "stats"], help="add: store packages from services' node_modules; link: populate node_modules from the store; stats: show store size.")
+    p.add_argument('service', nargs='*', help="Service names or paths (default: every service in the workspace).")
+    p.add_argument('--offline', action='store_true', help="With link: never fall back to npm for missing packages.")
+
+@command("run", "project_assistant.services:cmd_run", help="Run one or more services (Node or Python)")
+def _run_arguments(p):
+    p.add_argument('service', nargs='*', help="Service names or paths to run. Several names are started together, in dependency order.")
+    p.add_argument('--all', action='store_true', help="Run every service registered in workspace/index.toml.")
+    p.add_argument('--watch', action='store_true', help="Restart on file changes.")
+    p.add_argument('--zero-downtime', action='store_true', help="With --watch: keep serving on the service's port while the replacement starts.")
+    p.add_argument('--model', type=str, default=None, help="Model backend to use (overrides config.project.toml fallback).")
+    p.add_argument('--metrics-port', dest='metrics_port', type=int, default=None, help="Serve Prometheus resource metrics on 127.0.0.1:PORT/metrics (default: [monitor] metrics_port).")
+
+@command("logs", "project_assistant.logmux:cmd_logs", help="Show the last lines a supervised service logged.")
+def _logs_arguments(p):
+    p.add_argument('service', help="Service name as shown in the log prefix.")
+    p.add_argument('-n', '--lines', type=int, default=50, help="Number of lines to show (default 50).")
+
+@command("debug", "project_assistant.debugger:cmd_debug", help="Show live CPU, memory, fd and thread use of a running service.")
+def _debug_arguments(p):
+    p.add_argument('action', choices=["stats"], help="stats: the latest resource sample of the service and its child processes.")
+    p.add_argument('service', help="Service name, as started with `run`.")
+    p.add_argument('--json', action='store_true', help="Output the sample as JSON.")
+    p.add_argument('-f', '--follow', action='store_true', help="Keep printing every [monitor] interval until Ctrl+C.")
+
+@command("lint", "project_assistant.linter:cmd_lint", help="Lint microservices (ESLint for JS, Ruff/flake8 for Python)")
+def _lint_arguments(p):
+    p.add_argument('service', nargs='*', help="Service names or paths to lint.")
+    p.add_argument('--all', action='store_true', help="Lint every service registered in workspace/index.toml.")
+    p.add_argument('--format', choices=["text", "json", "sarif"], default="text", help="Report format (default text).")
+    p.add_argument('--out', type=str, default=None, help="Write the report to this file instead of stdout.")
+    p.add_argument('--workers', type=int, default=None, help="Linter jobs run concurrently (default: CPU count).")
+
+@command("format", "project_assistant.formatter:cmd_format", help="Format microservices (Prettier for JS/TS/JSON/CSS/Markdown, Ruff for Python)")
+def _format_arguments(p):
+    p.add_argument('service', nargs='*', help="Service names or paths to format.")
+    p.add_argument('--all', action='store_true', help="Format every service registered in workspace/index.toml.")
+    p.add_argument('--check', action='store_true', help="Only list files that would be reformatted; exit 1 if there are any.")
+    p.add_argument('--workers', type=int, default=None, help="Formatter jobs run concurrently (default: CPU count).")
+
+@command("analyze", "project_assistant.analyzer:cmd_analyze", help="Rank functions by complexity, nesting, nested loops and I/O in loops.")
+def _analyze_arguments(p):
+    p.add_argument('target', nargs='*', help="Files, directories, globs or service names (default: the whole workspace).")
+    p.add_argument('--top', type=int, default=20, help="Show the N highest-scoring functions (default 20; 0 = all).")
+    p.add_argument('--min-score', dest='min_score', type=float, default=None, help="Hide functions scoring below this (default: [analyze] min_score).")
+    p.add_argument('--json', action='store_true', help="Output the hotspots as JSON.")
+    p.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count).")
+
+@command("bench", "project_assistant.loadgen:cmd_bench", help="Load-test a service over HTTP and compare with its saved baseline.")
+def _bench_arguments(p):
+    p.add_argument('service', help="Service name; started (and stopped afterwards) if it is not already listening on its port.")
+    p.add_argument('--path', type=str, default=None, help="Request path (default: [bench] path).")
+    p.add_argument('--concurrency', '-c', type=int, default=None, help="Open connections (default: [bench] concurrency).")
+    p.add_argument('--rate', type=float, default=None, help="Requests per second, measured from when each is due; 0 = as fast as responses come back (default: [bench] rate).")
+    p.add_argument('--duration', '-d', type=float, default=None, help="Seconds to measure (default: [bench] duration).")
+    p.add_argument('--warmup', type=float, default=None, help="Seconds of unrecorded load first (default: [bench] warmup).")
+    p.add_argument('--baseline', type=str, default=None, help="Baseline report to compare with (default: .localdev/bench/<service>.json); exit 1 on a regression.")
+    p.add_argument('--save-baseline', dest='save_baseline', action='store_true', help="Write this run as the new baseline.")
+    p.add_argument('--out', type=str, default=None, help="Write the JSON report to this file instead of stdout.")
+
+@command("related", "project_assistant.retrieval:cmd_related", help="Show the code from other files that suggest adds to a file's prompt.")
+def _related_arguments(p):
+    p.add_argument('file', help="Source file to find related code for.")
+    p.add_argument('--top', type=int, default=None, help="Number of related functions (default: [retrieval] top_k).")
+    p.add_argument('--json', action='store_true', help="Output the matches and index statistics as JSON.")
+
+@command("serve", "project_assistant.daemon:cmd_serve", help="Keep a warm daemon running that main.py forwards short commands to.")
+def _serve_arguments(p):
+    p.add_argument('--detach', action='store_true', help="Start the daemon in the background (log: .localdev/logs/serve.log).")
+    p.add_argument('--status', action='store_true', help="Show whether a daemon is serving this project.")
+    p.add_argument('--stop', action='store_true', help="Stop the running daemon.")
+
+@command("vscode-tasks", "project_assistant.vscode:cmd_vscode_tasks", help="Generate VS Code tasks.json for a microservice.")
+def _vscode_tasks_arguments(p):
+    p.add_argument('service', help="Service name or path to generate tasks for.")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Suggest code improvements or run a default test query.",
+        epilog="Example: python main.py suggest myscript.py --task optimize"
+    )
+    parser.add_argument('--version', action='version', version='%(prog)s 1.0.0', help='Show program version and exit.')
+    parser.add_argument('--timings', action='store_true', help="Print how long parsing, importing and running the command took.")
+    parser.add_argument('--trace', metavar='FILE', default=None, help="Record nested timing spans as Chrome trace-event JSON (chrome://tracing, ui.perfetto.dev).")
+    parser.add_argument('--profile', metavar='FILE', default=None, help="Run under cProfile and dump the stats to FILE ('-' prints the top functions).")
+    subparsers = parser.add_subparsers(dest='command', required=False)
+    for cmd in COMMANDS.values():
+        sub = subparsers.add_parser(cmd.name, help=cmd.help)
+        cmd.add_arguments(sub)
+        sub.set_defaults(_parser=sub)
+    return parser
+
+def resolve(cmd: Command) -> Callable:
+    module_name, _, func = cmd.handler.partition(":")
+    return getattr(importlib.import_module(module_name), func)
+
+def default_test() -> int:
+    from ai_engine.interface import query_llama
+    print(query_llama("Write a Python function that returns True if a number is prime."))
+    return 0
+
+def _report(timings: list[tuple[str, float]]):
+    total = sum(seconds for _, seconds in timings)
+    parts = ", ".join(f"{label} {seconds * 1000:.1f} ms" for label, seconds in timings)
+    print(f"[timings] {parts}; total {total * 1000:.1f} ms "
+          f"({len(sys.modules)} modules loaded)", file=sys.stderr)
+
+def _span(args, name: str):
+    if not args.trace:
+        return contextlib.nullcontext()
+    from project_assistant.tracing import span
+    return span(name)
+
+def _start_profile():
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def _dump_profile(profiler, path: str):
+    import pstats
+    profiler.disable()
+    if path == "-":
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(30)
+    else:
+        profiler.dump_stats(path)
+        print(f"[INFO] Wrote profile to {path} (python -m pstats {path}, or snakeviz).", file=sys.stderr)
+
+def main(argv: Optional[list[str]] = None, started: Optional[float] = None) -> int:
+    """Parse ``argv`` and run the chosen command; returns the exit code.
+
+    ``started`` is a perf_counter() reading taken before anything else was
+    imported, so --timings can include the entry script's own startup.
+    """
+    timings = []
+    t = time.perf_counter()
+    if started is not None:
+        timings.append(("startup", t - started))
+    args = build_parser().parse_args(argv)
+    now = time.perf_counter()
+    timings.append(("parse", now - t))
+    if args.trace:
+        from project_assistant import tracing
+        tracing.start(args.trace, origin=started if started is not None else t)
+        if started is not None:
+            tracing.record("startup", started, t)
+        tracing.record("parse", t, now)
+    profiler = _start_profile() if args.profile else None
+    t = now
+    try:
+        if not args.command:
+            return default_test()
+        cmd = COMMANDS[args.command]
+        module = cmd.handler.partition(':')[0]
+        with _span(args, f"import {module}"):
+            handler = resolve(cmd)
+        now = time.perf_counter()
+        timings.append((f"import {module}", now - t))
+        t = now
+        with _span(args, f"command {cmd.name}"):
+            return handler(args) or 0
+    finally:
+        timings.append(("run", time.perf_counter() - t))
+        if profiler is not None:
+            _dump_profile(profiler, args.profile)
+        if args.trace:
+            from project_assistant import tracing
+            tracing.stop()
+        if args.timings:
+            _report(timings)
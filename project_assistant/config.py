@@ -0,0 +1,251 @@
+# project_assistant/config.py
+"""Process-wide, typed view of config.project.toml.
+
+The file is parsed once and re-parsed only when its mtime or size
+changes, so callers can ask for settings in loops without paying for
+TOML parsing. Settings are layered, lowest first:
+
+1. defaults below
+2. config.project.toml (``$LOCALDEV_CONFIG``, else the CWD, else the package root)
+3. a service's service.toml, via ``service_config()``: ``[ai]``/``[run]``/...
+   tables overlay those sections, and top-level keys that are [run]
+   settings (``debounce_ms``, ``restart``, ...) overlay [run]
+4. environment variables ``LOCALDEV_<SECTION>_<KEY>``, e.g.
+   ``LOCALDEV_AI_REMOTE_URL`` or ``LOCALDEV_RUN_DEBOUNCE_MS=500``;
+   values are read as TOML literals, falling back to plain strings
+
+In overlays scalars replace and lists extend.
+"""
+import os
+import sys
+import threading
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Optional
+
+import toml
+
+from project_assistant.tracing import span
+
+CONFIG_NAME = "config.project.toml"
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+ENV_PREFIX = "LOCALDEV_"
+
+@dataclass(frozen=True)
+class AISettings:
+    remote_url: str = ""
+    model: Optional[str] = None
+    backend: str = "remote"
+    temperature: float = 0.8
+    slots: int = 1
+    timeout: float = 60
+    n_ctx: Optional[int] = None
+    max_n_predict: Optional[int] = None
+    cache_prompt: bool = True
+    pin_slots: bool = True
+    endpoints: list = field(default_factory=list)  # URLs or {url, slots} tables; default [remote_url]
+    balance: str = "least-outstanding"  # or "latency"
+    hedge_percentile: float = 95  # 0 turns hedging off
+    hedge_min_delay: float = 0.25
+    breaker_failures: int = 3
+    breaker_cooldown: float = 5
+
+@dataclass(frozen=True)
+class CacheSettings:
+    enabled: bool = True
+    max_mb: float = 64
+
+@dataclass(frozen=True)
+class IntegritySettings:
+    require_dirs: list = field(default_factory=list)
+    require_files: list = field(default_factory=list)
+    forbid_files: list = field(default_factory=list)
+    enforce_flat_src: bool = False
+    ignore_dirs: list = field(default_factory=list)
+
+@dataclass(frozen=True)
+class RunSettings:
+    debounce_ms: float = 300
+    watch_ignore: list = field(default_factory=list)
+    max_backoff: float = 30
+    ready_timeout: float = 60
+    log_max_mb: float = 5
+    log_backups: int = 3
+    log_ring_lines: int = 1000
+    restart: str = "stop-start"
+    drain_timeout: float = 10
+
+@dataclass(frozen=True)
+class StoreSettings:
+    dir: str = ""  # package store location; defaults to .localdev/store
+    link: str = "auto"  # "auto" (hardlink, then reflink, then copy), "hardlink", "reflink" or "copy"
+
+@dataclass(frozen=True)
+class AnalyzeSettings:
+    hotspots: int = 5  # suggest --task optimize sends only this many top-scoring functions per file; 0 = whole files
+    min_score: float = 5.0  # functions scoring below this are not hotspots
+
+@dataclass(frozen=True)
+class MonitorSettings:
+    enabled: bool = True  # sample CPU, memory, fds and threads of services started by `run`
+    interval: float = 2.0  # seconds between samples
+    metrics_port: int = 0  # serve Prometheus metrics on 127.0.0.1:<port>; 0 = off
+    leak_window: float = 300  # seconds of steady RSS growth before a leak is reported
+    leak_mb_per_min: float = 1.0  # slower growth than this is not reported
+    cpu_spike: float = 90.0  # percent of one core
+    cpu_spike_samples: int = 3  # consecutive samples above cpu_spike that count as a spike
+
+@dataclass(frozen=True)
+class BenchSettings:
+    path: str = "/"  # request path; a service's service.toml [bench] table can override any of these
+    method: str = "GET"
+    concurrency: int = 16  # connections kept open to the service
+    rate: float = 0  # requests per second (open loop); 0 = each connection sends as soon as it is answered
+    duration: float = 10  # seconds measured
+    warmup: float = 2  # seconds of load before measuring; not recorded
+    timeout: float = 5  # per request
+    tolerance: float = 0.10  # relative throughput drop or latency growth over the baseline counted as a regression
+
+@dataclass(frozen=True)
+class RetrievalSettings:
+    enabled: bool = True  # add code from other files that a file's identifiers point at to its suggest prompt
+    paths: list = field(default_factory=lambda: ["workspace"])  # indexed directories
+    top_k: int = 5  # related functions added per prompt; 0 = off
+    max_tokens: int = 1024  # their combined size, at most a quarter of the context window
+
+SECTIONS = {"ai": AISettings, "cache": CacheSettings, "integrity": IntegritySettings, "run": RunSettings,
+            "store": StoreSettings, "analyze": AnalyzeSettings, "monitor": MonitorSettings,
+            "bench": BenchSettings, "retrieval": RetrievalSettings}
+
+@dataclass(frozen=True)
+class Config:
+    path: Optional[Path] = None
+    ai: AISettings = field(default_factory=AISettings)
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    integrity: IntegritySettings = field(default_factory=IntegritySettings)
+    run: RunSettings = field(default_factory=RunSettings)
+    store: StoreSettings = field(default_factory=StoreSettings)
+    analyze: AnalyzeSettings = field(default_factory=AnalyzeSettings)
+    monitor: MonitorSettings = field(default_factory=MonitorSettings)
+    bench: BenchSettings = field(default_factory=BenchSettings)
+    retrieval: RetrievalSettings = field(default_factory=RetrievalSettings)
+    raw: dict = field(default_factory=dict)  # every table as parsed, including untyped ones
+
+    def section(self, name: str) -> dict:
+        return self.raw.get(name, {})
+
+_lock = threading.Lock()
+_files = {}  # path -> ((mtime_ns, size), parsed dict)
+_built = {}  # (config path, service path) -> (inputs, Config)
+
+def _read(path) -> tuple[Optional[tuple], dict]:
+    key = str(path)
+    try:
+        st = os.stat(key)
+    except OSError:
+        with _lock:
+            _files.pop(key, None)
+        return None, {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _files.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached
+    try:
+        with span("config.load", path=key):
+            data = toml.load(key)
+    except Exception as e:  # the toml package raises more than TomlDecodeError on malformed input
+        print(f"[WARN] Could not parse {key}: {e}; keeping previous settings.", file=sys.stderr)
+        data = cached[1] if cached is not None else {}
+    with _lock:
+        _files[key] = (stamp, data)
+    return stamp, data
+
+def read_toml(path) -> dict:
+    """Parsed contents of ``path``, cached until its mtime or size changes; {} if missing.
+
+    A file that fails to parse keeps its last good contents, so a
+    half-saved edit does not take down a long-running process.
+    """
+    return _read(path)[1]
+
+def read_service_toml(service_root) -> dict:
+    return read_toml(Path(service_root) / "service.toml")
+
+def find_config_path() -> Optional[Path]:
+    override = os.environ.get(ENV_PREFIX + "CONFIG")
+    if override:
+        return Path(override)
+    for candidate in (Path.cwd() / CONFIG_NAME, PACKAGE_ROOT / CONFIG_NAME):
+        if candidate.is_file():
+            return candidate
+    return None
+
+def _env_value(text: str):
+    try:
+        return toml.loads(f"v = {text}")["v"]
+    except toml.TomlDecodeError:
+        return text
+
+_ENV_NAMES = [(f"{ENV_PREFIX}{name}_{f.name}".upper(), name, f.name)
+              for name, cls in SECTIONS.items() for f in fields(cls)]
+
+def _env_overrides() -> dict:
+    overrides = {}
+    for env_name, section, key in _ENV_NAMES:
+        value = os.environ.get(env_name)
+        if value is not None:
+            overrides.setdefault(section, {})[key] = _env_value(value)
+    return overrides
+
+def _overlay(base: dict, extra: dict) -> dict:
+    merged = dict(base)
+    for key, value in extra.items():
+        if isinstance(value, list) and isinstance(merged.get(key), list):
+            merged[key] = merged[key] + value
+        else:
+            merged[key] = value
+    return merged
+
+def _service_layer(service: dict) -> dict:
+    layer = {name: service[name] for name in SECTIONS if isinstance(service.get(name), dict)}
+    run_keys = {f.name for f in fields(RunSettings)}
+    flat = {k: v for k, v in service.items() if k in run_keys}
+    if flat:
+        layer["run"] = _overlay(layer.get("run", {}), flat)
+    return layer
+
+def _build(path: Optional[Path], layers: list[dict]) -> Config:
+    raw = {}
+    for layer in layers:
+        for name, values in layer.items():
+            if isinstance(values, dict):
+                raw[name] = _overlay(raw.get(name, {}), values)
+    sections = {}
+    for name, cls in SECTIONS.items():
+        values = raw.get(name, {})
+        sections[name] = cls(**{f.name: values[f.name] for f in fields(cls) if f.name in values})
+    return Config(path=path, raw=raw, **sections)
+
+def _get(path: Optional[Path], service_root) -> Config:
+    stamp, data = _read(path) if path is not None else (None, {})
+    service_stamp, service = _read(service_root / "service.toml") if service_root is not None else (None, {})
+    env = _env_overrides()
+    inputs = (stamp, service_stamp, repr(env))
+    key = (str(path), str(service_root))
+    with _lock:
+        cached = _built.get(key)
+    if cached is not None and cached[0] == inputs:
+        return cached[1]
+    config = _build(path, [data, _service_layer(service), env])
+    with _lock:
+        _built[key] = (inputs, config)
+    return config
+
+def get_config(path=None) -> Config:
+    """The project configuration, re-read only if the file changed since the last call."""
+    return _get(Path(path) if path else find_config_path(), None)
+
+def service_config(service_root, path=None) -> Config:
+    """The project configuration with ``service_root``/service.toml laid over it."""
+    return _get(Path(path) if path else find_config_path(), Path(service_root))
@@ -0,0 +1,397 @@
+# project_assistant/daemon.py
+"""Resident `serve` daemon, and the thin client main.py uses to forward commands to it.
+
+The daemon listens on ``.localdev/serve.sock`` and keeps what every
+invocation would otherwise rebuild: imported modules, parsed config, the
+service index, the model client's connection pool, the response cache
+and warm formatter workers. A client passes its stdin, stdout and stderr
+file descriptors along with argv, cwd and environment; the daemon runs
+the command on those descriptors and answers with the exit code, so
+output, tty detection and exit codes are the same as running in-process.
+Requests run one at a time.
+
+main.py imports this module before anything else, so the client half
+uses only cheap standard-library modules.
+"""
+import json
+import os
+import socket
+import struct
+import sys
+from typing import Optional
+
+SOCKET_NAME = "serve.sock"
+# Short commands worth forwarding; long-running ones (run, serve) would hold the daemon
+FORWARDED = {"check", "lint", "format", "analyze", "suggest", "cache", "logs", "debug", "store", "vscode-tasks",
+             "related"}
+# Global options that take a value, so the command name comes after it
+_VALUE_OPTIONS = {"--trace", "--profile"}
+_HEADER = struct.Struct(">I")
+INTERRUPT = b"\x03"
+
+def socket_path() -> str:
+    """Where utils.state_dir() puts the socket, without importing the config machinery."""
+    state = os.environ.get("LOCALDEV_STATE_DIR") or os.path.join(os.getcwd(), ".localdev")
+    return os.path.join(state, SOCKET_NAME)
+
+def _command(argv: list[str]) -> Optional[str]:
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg in _VALUE_OPTIONS:
+            skip = True
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+def _send(sock: socket.socket, message: dict, fds: tuple = ()):
+    data = json.dumps(message).encode("utf-8")
+    data = _HEADER.pack(len(data)) + data
+    sent = socket.send_fds(sock, [data], list(fds)) if fds else 0
+    sock.sendall(data[sent:])
+
+def _recv_exactly(sock: socket.socket, n: int, data: bytes = b"") -> Optional[bytes]:
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def _recv(sock: socket.socket) -> Optional[dict]:
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    body = _recv_exactly(sock, _HEADER.unpack(header)[0])
+    return json.loads(body) if body is not None else None
+
+def connect(path: Optional[str] = None) -> Optional[socket.socket]:
+    path = path or socket_path()
+    if not hasattr(socket, "send_fds") or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:  # a socket file left behind by a daemon that died
+        sock.close()
+        return None
+    return sock
+
+def forward(argv: list[str], started: Optional[float] = None) -> Optional[int]:
+    """Run ``argv`` in the serve daemon and return its exit code; None if it should run in-process."""
+    if os.environ.get("LOCALDEV_NO_DAEMON") or _command(argv) not in FORWARDED:
+        return None
+    sock = connect()
+    if sock is None:
+        return None
+    with sock:
+        request = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ), "started": started}
+        try:
+            _send(sock, request, fds=(0, 1, 2))
+        except OSError:
+            return None
+        while True:
+            try:
+                reply = _recv(sock)
+                break
+            except KeyboardInterrupt:
+                # Ctrl+C reaches only us; have the daemon interrupt the command and wait for its exit code
+                try:
+                    sock.sendall(INTERRUPT)
+                except OSError:
+                    return 130
+    if reply is None:
+        print("[ERROR] The serve daemon exited while running the command.", file=sys.stderr)
+        return 1
+    if "fallback" in reply:
+        return None
+    return reply["exit"]
+
+def control(action: str) -> Optional[dict]:
+    """Send ``action`` ("status" or "stop") to the running daemon; None if there is none."""
+    sock = connect()
+    if sock is None:
+        return None
+    with sock:
+        _send(sock, {"control": action})
+        return _recv(sock)
+
+# --- Daemon -----------------------------------------------------------------------
+
+def _sources() -> dict:
+    """mtimes of this tool's own loaded modules, to notice the code changing under the daemon."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    stamps = {}
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and path.startswith(root) and "site-packages" not in path:
+            try:
+                stamps[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+    return stamps
+
+def _changed(stamps: dict) -> bool:
+    for path, mtime in stamps.items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return True
+        except OSError:
+            return True
+    return False
+
+class _ClientContext:
+    """Swap in a client's stdio descriptors, working directory and environment for one command."""
+
+    def __init__(self, fds: list[int], cwd: str, env: dict):
+        self.fds, self.cwd, self.env = fds, cwd, env
+
+    def __enter__(self):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.saved_fds = [os.dup(i) for i in range(3)]
+        self.saved_streams = sys.stdin, sys.stdout, sys.stderr
+        self.saved_cwd = os.getcwd()
+        self.saved_env = dict(os.environ)
+        for target, fd in enumerate(self.fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        # Fresh streams, buffered the way Python sets them up for these descriptors at startup
+        encoding = sys.__stdout__.encoding
+        sys.stdin = open(0, "r", encoding=sys.__stdin__.encoding, errors=sys.__stdin__.errors, closefd=False)
+        sys.stdout = open(1, "w", encoding=encoding, errors=sys.__stdout__.errors, closefd=False)
+        sys.stderr = open(2, "w", buffering=1, encoding=encoding, errors="backslashreplace", closefd=False)
+        os.chdir(self.cwd)
+        os.environ.clear()
+        os.environ.update(self.env)
+        return self
+
+    def __exit__(self, *exc):
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except (OSError, ValueError):
+                pass  # the client went away
+        sys.stdin, sys.stdout, sys.stderr = self.saved_streams
+        for target, fd in enumerate(self.saved_fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.environ.clear()
+        os.environ.update(self.saved_env)
+        os.chdir(self.saved_cwd)
+        return False
+
+def _run(argv: list[str], started: Optional[float]) -> int:
+    """cli.main() with the exit code an uncaught exception or sys.exit() would have produced."""
+    import traceback
+    from project_assistant.cli import main
+    try:
+        return main(argv, started=started) or 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        traceback.print_exc()
+        return 130
+    except Exception:
+        traceback.print_exc()
+        return 1
+
+class Daemon:
+    def __init__(self, path: str):
+        self.path = path
+        self.requests = 0
+        self.stamps = {}
+        self.started = 0.0
+        self._listener = None
+        self._stopping = False
+        self._client_interrupt = False
+
+    def warm_up(self):
+        """Import every forwarded command and build the process-wide singletons once."""
+        from project_assistant.cli import COMMANDS, build_parser, resolve
+        build_parser()
+        for name in FORWARDED:
+            if name in COMMANDS:
+                resolve(COMMANDS[name])
+        from ai_engine.cache import get_cache
+        from ai_engine.client import get_client
+        from project_assistant.config import get_config
+        from project_assistant.retrieval import get_index
+        from project_assistant.service_index import get_service_index
+        get_config()
+        get_service_index()
+        get_cache()
+        get_client()
+        index = get_index()
+        if index is not None:
+            index.refresh()
+        self.stamps = _sources()
+
+    def listen(self):
+        """Bind the socket; raises OSError if another daemon already answers on it."""
+        existing = connect(self.path)
+        if existing is not None:
+            existing.close()
+            raise OSError(f"a serve daemon is already listening on {self.path}")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self._listener.listen(16)
+
+    def serve_forever(self):
+        import time
+        self.started = time.time()
+        try:
+            while not self._stopping:
+                try:
+                    conn, _ = self._listener.accept()
+                    with conn:
+                        self._handle(conn)
+                except KeyboardInterrupt:
+                    # A client's Ctrl+C that landed just after its command finished is not ours
+                    if not self._client_interrupt:
+                        raise
+                self._client_interrupt = False
+        finally:
+            self.close()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def _handle(self, conn: socket.socket):
+        import threading
+        import time
+        try:
+            data, fds, _, _ = socket.recv_fds(conn, 1 << 16, 3)
+            # The descriptors arrive with the first bytes; the rest of the message may follow
+            data = _recv_exactly(conn, _HEADER.size, data)
+            if data is not None:
+                data = _recv_exactly(conn, _HEADER.size + _HEADER.unpack(data[:_HEADER.size])[0], data)
+        except OSError:
+            return
+        if data is None:
+            for fd in fds:
+                os.close(fd)
+            return
+        request = json.loads(data[_HEADER.size:])
+        if "control" in request:
+            for fd in fds:
+                os.close(fd)
+            if request["control"] == "stop":
+                self._stopping = True
+            _send(conn, {"pid": os.getpid(), "uptime": time.time() - self.started, "requests": self.requests,
+                         "cwd": os.getcwd()})
+            return
+        if len(fds) != 3 or _changed(self.stamps):
+            for fd in fds:
+                os.close(fd)
+            if len(fds) == 3:
+                # Our code was edited: let this client run the new code itself, and get out of the way
+                print("[serve] Source files changed; shutting down so the next `serve` loads them.", flush=True)
+                self._stopping = True
+            _send(conn, {"fallback": "stale" if len(fds) == 3 else "no stdio"})
+            return
+        self.requests += 1
+        running = threading.Event()
+        running.set()
+
+        def watch_client():
+            # Ctrl+C in the client, or the client dying, interrupts the command
+            try:
+                while conn.recv(1):
+                    if running.is_set():
+                        import _thread
+                        self._client_interrupt = True
+                        _thread.interrupt_main()
+            except OSError:
+                return
+        threading.Thread(target=watch_client, name="serve-client", daemon=True).start()
+        with _ClientContext(fds, request["cwd"], request["env"]):
+            code = _run(request["argv"], request.get("started"))
+        running.clear()
+        # Modules the command imported for the first time are checked from now on too
+        self.stamps = {**_sources(), **self.stamps}
+        try:
+            _send(conn, {"exit": code})
+        except OSError:
+            pass
+
+def _spawn_detached(path: str) -> int:
+    """Start `main.py serve` in its own session, logging to .localdev/logs/serve.log; returns its pid."""
+    import subprocess
+    import time
+    main_py = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+    log_dir = os.path.join(os.path.dirname(path), "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, "serve.log"), "ab") as log:
+        proc = subprocess.Popen([sys.executable, main_py, "serve"], stdin=subprocess.DEVNULL, stdout=log,
+                                stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and proc.poll() is None:
+        sock = connect(path)
+        if sock is not None:
+            sock.close()
+            return proc.pid
+        time.sleep(0.05)
+    return -1
+
+def cmd_serve(args) -> int:
+    import time
+    if not hasattr(socket, "send_fds"):
+        print("[ERROR] `serve` needs Unix domain sockets with descriptor passing (Linux/macOS, Python 3.9+).")
+        return 2
+    path = socket_path()
+    if args.status or args.stop:
+        reply = control("stop" if args.stop else "status")
+        if reply is None:
+            print(f"[INFO] No serve daemon on {path}.")
+            return 1
+        state = "Stopping" if args.stop else "Running"
+        print(f"[INFO] {state} serve daemon: pid {reply['pid']}, up {reply['uptime']:.0f}s, "
+              f"{reply['requests']} command(s) served, cwd {reply['cwd']}.")
+        return 0
+    if args.detach:
+        sock = connect(path)
+        if sock is not None:
+            sock.close()
+            print(f"[ERROR] A serve daemon is already listening on {path}.")
+            return 1
+        pid = _spawn_detached(path)
+        if pid < 0:
+            print(f"[ERROR] The serve daemon did not start; see {os.path.join(os.path.dirname(path), 'logs', 'serve.log')}.")
+            return 1
+        print(f"[INFO] Serve daemon running (pid {pid}); commands in this project now run in it. "
+              "Stop it with `main.py serve --stop`.")
+        return 0
+
+    daemon = Daemon(path)
+    started = time.perf_counter()
+    try:
+        daemon.listen()
+    except OSError as e:
+        print(f"[ERROR] Cannot serve: {e}")
+        return 1
+    daemon.warm_up()
+    print(f"[serve] Listening on {path} (pid {os.getpid()}, warmed up in "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms). Ctrl+C to stop.", flush=True)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print("[serve] Shutting down.")
+    return 0
@@ -0,0 +1,413 @@
+# project_assistant/debugger.py
+"""Live resource monitor for services started by `run`.
+
+One background thread samples every supervised process and its
+descendants straight from ``/proc``: CPU, resident memory, open file
+descriptors and threads. Each round is written to
+``.localdev/monitor/<service>.json`` for `debug stats`, and can be served
+as Prometheus metrics. Steady RSS growth and sustained CPU spikes are
+reported as warnings.
+"""
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from project_assistant.config import MonitorSettings, get_config
+from project_assistant.utils import state_dir
+
+PROC = Path("/proc")
+# Below this correlation RSS is churning (GC, caches), not growing steadily
+LEAK_MIN_CORRELATION = 0.8
+# `debug stats` calls a snapshot stale after this many missed samples
+STALE_INTERVALS = 3
+
+try:
+    CLK_TCK = os.sysconf("SC_CLK_TCK")
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # Windows
+    CLK_TCK = PAGE_SIZE = 0
+
+def supported() -> bool:
+    return CLK_TCK > 0 and (PROC / "self" / "stat").exists()
+
+@dataclass
+class ProcessStats:
+    pid: int
+    ppid: int
+    name: str
+    cpu: float  # percent of one core since the previous sample
+    rss: int  # bytes
+    fds: int
+    threads: int
+
+def _read_stat(pid: int) -> Optional[tuple]:
+    """(name, ppid, cpu ticks, threads, start time, rss bytes) from /proc/<pid>/stat."""
+    try:
+        with open(PROC / str(pid) / "stat", "rb") as f:
+            data = f.read().decode("utf-8", errors="replace")
+    except OSError:
+        return None
+    # The command name is parenthesised and may itself contain spaces or parentheses
+    close = data.rfind(")")
+    name = data[data.find("(") + 1:close]
+    rest = data[close + 2:].split()
+    return (name, int(rest[1]), int(rest[11]) + int(rest[12]), int(rest[17]), int(rest[19]),
+            int(rest[21]) * PAGE_SIZE)
+
+def _count_fds(pid: int) -> int:
+    try:
+        return len(os.listdir(PROC / str(pid) / "fd"))
+    except OSError:
+        return 0
+
+def _children(pid: int) -> list[int]:
+    """Child pids of every thread of ``pid``."""
+    children = []
+    try:
+        tasks = os.listdir(PROC / str(pid) / "task")
+    except OSError:
+        return children
+    for tid in tasks:
+        try:
+            with open(PROC / str(pid) / "task" / tid / "children", "rb") as f:
+                children.extend(int(c) for c in f.read().split())
+        except OSError:
+            continue
+    return children
+
+def process_tree(root: int) -> list[int]:
+    """``root`` and all its descendants, parents first."""
+    tree = [root]
+    i = 0
+    while i < len(tree):
+        tree.extend(c for c in _children(tree[i]) if c not in tree)
+        i += 1
+    return tree
+
+def rss_trend(samples) -> tuple[float, float]:
+    """Least-squares slope (bytes/second) and correlation of (time, rss) samples."""
+    n = len(samples)
+    if n < 3:
+        return 0.0, 0.0
+    mean_t = sum(t for t, _ in samples) / n
+    mean_r = sum(r for _, r in samples) / n
+    cov = sum((t - mean_t) * (r - mean_r) for t, r in samples)
+    var_t = sum((t - mean_t) ** 2 for t, _ in samples)
+    var_r = sum((r - mean_r) ** 2 for _, r in samples)
+    if not var_t:
+        return 0.0, 0.0
+    slope = cov / var_t
+    correlation = cov / (var_t * var_r) ** 0.5 if var_r else 0.0
+    return slope, correlation
+
+@dataclass
+class _Tracked:
+    name: str
+    get_proc: Callable
+    root: Optional[int] = None
+    ticks: dict = field(default_factory=dict)  # (pid, start time) -> cpu ticks at the previous sample
+    last_time: float = 0.0
+    history: collections.deque = field(default_factory=collections.deque)  # (time, total rss)
+    hot: int = 0  # consecutive samples above the CPU spike threshold
+    leak_reported: float = 0.0
+    starts: int = 0
+    spikes: int = 0
+    processes: list = field(default_factory=list)
+    trend: float = 0.0
+    peak_rss: int = 0
+    alerts: list = field(default_factory=list)
+
+    def totals(self) -> dict:
+        return {
+            "cpu": round(sum(p.cpu for p in self.processes), 1),
+            "rss": sum(p.rss for p in self.processes),
+            "fds": sum(p.fds for p in self.processes),
+            "threads": sum(p.threads for p in self.processes),
+            "processes": len(self.processes),
+        }
+
+class ResourceMonitor(threading.Thread):
+    """Samples tracked services every ``settings.interval`` seconds until stopped."""
+
+    def __init__(self, settings: MonitorSettings, state_path: Optional[Path] = None, out=None):
+        super().__init__(name="monitor", daemon=True)
+        self.settings = settings
+        self.state_path = state_path
+        self.out = out or sys.stdout
+        self.metrics_url = None
+        self.sample_seconds = 0.0
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._server = None
+
+    def track(self, name: str, get_proc: Callable):
+        """Watch whatever process ``get_proc()`` currently returns (a Popen or None) under ``name``."""
+        with self._lock:
+            self._tracked[name] = _Tracked(name, get_proc)
+
+    def run(self):
+        while not self._stopping.wait(self.settings.interval):
+            self.sample()
+
+    def stop(self):
+        self._stopping.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def sample(self):
+        started = time.perf_counter()
+        with self._lock:
+            tracked = list(self._tracked.values())
+        for t in tracked:
+            self._sample(t)
+        self.sample_seconds = time.perf_counter() - started
+        for t in tracked:
+            self._save(t)
+
+    def _sample(self, t: _Tracked):
+        proc = t.get_proc()
+        now = time.monotonic()
+        root = proc.pid if proc is not None and proc.poll() is None else None
+        if root != t.root:
+            # Started or restarted: trends of the old process say nothing about the new one
+            t.root = root
+            t.ticks.clear()
+            t.history.clear()
+            t.hot = 0
+            t.leak_reported = 0.0
+            t.starts += root is not None
+        if root is None:
+            t.processes = []
+            return
+        elapsed = now - t.last_time if t.last_time else 0.0
+        ticks = {}
+        processes = []
+        for pid in process_tree(root):
+            stat = _read_stat(pid)
+            if stat is None:
+                continue  # exited between listing and reading
+            name, ppid, cpu_ticks, threads, start, rss = stat
+            ticks[(pid, start)] = cpu_ticks
+            previous = t.ticks.get((pid, start))
+            cpu = 0.0
+            if previous is not None and elapsed > 0:
+                cpu = 100.0 * (cpu_ticks - previous) / CLK_TCK / elapsed
+            processes.append(ProcessStats(pid, ppid, name, round(cpu, 1), rss, _count_fds(pid), threads))
+        t.ticks, t.last_time, t.processes = ticks, now, processes
+        totals = t.totals()
+        t.peak_rss = max(t.peak_rss, totals["rss"])
+        self._check(t, now, totals)
+
+    def _check(self, t: _Tracked, now: float, totals: dict):
+        s = self.settings
+        t.history.append((now, totals["rss"]))
+        # Keep one sample at or beyond the window so a full window is always covered
+        while len(t.history) > 1 and now - t.history[1][0] >= s.leak_window:
+            t.history.popleft()
+        t.trend = 0.0
+        if now - t.history[0][0] >= s.leak_window:
+            t.trend, correlation = rss_trend(t.history)
+            per_minute = t.trend * 60 / 1024 / 1024
+            if per_minute >= s.leak_mb_per_min and correlation >= LEAK_MIN_CORRELATION \
+                    and now - t.leak_reported >= s.leak_window:
+                t.leak_reported = now
+                grown = (t.history[-1][1] - t.history[0][1]) / 1024 / 1024
+                self._alert(t, f"RSS grew {grown:.1f} MB in {_duration(now - t.history[0][0])} "
+                               f"(+{per_minute:.1f} MB/min, steady); possible memory leak.")
+        if totals["cpu"] >= s.cpu_spike:
+            t.hot += 1
+            if t.hot == s.cpu_spike_samples:
+                t.spikes += 1
+                self._alert(t, f"CPU at {totals['cpu']:.0f}% for {_duration(t.hot * s.interval)}.")
+        else:
+            t.hot = 0
+
+    def _alert(self, t: _Tracked, message: str):
+        t.alerts = (t.alerts + [{"time": time.time(), "message": message}])[-20:]
+        print(f"[monitor] [WARN] {t.name}: {message}", file=self.out, flush=True)
+
+    def snapshot(self, name: str) -> Optional[dict]:
+        with self._lock:
+            t = self._tracked.get(name)
+        if t is None:
+            return None
+        return {
+            "service": name,
+            "owner": os.getpid(),
+            "updated": time.time(),
+            "interval": self.settings.interval,
+            "metrics": self.metrics_url,
+            "pid": t.root,
+            "starts": t.starts,
+            "totals": t.totals(),
+            "peak_rss": t.peak_rss,
+            "rss_trend": round(t.trend, 1),
+            "cpu_spikes": t.spikes,
+            "alerts": t.alerts,
+            "processes": [asdict(p) for p in t.processes],
+        }
+
+    def _save(self, t: _Tracked):
+        if self.state_path is None:
+            return
+        try:
+            self.state_path.mkdir(parents=True, exist_ok=True)
+            path = self.state_path / f"{t.name}.json"
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(t.name), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def metrics_text(self) -> str:
+        """Prometheus text exposition of the latest sample of every tracked service."""
+        with self._lock:
+            tracked = list(self._tracked.values())
+        metrics = [
+            ("up", "gauge", "1 while the service process is running.", lambda t, tot: int(t.root is not None)),
+            ("cpu_percent", "gauge", "CPU use of the service and its descendants, percent of one core.",
+             lambda t, tot: tot["cpu"]),
+            ("rss_bytes", "gauge", "Resident memory of the service and its descendants.", lambda t, tot: tot["rss"]),
+            ("open_fds", "gauge", "Open file descriptors.", lambda t, tot: tot["fds"]),
+            ("threads", "gauge", "Threads.", lambda t, tot: tot["threads"]),
+            ("processes", "gauge", "The service process and its descendants.", lambda t, tot: tot["processes"]),
+            ("rss_growth_bytes_per_second", "gauge", "RSS trend over [monitor] leak_window; 0 until it is covered.",
+             lambda t, tot: t.trend),
+            ("starts_total", "counter", "Times the service process was (re)started.", lambda t, tot: t.starts),
+            ("cpu_spikes_total", "counter", "Sustained CPU spikes above [monitor] cpu_spike.",
+             lambda t, tot: t.spikes),
+        ]
+        totals = {t.name: t.totals() for t in tracked}
+        lines = []
+        for name, kind, help_text, value in metrics:
+            lines.append(f"# HELP localdev_service_{name} {help_text}")
+            lines.append(f"# TYPE localdev_service_{name} {kind}")
+            for t in tracked:
+                lines.append(f'localdev_service_{name}{{service="{_label(t.name)}"}} {value(t, totals[t.name])}')
+        lines.append("# HELP localdev_monitor_sample_seconds Time the last sampling round took.")
+        lines.append("# TYPE localdev_monitor_sample_seconds gauge")
+        lines.append(f"localdev_monitor_sample_seconds {self.sample_seconds:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int, host: str = "127.0.0.1"):
+        """Serve ``/metrics`` on ``host:port`` from a background thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        monitor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = monitor.metrics_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.metrics_url = f"http://{host}:{self._server.server_address[1]}/metrics"
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+
+def _duration(seconds: float) -> str:
+    return f"{seconds:.0f}s" if seconds < 120 else f"{seconds / 60:.1f} min"
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def start_monitor(metrics_port: Optional[int] = None) -> Optional[ResourceMonitor]:
+    """A running monitor configured from [monitor], or None when disabled or /proc is unavailable."""
+    settings = get_config().monitor
+    port = settings.metrics_port if metrics_port is None else metrics_port
+    if not settings.enabled:
+        return None
+    if not supported():
+        if port:
+            print("[WARN] Resource monitoring needs Linux /proc; no metrics endpoint.")
+        return None
+    monitor = ResourceMonitor(settings, state_dir() / "monitor")
+    if port:
+        try:
+            monitor.serve_metrics(port)
+            print(f"[monitor] Prometheus metrics on {monitor.metrics_url}")
+        except OSError as e:
+            print(f"[monitor] [WARN] Could not listen on port {port} ({e}); no metrics endpoint.")
+    monitor.start()
+    return monitor
+
+def load_stats(name: str, path: Optional[Path] = None) -> Optional[dict]:
+    try:
+        with open((path or state_dir() / "monitor") / f"{name}.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, owned by someone else
+    return True
+
+def _mb(n: float) -> str:
+    return f"{n / 1024 / 1024:.1f} MB"
+
+def format_stats(stats: dict) -> str:
+    totals = stats["totals"]
+    lines = [f"{stats['service']}: pid {stats['pid'] or '-'}, {totals['processes']} process(es), "
+             f"started {stats['starts']} time(s)",
+             f"  CPU {totals['cpu']:.1f}%  RSS {_mb(totals['rss'])} (peak {_mb(stats['peak_rss'])})  "
+             f"fds {totals['fds']}  threads {totals['threads']}"]
+    if stats["rss_trend"]:
+        lines.append(f"  RSS trend {stats['rss_trend'] * 60 / 1024 / 1024:+.2f} MB/min")
+    if len(stats["processes"]) > 1:
+        lines.append(f"  {'pid':>7} {'ppid':>7} {'cpu%':>6} {'rss':>10} {'fds':>5} {'thr':>4}  name")
+        for p in stats["processes"]:
+            lines.append(f"  {p['pid']:>7} {p['ppid']:>7} {p['cpu']:>6.1f} {_mb(p['rss']):>10} "
+                         f"{p['fds']:>5} {p['threads']:>4}  {p['name']}")
+    for alert in stats["alerts"][-5:]:
+        when = time.strftime("%H:%M:%S", time.localtime(alert["time"]))
+        lines.append(f"  [WARN] {when} {alert['message']}")
+    if stats.get("metrics"):
+        lines.append(f"  Metrics: {stats['metrics']}")
+    return "\n".join(lines)
+
+def cmd_debug(args) -> int:
+    """`debug stats <service>`: the latest sample the running `run` process recorded."""
+    while True:
+        stats = load_stats(args.service)
+        if stats is None:
+            print(f"[ERROR] No resource stats for '{args.service}'. Start it with `main.py run {args.service}` "
+                  "([monitor] enabled, Linux only).")
+            return 1
+        age = time.time() - stats["updated"]
+        stale = not _alive(stats["owner"]) or age > STALE_INTERVALS * stats["interval"] + 1
+        if args.json:
+            print(json.dumps(dict(stats, stale=stale), indent=2))
+        else:
+            print(format_stats(stats))
+            if stale:
+                print(f"[WARN] Last sampled {age:.0f}s ago; the `run` process is no longer updating it.")
+        if not args.follow or stale:
+            return 0
+        try:
+            time.sleep(stats["interval"])
+        except KeyboardInterrupt:
+            return 0
+        print()
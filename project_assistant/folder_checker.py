@@ -1,28 +1,161 @@
 import os
+import re
 import fnmatch
-import toml
 import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-def check_folder_integrity(base_path=None, fix=False, output_json=False) -> list[str]:
-    # Always check the integrity of the 'workspace' folder in the project root unless overridden
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+from project_assistant.config import get_config
+from project_assistant.tracing import span
+from project_assistant.utils import state_dir
+
+CACHE_VERSION = 1
+
+def compile_forbid_patterns(patterns: list[str]) -> Optional[re.Pattern]:
+    """One case-insensitive regex that matches a file name against every forbidden pattern."""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(p.lower())})" for p in patterns))
+
+def _matching_patterns(name: str, patterns: list[str]) -> list[str]:
+    lowered = name.lower()
+    return [p for p in patterns if fnmatch.fnmatch(lowered, p.lower())]
+
+class _DirCache:
+    """Directory mtime -> (forbidden file names, subdirectories) from the previous run.
+
+    A directory's mtime changes whenever an entry is added, removed or
+    renamed in it, which is all a name-based check can observe, so an
+    unchanged mtime means its listing can be reused without a scandir.
+    """
+
+    def __init__(self, path, signature: str):
+        self.path = path
+        self.signature = signature
+        self.previous = {}
+        self.current = {}
+        if path is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION and data.get("signature") == signature:
+                    self.previous = data.get("dirs", {})
+            except (OSError, ValueError):
+                pass
+
+    def save(self):
+        if self.path is None or self.current == self.previous:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "signature": self.signature, "dirs": self.current}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+def _scan_tree(root: str, ignore_dirs: set, matcher, cache: _DirCache, skip_root_files: bool):
+    """Return (directory, forbidden file name) pairs in os.walk order, and whether anything changed."""
+    changed = False
+    stack = [(root, skip_root_files)]
+    hits = []
+    while stack:
+        path, skip_files = stack.pop()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        entry = cache.previous.get(path)
+        if entry is not None and entry[0] == mtime:
+            forbidden, subdirs = entry[1], entry[2]
+        else:
+            changed = True
+            forbidden, subdirs = [], []
+            try:
+                with os.scandir(path) as it:
+                    for item in it:
+                        try:
+                            is_dir = item.is_dir()
+                        except OSError:
+                            is_dir = False
+                        if is_dir:
+                            # os.walk lists symlinked dirs but does not descend into them
+                            if item.name not in ignore_dirs and not item.is_symlink():
+                                subdirs.append(item.name)
+                        elif matcher is not None and matcher.match(item.name.lower()):
+                            forbidden.append(item.name)
+            except OSError:
+                continue
+        cache.current[path] = [mtime, forbidden, subdirs]
+        if not skip_files:
+            hits.extend((path, name) for name in forbidden)
+        stack.extend((os.path.join(path, d), False) for d in reversed(subdirs))
+    return hits, changed
+
+def _check_service(ms, workspace_path, project_root, settings, matcher, cache, fix):
+    require_dirs, require_files, forbid_patterns, enforce_flat, ignore_dirs = settings
+    ms_path = os.path.join(workspace_path, ms)
+    problems = []
+    # Check required subdirectories
+    for d in require_dirs:
+        subdir_path = os.path.join(ms_path, d)
+        if not os.path.isdir(subdir_path):
+            problems.append(f"[MISSING] {ms}/ Required subdirectory: {d}")
+            if fix:
+                try:
+                    os.makedirs(subdir_path, exist_ok=True)
+                except Exception as e:
+                    problems.append(f"[ERROR] Could not create directory {ms}/{d}: {e}")
+    # Check required files
+    for f in require_files:
+        file_path = os.path.join(ms_path, f)
+        if not os.path.isfile(file_path):
+            problems.append(f"[MISSING] {ms}/ Required file: {f}")
+    # Check forbidden files
+    with span("check.scan", service=ms) as s:
+        hits, changed = _scan_tree(ms_path, ignore_dirs, matcher, cache, os.path.basename(ms_path) in ignore_dirs)
+        s.set(changed=changed)
+    for root, file in hits:
+        for pattern in _matching_patterns(file, forbid_patterns):
+            rel_path = os.path.relpath(os.path.join(root, file), project_root)
+            problems.append(f"[FORBIDDEN] {ms}/ Matches '{pattern}': {rel_path}")
+    # Optionally check for flat src/ in each microservice
+    if enforce_flat:
+        src_path = os.path.join(ms_path, "src")
+        if os.path.isdir(src_path):
+            for item in os.listdir(src_path):
+                subpath = os.path.join(src_path, item)
+                if os.path.isdir(subpath):
+                    problems.append(f"[STRUCTURE] {ms}/src/ must be flat — subdirectory found: {item}")
+    return problems, changed
+
+def check_folder_integrity(base_path=None, fix=False, output_json=False,
+                           changed_only=False, use_cache=True) -> list[str]:
+    """Check every microservice under the workspace; services are checked in parallel.
+
+    With ``changed_only`` only services with a directory added, removed or
+    renamed since the previous run are reported.
+    """
+    config = get_config()
+    # Check the 'workspace' folder next to the config in use (the current project's, else ours) unless overridden
+    if config.path is not None:
+        project_root = str(config.path.parent)
+    else:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     if base_path is None:
         workspace_path = os.path.join(project_root, "workspace")
     else:
         workspace_path = base_path
-    try:
-        config = toml.load(os.path.join(project_root, "config.project.toml"))
-    except FileNotFoundError:
+    if config.path is None or not config.path.is_file():
         return [f"[ERROR] config.project.toml not found in {project_root}."]
 
-    integrity = config.get("integrity", {})
-    require_dirs = integrity.get("require_dirs", [])
-    require_files = integrity.get("require_files", [])
-    forbid_patterns = integrity.get("forbid_files", [])
-    enforce_flat = integrity.get("enforce_flat_src", False)
-    ignore_dirs = integrity.get("ignore_dirs", [])
-
-    problems = []
+    integrity = config.integrity
+    require_dirs = integrity.require_dirs
+    require_files = integrity.require_files
+    forbid_patterns = integrity.forbid_files
+    enforce_flat = integrity.enforce_flat_src
+    ignore_dirs = set(integrity.ignore_dirs)
 
     # Detect all top-level folders in workspace/ (microservices)
     try:
@@ -30,43 +163,37 @@ def check_folder_integrity(base_path=None, fix=False, output_json=False) -> list
     except FileNotFoundError:
         return [f"[ERROR] workspace folder not found at {workspace_path}."]
 
-    for ms in microservices:
-        ms_path = os.path.join(workspace_path, ms)
-        # Check required subdirectories
-        for d in require_dirs:
-            subdir_path = os.path.join(ms_path, d)
-            if not os.path.isdir(subdir_path):
-                problems.append(f"[MISSING] {ms}/ Required subdirectory: {d}")
-                if fix:
-                    try:
-                        os.makedirs(subdir_path, exist_ok=True)
-                    except Exception as e:
-                        problems.append(f"[ERROR] Could not create directory {ms}/{d}: {e}")
-        # Check required files
-        for f in require_files:
-            file_path = os.path.join(ms_path, f)
-            if not os.path.isfile(file_path):
-                problems.append(f"[MISSING] {ms}/ Required file: {f}")
-        # Check forbidden files
-        for root, dirs, files in os.walk(ms_path):
-            # Remove ignored dirs from traversal
-            dirs[:] = [d for d in dirs if d not in ignore_dirs]
-            if any(os.path.basename(root) == ignored for ignored in ignore_dirs):
-                continue
-            for file in files:
-                for pattern in forbid_patterns:
-                    if fnmatch.fnmatch(file.lower(), pattern.lower()):
-                        rel_path = os.path.relpath(os.path.join(root, file), project_root)
-                        problems.append(f"[FORBIDDEN] {ms}/ Matches '{pattern}': {rel_path}")
-        # Optionally check for flat src/ in each microservice
-        if enforce_flat:
-            src_path = os.path.join(ms_path, "src")
-            if os.path.isdir(src_path):
-                for item in os.listdir(src_path):
-                    subpath = os.path.join(src_path, item)
-                    if os.path.isdir(subpath):
-                        problems.append(f"[STRUCTURE] {ms}/src/ must be flat — subdirectory found: {item}")
+    signature = json.dumps([os.path.abspath(workspace_path), forbid_patterns, sorted(ignore_dirs)])
+    cache = _DirCache(state_dir() / "check_cache.json" if use_cache else None, signature)
+    matcher = compile_forbid_patterns(forbid_patterns)
+    settings = (require_dirs, require_files, forbid_patterns, enforce_flat, ignore_dirs)
+
+    problems = []
+    workers = min(len(microservices), (os.cpu_count() or 1) * 4) or 1
+    with span("check.walk", services=len(microservices), workers=workers), \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda ms: _check_service(ms, workspace_path, project_root, settings,
+                                                     matcher, cache, fix), microservices)
+        for service_problems, changed in results:
+            if changed or not changed_only:
+                problems.extend(service_problems)
+    with span("check.save_cache"):
+        cache.save()
 
     if output_json:
         print(json.dumps({"problems": problems}, indent=2, ensure_ascii=False))
     return problems
+
+def cmd_check(args) -> int:
+    issues = check_folder_integrity(fix=args.fix, output_json=args.json, changed_only=args.changed_only)
+    if issues:
+        if not args.json:
+            print("\n=== Folder Integrity Issues ===\n")
+            for issue in issues:
+                print(issue)
+            print(f"\nSummary: {len(issues)} issue(s) found.")
+        return 1
+    if not args.json:
+        print("✅ Folder structure looks good.")
+        print("Summary: No issues found.")
+    return 0
@@ -0,0 +1,405 @@
+# project_assistant/formatter.py
+"""Format microservices: Prettier for JS/TS/JSON/CSS/Markdown, Ruff for Python.
+
+Prettier runs in long-lived Node workers, one per Prettier install, that
+take files in batches as JSON lines over stdin/stdout, so Node starts
+once per run instead of once per file. Ruff is a native binary and
+formats each batch in one invocation. Files whose content has not
+changed since they were last formatted are skipped, using
+``.localdev/format_cache.json``; (service, formatter) jobs run in parallel.
+"""
+import atexit
+import collections
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from project_assistant.config import get_config
+from project_assistant.linter import ALWAYS_IGNORED, JS_EXTENSIONS, resolve_service_dir
+from project_assistant.tracing import span
+from project_assistant.utils import VersionedCache, load_service_registry, state_dir
+
+CACHE_VERSION = 1
+PRETTIER_EXTENSIONS = JS_EXTENSIONS + (".json", ".css", ".scss", ".md")
+# Generated by package managers; never hand-formatted
+SKIP_FILES = {"package-lock.json", "npm-shrinkwrap.json"}
+FORMATTER_CONFIGS = {
+    "prettier": [".prettierrc", ".prettierrc.json", ".prettierrc.yaml", ".prettierrc.yml", ".prettierrc.js",
+                 ".prettierrc.cjs", ".prettierrc.mjs", "prettier.config.js", "prettier.config.cjs",
+                 "prettier.config.mjs", ".prettierignore", ".editorconfig", "package.json"],
+    "ruff": ["pyproject.toml", "ruff.toml", ".ruff.toml"],
+}
+BATCH_SIZE = 200
+# Lines of a worker's stderr kept for the error message if it dies
+STDERR_TAIL = 20
+
+# Reads {"id", "path", "source"} lines and answers {"id", "output"|"ignored"|"error"} lines, in any order.
+# Works with Prettier 2 (synchronous API) and 3 (promises).
+PRETTIER_WORKER = r"""
+const path = require("path");
+const readline = require("readline");
+const prettier = require(process.argv[1]);
+const lines = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+lines.on("line", async (line) => {
+  const req = JSON.parse(line);
+  let reply;
+  try {
+    const ignorePath = path.join(req.root, ".prettierignore");
+    const info = await prettier.getFileInfo(req.path, { ignorePath });
+    if (info.ignored || !info.inferredParser) {
+      reply = { id: req.id, ignored: true };
+    } else {
+      const options = (await prettier.resolveConfig(req.path, { editorconfig: true })) || {};
+      reply = { id: req.id, output: await prettier.format(req.source, { ...options, filepath: req.path }) };
+    }
+  } catch (e) {
+    reply = { id: req.id, error: String((e && e.message) || e).split("\n")[0] };
+  }
+  process.stdout.write(JSON.stringify(reply) + "\n");
+});
+"""
+
+class FormatterError(Exception):
+    """A formatter could not run (missing tool, crash), as opposed to a file it could not parse."""
+
+def _walk(root: Path, extensions: tuple, ignore_dirs: set) -> list[str]:
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in ignore_dirs]
+        found.extend(os.path.relpath(os.path.join(dirpath, f), root)
+                     for f in filenames if f.endswith(extensions) and f not in SKIP_FILES)
+    return sorted(found)
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _config_digest(root: Path, formatter: str, tool: str) -> str:
+    """Formatter config files plus the tool's location and mtime, so an upgrade reformats everything."""
+    h = hashlib.sha256(formatter.encode("utf-8"))
+    try:
+        h.update(f"{tool}\0{os.stat(tool).st_mtime_ns}".encode("utf-8"))
+    except OSError:
+        h.update(tool.encode("utf-8"))
+    for name in FORMATTER_CONFIGS.get(formatter, []):
+        try:
+            h.update(name.encode("utf-8") + b"\0" + (root / name).read_bytes())
+        except OSError:
+            continue
+    return h.hexdigest()
+
+class _FormatCache(VersionedCache):
+    """abs path -> formatter -> {digest, stat, sha} of the file as it was last left formatted."""
+
+    def __init__(self, path: Optional[Path]):
+        super().__init__(path, CACHE_VERSION)
+
+    def is_formatted(self, abs_path: str, formatter: str, digest: str) -> bool:
+        """True if the file is unchanged since it was formatted; the content is only hashed if the stat changed."""
+        with self._lock:
+            entry = self.files.get(abs_path, {}).get(formatter)
+        if entry is None or entry["digest"] != digest:
+            return False
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            return False
+        stat = [st.st_mtime_ns, st.st_size]
+        if entry["stat"] == stat:
+            return True
+        try:
+            with open(abs_path, "rb") as f:
+                sha = _sha256(f.read())
+        except OSError:
+            return False
+        if sha != entry["sha"]:
+            return False
+        self.store(abs_path, formatter, digest, sha)  # touched, not edited: skip hashing next time
+        return True
+
+    def store(self, abs_path: str, formatter: str, digest: str, sha: Optional[str] = None):
+        try:
+            st = os.stat(abs_path)
+            if sha is None:
+                with open(abs_path, "rb") as f:
+                    sha = _sha256(f.read())
+        except OSError:
+            return
+        with self._lock:
+            self.files.setdefault(abs_path, {})[formatter] = {
+                "digest": digest, "stat": [st.st_mtime_ns, st.st_size], "sha": sha}
+            self._dirty = True
+
+class _Worker:
+    """A formatter process speaking one JSON object per line on stdin and stdout."""
+
+    def __init__(self, cmd: list[str]):
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     text=True, encoding="utf-8", errors="replace", bufsize=1 << 16)
+        self.broken = False
+        # Workers live across runs; an unread stderr pipe would fill up with warnings and stall them
+        self.stderr_tail = collections.deque(maxlen=STDERR_TAIL)
+        self._stderr_reader = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_reader.start()
+
+    def _drain_stderr(self):
+        for line in self.proc.stderr:
+            if line.strip():
+                self.stderr_tail.append(line.rstrip())
+
+    def request(self, items: list[dict]) -> dict:
+        """Send ``items`` (each with an "id") and return {id: reply} once every one is answered."""
+        def feed():
+            try:
+                for item in items:
+                    self.proc.stdin.write(json.dumps(item) + "\n")
+                self.proc.stdin.flush()
+            except OSError:
+                pass  # the worker died; the read below reports it
+        # Writing from a thread keeps a large batch from deadlocking against unread replies
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+        replies = {}
+        while len(replies) < len(items):
+            line = self.proc.stdout.readline()
+            if not line:
+                self.broken = True
+                self._stderr_reader.join(1)
+                raise FormatterError(self.stderr_tail[-1] if self.stderr_tail else "formatter worker exited")
+            reply = json.loads(line)
+            replies[reply["id"]] = reply
+        writer.join()
+        return replies
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(2)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+class _WorkerPool:
+    """Idle workers per command, reused by later batches and later runs in this process."""
+
+    def __init__(self):
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def acquire(self, cmd: list[str]):
+        key = tuple(cmd)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            worker = idle.pop() if idle else None
+        if worker is None or worker.proc.poll() is not None:
+            with span("format.spawn", cat="subprocess", cmd=cmd[0]):
+                worker = _Worker(cmd)
+        try:
+            yield worker
+        finally:
+            if worker.broken:
+                worker.close()
+            else:
+                with self._lock:
+                    self._idle[key].append(worker)
+
+    def close(self):
+        with self._lock:
+            workers = [w for idle in self._idle.values() for w in idle]
+            self._idle.clear()
+        for worker in workers:
+            worker.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> _WorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _WorkerPool()
+            atexit.register(_pool.close)
+        return _pool
+
+def prettier_dir(root: Path) -> Optional[Path]:
+    """The Prettier package the service resolves: its own node_modules, else one in a parent directory."""
+    for directory in [root, *root.parents]:
+        candidate = directory / "node_modules" / "prettier"
+        if (candidate / "package.json").exists():
+            return candidate
+    return None
+
+def _format_prettier(root: Path, files: list[str], check: bool) -> tuple[set, dict]:
+    """(files that changed or would change, {file: error}) for one batch."""
+    package = prettier_dir(root)
+    items = []
+    sources = {}
+    errors = {}
+    for i, rel in enumerate(files):
+        with open(root / rel, "rb") as f:
+            sources[rel] = f.read()
+        try:
+            text = sources[rel].decode("utf-8")
+        except UnicodeDecodeError:
+            errors[rel] = "not UTF-8"
+            continue
+        items.append({"id": i, "root": str(root), "path": str(root / rel), "source": text})
+    with get_pool().acquire([shutil.which("node"), "-e", PRETTIER_WORKER, str(package)]) as worker:
+        replies = worker.request(items)
+    changed = set()
+    for i, rel in enumerate(files):
+        reply = replies.get(i, {})
+        if rel in errors:
+            continue
+        if "error" in reply:
+            errors[rel] = reply["error"]
+            continue
+        if reply.get("ignored"):
+            continue
+        output = reply["output"].encode("utf-8")
+        if output != sources[rel]:
+            changed.add(rel)
+            if not check:
+                tmp = root / (rel + ".fmt.tmp")
+                tmp.write_bytes(output)
+                shutil.copymode(root / rel, tmp)
+                os.replace(tmp, root / rel)
+    return changed, errors
+
+def _format_ruff(root: Path, files: list[str], check: bool) -> tuple[set, dict]:
+    before = {}
+    if not check:
+        for rel in files:
+            with open(root / rel, "rb") as f:
+                before[rel] = _sha256(f.read())
+    cmd = ["ruff", "format", "--force-exclude"] + (["--diff"] if check else []) + ["--", *files]
+    proc = subprocess.run(cmd, cwd=root, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    # 0 formatted (or nothing to do), 1 --diff found changes, 2 errors
+    errors = {}
+    if proc.returncode not in (0, 1):
+        errors = {rel: "could not parse" for rel in files if rel in proc.stderr}
+        if not errors:
+            raise FormatterError(proc.stderr.strip() or f"ruff exited with code {proc.returncode}")
+    if check:
+        changed = {os.path.normpath(line[4:].strip()) for line in proc.stdout.splitlines()
+                   if line.startswith("--- ")}
+        return {rel for rel in files if os.path.normpath(rel) in changed}, errors
+    changed = set()
+    for rel in files:
+        with open(root / rel, "rb") as f:
+            if _sha256(f.read()) != before[rel]:
+                changed.add(rel)
+    return changed, errors
+
+RUNNERS = {"prettier": _format_prettier, "ruff": _format_ruff}
+
+def _plan(root: Path, ignore_dirs: set) -> list[tuple[str, str, list[str]]]:
+    """(formatter, tool path, files) triples that apply to the service at ``root``."""
+    jobs = []
+    js_files = _walk(root, PRETTIER_EXTENSIONS, ignore_dirs) if (root / "package.json").exists() else []
+    if js_files:
+        package = prettier_dir(root)
+        if package is None or not shutil.which("node"):
+            print(f"[WARN] Prettier not found for {root.name} (npm i -D prettier). Skipping JS formatting.",
+                  file=sys.stderr)
+        else:
+            jobs.append(("prettier", str(package / "package.json"), js_files))
+    py_files = _walk(root, (".py",), ignore_dirs)
+    if py_files:
+        ruff = shutil.which("ruff")
+        if ruff:
+            jobs.append(("ruff", ruff, py_files))
+        else:
+            print("[WARN] Ruff not found. Skipping Python formatting.", file=sys.stderr)
+    return jobs
+
+def _format_job(service: str, root: Path, formatter: str, tool: str, files: list[str],
+                cache: _FormatCache, check: bool) -> dict:
+    digest = _config_digest(root, formatter, tool)
+    stale = [rel for rel in files if not cache.is_formatted(str(root / rel), formatter, digest)]
+    changed, failed, error = [], {}, None
+    for start in range(0, len(stale), BATCH_SIZE):
+        batch = stale[start:start + BATCH_SIZE]
+        try:
+            with span(f"format.{formatter}", cat="subprocess", service=service, files=len(batch)):
+                batch_changed, batch_failed = RUNNERS[formatter](root, batch, check)
+        except (FormatterError, OSError, ValueError) as e:
+            error = f"{formatter} failed in {service}: {e}"
+            break
+        changed.extend(rel for rel in batch if rel in batch_changed)
+        failed.update(batch_failed)
+        for rel in batch:
+            # In --check mode only files that are already formatted are remembered as such
+            if rel not in batch_failed and (not check or rel not in batch_changed):
+                cache.store(str(root / rel), formatter, digest)
+    return {
+        "service": service,
+        "formatter": formatter,
+        "files": len(files),
+        "checked": len(stale),
+        "changed": changed,
+        "failed": failed,
+        "error": error,
+    }
+
+def format_services(services: list[str], cache_path: Optional[Path] = None, workers: Optional[int] = None,
+                    check: bool = False) -> dict:
+    """Format ``services`` (names or paths) in parallel; with ``check`` only report what would change."""
+    ignore_dirs = ALWAYS_IGNORED | set(get_config().integrity.ignore_dirs)
+    cache = _FormatCache(cache_path)
+    jobs, errors, roots = [], [], {}
+    for service in services:
+        root = resolve_service_dir(service)
+        if root is None:
+            errors.append(f"Service '{service}' not found.")
+            continue
+        root = root.absolute()
+        roots[service] = root
+        jobs.extend((service, root, formatter, tool, files) for formatter, tool, files in _plan(root, ignore_dirs))
+    workers = workers or min(len(jobs), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda job: _format_job(*job, cache, check), jobs))
+    seen = {str(root / f) for (_, root, _, _, files) in jobs for f in files}
+    for root in roots.values():
+        cache.forget_missing(str(root), seen)
+    cache.save()
+    errors.extend(r["error"] for r in results if r["error"])
+    return {"jobs": results, "errors": errors, "roots": {service: str(root) for service, root in roots.items()}}
+
+def cmd_format(args) -> int:
+    services = list(load_service_registry()) if args.all else list(args.service)
+    if not services:
+        args._parser.error("give a service name, several names, or --all")
+    report = format_services(services, state_dir() / "format_cache.json", workers=args.workers, check=args.check)
+    for error in report["errors"]:
+        print(f"[ERROR] {error}", file=sys.stderr)
+    verb = "Would reformat" if args.check else "Formatted"
+    changed = failed = 0
+    for job in report["jobs"]:
+        root = report["roots"][job["service"]]
+        for rel in job["changed"]:
+            print(f"{verb} {os.path.relpath(os.path.join(root, rel))}")
+        for rel, message in sorted(job["failed"].items()):
+            print(f"[ERROR] {os.path.relpath(os.path.join(root, rel))}: [{job['formatter']}] {message}",
+                  file=sys.stderr)
+        changed += len(job["changed"])
+        failed += len(job["failed"])
+    files = sum(job["files"] for job in report["jobs"])
+    checked = sum(job["checked"] for job in report["jobs"])
+    print(f"[INFO] {changed} file(s) {'to reformat' if args.check else 'reformatted'} in {len(services)} "
+          f"service(s); {checked} of {files} file(s) checked, the rest unchanged since the last format.",
+          file=sys.stderr)
+    if report["errors"] or failed:
+        return 2
+    return 1 if args.check and changed else 0
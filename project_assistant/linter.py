@@ -0,0 +1,322 @@
+# project_assistant/linter.py
+"""Lint microservices: ESLint for JS, Ruff or flake8 for Python.
+
+Each (service, linter) pair runs as its own job, in parallel. A linter
+only sees files whose content changed since the last run; findings for
+the rest come from ``.localdev/lint_cache.json``, keyed by the file's
+content hash and a digest of the linter's config files.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from project_assistant.config import get_config
+from project_assistant.service_index import resolve_service
+from project_assistant.tracing import span
+from project_assistant.utils import VersionedCache, load_service_registry, state_dir
+
+CACHE_VERSION = 1
+JS_EXTENSIONS = (".js", ".mjs", ".cjs", ".jsx", ".ts", ".tsx")
+ALWAYS_IGNORED = {"node_modules", ".git", "__pycache__", ".venv", "venv", ".localdev"}
+# Files in a service root whose content changes what a linter reports
+LINTER_CONFIGS = {
+    "eslint": [".eslintrc", ".eslintrc.js", ".eslintrc.cjs", ".eslintrc.json", ".eslintrc.yml",
+               ".eslintrc.yaml", "eslint.config.js", "eslint.config.mjs", "eslint.config.cjs", "package.json"],
+    "ruff": ["pyproject.toml", "ruff.toml", ".ruff.toml"],
+    "flake8": [".flake8", "setup.cfg", "tox.ini"],
+}
+# Keep command lines well under Windows' 32k character limit
+BATCH_SIZE = 200
+FLAKE8_LINE = re.compile(r"^(.*?):(\d+):(\d+): (\S+) (.*)$")
+
+@dataclass
+class Finding:
+    service: str
+    linter: str
+    path: str  # relative to the service root
+    line: int
+    column: int
+    rule: str
+    message: str
+    level: str = "error"  # SARIF levels: error, warning, note
+
+class LinterError(Exception):
+    """A linter could not run (bad config, crash), as opposed to reporting findings."""
+
+def resolve_service_dir(service: str) -> Optional[Path]:
+    """``service`` as the service index resolves it (index.toml paths too), else as a path or a workspace/ folder."""
+    entry = resolve_service(service)
+    if entry is not None:
+        return Path(entry.root)
+    for service_root in (Path(service), Path("workspace") / service):
+        if service_root.exists():
+            return service_root
+    return None
+
+def _walk(root: Path, extensions: tuple, ignore_dirs: set) -> list[str]:
+    """Paths (relative to ``root``) of files with one of ``extensions``, sorted."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in ignore_dirs]
+        found.extend(os.path.relpath(os.path.join(dirpath, f), root)
+                     for f in filenames if f.endswith(extensions))
+    return sorted(found)
+
+def _tool_path(root: Path, linter: str) -> str:
+    """The file that identifies the installed linter: the service's own ESLint package, else the executable."""
+    if linter == "eslint":
+        package = root / "node_modules" / "eslint" / "package.json"
+        if package.exists():
+            return str(package)
+    return shutil.which(linter) or linter
+
+def _config_digest(root: Path, linter: str) -> str:
+    """Linter config files plus the linter's location and mtime, so an upgrade re-lints everything."""
+    h = hashlib.sha256(linter.encode("utf-8"))
+    tool = _tool_path(root, linter)
+    try:
+        h.update(f"{tool}\0{os.stat(tool).st_mtime_ns}".encode("utf-8"))
+    except OSError:
+        h.update(tool.encode("utf-8"))
+    for name in LINTER_CONFIGS.get(linter, []):
+        try:
+            h.update(name.encode("utf-8") + b"\0" + (root / name).read_bytes())
+        except OSError:
+            continue
+    return h.hexdigest()
+
+class _LintCache(VersionedCache):
+    """abs path -> linter -> {digest, stat, sha, findings} from previous runs."""
+
+    def __init__(self, path: Optional[Path]):
+        super().__init__(path, CACHE_VERSION)
+
+    def lookup(self, abs_path: str, linter: str, digest: str) -> tuple[Optional[list], Optional[list], Optional[str]]:
+        """(cached findings or None, stat, sha); the content is only hashed if the stat changed."""
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            return None, None, None
+        stat = [st.st_mtime_ns, st.st_size]
+        with self._lock:
+            entry = self.files.get(abs_path, {}).get(linter)
+        if entry is None or entry["digest"] != digest:
+            return None, stat, None
+        if entry["stat"] == stat:
+            return entry["findings"], stat, entry["sha"]
+        sha = _sha256(abs_path)
+        if sha == entry["sha"]:
+            # Touched but unchanged: remember the new stat so the next run skips hashing
+            self.store(abs_path, linter, digest, stat, sha, entry["findings"])
+            return entry["findings"], stat, sha
+        return None, stat, sha
+
+    def store(self, abs_path: str, linter: str, digest: str, stat, sha: Optional[str], findings: list):
+        with self._lock:
+            self.files.setdefault(abs_path, {})[linter] = {
+                "digest": digest, "stat": stat, "sha": sha or _sha256(abs_path), "findings": findings}
+            self._dirty = True
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _eslint_command(root: Path) -> Optional[list[str]]:
+    local = root / "node_modules" / ".bin" / ("eslint.cmd" if os.name == "nt" else "eslint")
+    if local.exists():
+        return [str(local)]
+    return ["eslint"] if shutil.which("eslint") else None
+
+def _run_eslint(root: Path, files: list[str]) -> dict[str, list]:
+    proc = subprocess.run(_eslint_command(root) + ["-f", "json", *files], cwd=root,
+                          capture_output=True, text=True, encoding="utf-8", errors="replace")
+    # 1 means "found problems"; anything else non-zero is a config error or crash
+    if proc.returncode not in (0, 1):
+        raise LinterError(proc.stderr.strip() or proc.stdout.strip())
+    results = {}
+    for item in json.loads(proc.stdout or "[]"):
+        results[os.path.relpath(item["filePath"], root)] = [
+            [m.get("line", 0), m.get("column", 0), m.get("ruleId") or "eslint", m.get("message", ""),
+             "error" if m.get("severity") == 2 else "warning"]
+            for m in item.get("messages", [])]
+    return results
+
+def _run_ruff(root: Path, files: list[str]) -> dict[str, list]:
+    proc = subprocess.run(["ruff", "check", "--output-format", "json", "--exit-zero", *files], cwd=root,
+                          capture_output=True, text=True, encoding="utf-8", errors="replace")
+    if proc.returncode != 0:
+        raise LinterError(proc.stderr.strip())
+    results = {}
+    for item in json.loads(proc.stdout or "[]"):
+        location = item.get("location") or {}
+        results.setdefault(os.path.relpath(item["filename"], root), []).append(
+            [location.get("row", 0), location.get("column", 0), item.get("code") or "ruff",
+             item.get("message", ""), "error"])
+    return results
+
+def _run_flake8(root: Path, files: list[str]) -> dict[str, list]:
+    proc = subprocess.run(["flake8", "--max-line-length=120", "--exit-zero", *files], cwd=root,
+                          capture_output=True, text=True, encoding="utf-8", errors="replace")
+    if proc.returncode != 0:
+        raise LinterError(proc.stderr.strip())
+    results = {}
+    for line in proc.stdout.splitlines():
+        m = FLAKE8_LINE.match(line)
+        if m:
+            path, row, col, code, message = m.groups()
+            results.setdefault(os.path.normpath(path), []).append([int(row), int(col), code, message, "error"])
+    return results
+
+RUNNERS = {"eslint": _run_eslint, "ruff": _run_ruff, "flake8": _run_flake8}
+
+def _plan(root: Path, ignore_dirs: set) -> list[tuple[str, list[str]]]:
+    """(linter, files) pairs that apply to the service at ``root``."""
+    jobs = []
+    if (root / "package.json").exists():
+        src = root / "src"
+        if _eslint_command(root) is None:
+            print("[WARN] ESLint not found. Skipping JS lint.", file=sys.stderr)
+        elif src.is_dir():
+            jobs.append(("eslint", [os.path.join("src", f) for f in _walk(src, JS_EXTENSIONS, ignore_dirs)]))
+    py_files = _walk(root, (".py",), ignore_dirs)
+    if py_files:
+        if shutil.which("ruff"):
+            jobs.append(("ruff", py_files))
+        elif shutil.which("flake8"):
+            jobs.append(("flake8", py_files))
+        else:
+            print("[WARN] Ruff/flake8 not found. Skipping Python lint.", file=sys.stderr)
+    return jobs
+
+def _lint_job(service: str, root: Path, linter: str, files: list[str], cache: _LintCache) -> dict:
+    digest = _config_digest(root, linter)
+    findings = {}
+    stale = []
+    for rel in files:
+        abs_path = str(root / rel)
+        cached, stat, sha = cache.lookup(abs_path, linter, digest)
+        if cached is None:
+            stale.append((rel, abs_path, stat, sha))
+        else:
+            findings[rel] = cached
+    error = None
+    for start in range(0, len(stale), BATCH_SIZE):
+        batch = stale[start:start + BATCH_SIZE]
+        try:
+            with span(f"lint.{linter}", cat="subprocess", service=service, files=len(batch)):
+                results = RUNNERS[linter](root, [rel for rel, _, _, _ in batch])
+        except (LinterError, OSError, ValueError) as e:
+            error = f"{linter} failed in {service}: {e}"
+            break
+        for rel, abs_path, stat, sha in batch:
+            findings[rel] = results.get(os.path.normpath(rel), [])
+            cache.store(abs_path, linter, digest, stat, sha, findings[rel])
+    return {
+        "service": service,
+        "linter": linter,
+        "findings": [Finding(service, linter, rel, *item) for rel in sorted(findings) for item in findings[rel]],
+        "files": len(files),
+        "relinted": len(stale),
+        "error": error,
+    }
+
+def lint_services(services: list[str], cache_path: Optional[Path] = None, workers: Optional[int] = None) -> dict:
+    """Lint ``services`` (names or paths) in parallel; returns findings, per-job stats and errors."""
+    ignore_dirs = ALWAYS_IGNORED | set(get_config().integrity.ignore_dirs)
+    cache = _LintCache(cache_path)
+    jobs, errors, roots = [], [], {}
+    for service in services:
+        root = resolve_service_dir(service)
+        if root is None:
+            errors.append(f"Service '{service}' not found.")
+            continue
+        root = root.absolute()
+        roots[service] = root
+        jobs.extend((service, root, linter, files) for linter, files in _plan(root, ignore_dirs))
+    workers = workers or min(len(jobs), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda job: _lint_job(*job, cache), jobs))
+    seen = {str(root / f) for (_, root, _, files) in jobs for f in files}
+    for root in roots.values():
+        cache.forget_missing(str(root), seen)
+    cache.save()
+    errors.extend(r["error"] for r in results if r["error"])
+    return {
+        "findings": [f for r in results for f in r["findings"]],
+        "jobs": [{k: r[k] for k in ("service", "linter", "files", "relinted")} for r in results],
+        "errors": errors,
+        "roots": {service: str(root) for service, root in roots.items()},
+    }
+
+def finding_path(report: dict, f: Finding) -> str:
+    """Path of a finding relative to the current directory."""
+    return os.path.relpath(os.path.join(report["roots"][f.service], f.path))
+
+def exit_code(report: dict) -> int:
+    """0 clean, 1 if any linter reported an error, 2 if a service or linter could not be checked."""
+    if report["errors"]:
+        return 2
+    return 1 if any(f.level == "error" for f in report["findings"]) else 0
+
+def to_sarif(report: dict) -> dict:
+    """SARIF 2.1.0 with one run per linter; artifact URIs are relative to the current directory."""
+    runs = {}
+    for f in report["findings"]:
+        run = runs.setdefault(f.linter, {"tool": {"driver": {"name": f.linter, "rules": []}}, "results": []})
+        uri = Path(finding_path(report, f)).as_posix()
+        run["results"].append({
+            "ruleId": f.rule,
+            "level": f.level,
+            "message": {"text": f.message},
+            "locations": [{"physicalLocation": {
+                "artifactLocation": {"uri": uri},
+                "region": {"startLine": max(f.line, 1), "startColumn": max(f.column, 1)},
+            }}],
+            "properties": {"service": f.service},
+        })
+    for run in runs.values():
+        run["tool"]["driver"]["rules"] = [{"id": rule} for rule in sorted({r["ruleId"] for r in run["results"]})]
+    return {
+        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "version": "2.1.0",
+        "runs": list(runs.values()),
+    }
+
+def cmd_lint(args) -> int:
+    services = list(load_service_registry()) if args.all else list(args.service)
+    if not services:
+        args._parser.error("give a service name, several names, or --all")
+    report = lint_services(services, state_dir() / "lint_cache.json", workers=args.workers)
+    for error in report["errors"]:
+        print(f"[ERROR] {error}", file=sys.stderr)
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        if args.format == "json":
+            json.dump({"findings": [asdict(f) for f in report["findings"]], "jobs": report["jobs"],
+                       "errors": report["errors"]}, out, indent=2, ensure_ascii=False)
+            out.write("\n")
+        elif args.format == "sarif":
+            json.dump(to_sarif(report), out, indent=2, ensure_ascii=False)
+            out.write("\n")
+        else:
+            for f in report["findings"]:
+                out.write(f"{finding_path(report, f)}:{f.line}:{f.column}: [{f.linter}] {f.rule} {f.message}\n")
+    finally:
+        if args.out:
+            out.close()
+    files = sum(job["files"] for job in report["jobs"])
+    relinted = sum(job["relinted"] for job in report["jobs"])
+    print(f"[INFO] {len(report['findings'])} finding(s) in {len(services)} service(s); "
+          f"{relinted} of {files} file(s) re-linted.", file=sys.stderr)
+    return exit_code(report)
@@ -0,0 +1,348 @@
+# project_assistant/loadgen.py
+"""`bench <service>`: an asyncio HTTP load generator for registered services.
+
+Each of ``concurrency`` keep-alive connections is a coroutine speaking
+plain HTTP/1.1 over ``asyncio.open_connection``, so a single process can
+drive thousands of requests per second without extra dependencies.
+
+With ``rate`` 0 the loop is closed: every connection sends its next
+request as soon as the previous one is answered. With a rate, requests
+are due on a fixed schedule and their latency is measured from when they
+were due, not when a free connection got to send them, so a slow service
+cannot hide its queueing delay by slowing the generator down.
+
+The report (throughput, p50/p95/p99 latency, status counts) is printed as
+JSON and compared with ``.localdev/bench/<service>.json`` when that
+baseline exists; ``--save-baseline`` writes it.
+"""
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from dataclasses import asdict, replace
+from pathlib import Path
+from typing import Optional
+
+from project_assistant.config import BenchSettings, service_config
+from project_assistant.service_index import resolve_service
+from project_assistant.services import wait_for_port
+from project_assistant.utils import state_dir
+from project_assistant import tracing
+
+HOST = "127.0.0.1"
+PERCENTILES = (50, 95, 99)
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_DELTA_MS = 1.0
+# The generator's own CPU use, as a fraction of the run, above which it is the bottleneck
+CLIENT_SATURATED = 0.9
+
+class ProtocolError(Exception):
+    pass
+
+class _Connection:
+    """One keep-alive HTTP/1.1 connection; reopened after errors or ``Connection: close``."""
+
+    def __init__(self, host: str, port: int, request: bytes, head: bool):
+        self.host = host
+        self.port = port
+        self.request = request
+        self.head = head
+        self.reader = None
+        self.writer = None
+
+    async def exchange(self) -> int:
+        """Send the request and read the whole response; returns the status code."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(self.request)
+        await self.writer.drain()
+        status, headers = await self._read_head()
+        keep = headers.get("connection", "").lower() != "close"
+        if self.head or status in (204, 304) or 100 <= status < 200:
+            pass
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            await self._read_chunked()
+        elif "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            await self.reader.read()  # body runs to EOF
+            keep = False
+        if not keep:
+            self.close()
+        return status
+
+    async def _read_head(self) -> tuple[int, dict]:
+        line = await self.reader.readline()
+        parts = line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise ProtocolError(f"bad status line {line[:60]!r}" if line else "connection closed")
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n"):
+                break
+            if not line:
+                raise ProtocolError("connection closed in headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return int(parts[1]), headers
+
+    async def _read_chunked(self):
+        while True:
+            size = int((await self.reader.readline()).split(b";", 1)[0], 16)
+            if size == 0:
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # trailers
+                return
+            await self.reader.readexactly(size + 2)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+def build_request(method: str, path: str, host: str, port: int) -> bytes:
+    return (f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUser-Agent: localdev-bench\r\n"
+            f"Accept: */*\r\nContent-Length: 0\r\n\r\n").encode("latin-1")
+
+class LoadGenerator:
+    """Drives ``host:port`` with ``settings``; the connections stay open across warm-up and measurement."""
+
+    def __init__(self, port: int, settings: BenchSettings, host: str = HOST):
+        self.settings = settings
+        request = build_request(settings.method.upper(), settings.path, host, port)
+        head = settings.method.upper() == "HEAD"
+        self.connections = [_Connection(host, port, request, head) for _ in range(max(1, settings.concurrency))]
+
+    async def run(self, duration: float) -> dict:
+        """Load for ``duration`` seconds; returns the raw samples of that phase."""
+        phase = {"latencies": [], "status": {}, "errors": {}, "next": 0}
+        start = time.perf_counter()
+        cpu = time.process_time()
+        end = start + duration
+        await asyncio.gather(*(self._worker(conn, phase, start, end) for conn in self.connections))
+        phase["elapsed"] = time.perf_counter() - start
+        phase["client_cpu"] = (time.process_time() - cpu) / phase["elapsed"] if phase["elapsed"] else 0.0
+        return phase
+
+    async def _worker(self, conn: _Connection, phase: dict, start: float, end: float):
+        rate = self.settings.rate
+        while True:
+            if rate > 0:
+                # Claim the next slot of the shared schedule and wait for it to come due
+                due = start + phase["next"] / rate
+                phase["next"] += 1
+                if due >= end:
+                    return
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                due = time.perf_counter()
+                if due >= end:
+                    return
+            try:
+                status = await asyncio.wait_for(conn.exchange(), self.settings.timeout)
+            except (OSError, EOFError, ValueError, ProtocolError, asyncio.IncompleteReadError,
+                    asyncio.TimeoutError) as e:
+                kind = "timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+                phase["errors"][kind] = phase["errors"].get(kind, 0) + 1
+                conn.close()
+                if rate <= 0:
+                    await asyncio.sleep(0.01)  # a refused connection would otherwise spin
+                continue
+            phase["latencies"].append(time.perf_counter() - due)
+            phase["status"][str(status)] = phase["status"].get(str(status), 0) + 1
+
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+
+def percentile(ordered: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+def summarize(phase: dict) -> dict:
+    ordered = sorted(phase["latencies"])
+    ok = sum(n for status, n in phase["status"].items() if int(status) < 400)
+    failed = sum(phase["errors"].values()) + sum(n for status, n in phase["status"].items() if int(status) >= 500)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    latency = {"min": ms(ordered[0]) if ordered else 0.0,
+               "mean": ms(sum(ordered) / len(ordered)) if ordered else 0.0}
+    latency.update({f"p{p}": ms(percentile(ordered, p)) for p in PERCENTILES})
+    latency["max"] = ms(ordered[-1]) if ordered else 0.0
+    return {
+        "requests": len(ordered) + sum(phase["errors"].values()),
+        "ok": ok,
+        "errors": failed,
+        "error_kinds": phase["errors"],
+        "status": phase["status"],
+        "elapsed": round(phase["elapsed"], 3),
+        "throughput": round(ok / phase["elapsed"], 1) if phase["elapsed"] else 0.0,
+        "latency_ms": latency,
+        "client_cpu": round(phase["client_cpu"], 2),
+    }
+
+async def _bench(port: int, settings: BenchSettings) -> dict:
+    generator = LoadGenerator(port, settings)
+    try:
+        if settings.warmup > 0:
+            with tracing.span("bench.warmup", seconds=settings.warmup):
+                await generator.run(settings.warmup)
+        with tracing.span("bench.measure", seconds=settings.duration):
+            return summarize(await generator.run(settings.duration))
+    finally:
+        generator.close()
+
+def run_load(port: int, settings: BenchSettings) -> dict:
+    """Warm up, then measure ``HOST:port``; returns the summary (see ``summarize``)."""
+    return asyncio.run(_bench(port, settings))
+
+def baseline_path(service: str) -> Path:
+    return state_dir() / "bench" / f"{service}.json"
+
+def load_baseline(path: Path) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return report if isinstance(report, dict) and "latency_ms" in report else None
+
+def save_baseline(path: Path, report: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({k: v for k, v in report.items() if k != "baseline"}, f, indent=2)
+    os.replace(tmp, path)
+
+def compare(baseline: dict, report: dict, tolerance: float) -> dict:
+    """Per-metric change against ``baseline``; a metric regresses past ``tolerance`` (relative)."""
+    metrics = {}
+    before, after = baseline["throughput"], report["throughput"]
+    change = (after - before) / before if before else 0.0
+    metrics["throughput"] = {"before": before, "after": after, "change": round(change, 4),
+                             "regression": before > 0 and change < -tolerance}
+    for p in PERCENTILES:
+        key = f"p{p}"
+        before, after = baseline["latency_ms"][key], report["latency_ms"][key]
+        change = (after - before) / before if before else 0.0
+        metrics[key] = {"before": before, "after": after, "change": round(change, 4),
+                        "regression": change > tolerance and after - before > MIN_DELTA_MS}
+    return {"time": baseline.get("time"), "tolerance": tolerance, "metrics": metrics,
+            "regressions": [name for name, m in metrics.items() if m["regression"]]}
+
+def _params(report: dict) -> dict:
+    return {k: report.get(k) for k in ("path", "method", "concurrency", "rate")}
+
+def print_comparison(comparison: dict, out=sys.stderr):
+    for name, m in comparison["metrics"].items():
+        unit = " req/s" if name == "throughput" else " ms"
+        mark = "  REGRESSION" if m["regression"] else ""
+        print(f"  {name:<10} {m['before']:>10.1f}{unit} -> {m['after']:>10.1f}{unit} ({m['change'] * 100:+6.1f}%){mark}",
+              file=out)
+
+def _stop(proc: subprocess.Popen, grace: float = 5.0):
+    proc.terminate()
+    try:
+        proc.wait(grace)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+def start_service(entry, port: int, timeout: float) -> Optional[subprocess.Popen]:
+    """Start ``entry`` the way `run` does and wait for its port; None if it did not come up."""
+    cmd, entrypoint = entry.launch
+    log_path = state_dir() / "logs" / f"{entry.name}.bench.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "wb") as log:
+        proc = subprocess.Popen([cmd, entrypoint], stdout=log, stderr=subprocess.STDOUT,
+                                env=dict(os.environ, PORT=str(port)))
+    tracing.process(proc, f"{entry.name}: {os.path.basename(cmd)} {os.path.basename(entrypoint)}", port=port)
+    if wait_for_port(port, proc, timeout):
+        return proc
+    print(f"[ERROR] '{entry.name}' did not accept connections on port {port} within {timeout:.0f}s; "
+          f"see {log_path}.", file=sys.stderr)
+    if proc.poll() is None:
+        _stop(proc)
+    return None
+
+def bench_settings(root, args) -> BenchSettings:
+    """[bench] for the service at ``root``, with command-line options laid over it."""
+    settings = service_config(root).bench
+    overrides = {name: getattr(args, name, None)
+                 for name in ("path", "concurrency", "rate", "duration", "warmup")}
+    return replace(settings, **{k: v for k, v in overrides.items() if v is not None})
+
+def cmd_bench(args) -> int:
+    entry = resolve_service(args.service)
+    if entry is None:
+        print(f"[ERROR] Could not find service root for '{args.service}'.", file=sys.stderr)
+        return 2
+    if not entry.port:
+        print(f"[ERROR] '{args.service}' has no port in workspace/index.toml or service.toml.", file=sys.stderr)
+        return 2
+    settings = bench_settings(entry.root, args)
+    proc = None
+    if wait_for_port(entry.port, timeout=0.2):
+        print(f"[INFO] '{entry.name}' is already listening on port {entry.port}; benchmarking it as is.",
+              file=sys.stderr)
+    elif not entry.launch:
+        print(f"[ERROR] '{entry.name}' is not running and has no entrypoint to start it with.", file=sys.stderr)
+        return 3
+    else:
+        print(f"[INFO] Starting '{entry.name}' on port {entry.port}...", file=sys.stderr)
+        proc = start_service(entry, entry.port, service_config(entry.root).run.ready_timeout)
+        if proc is None:
+            return 3
+    mode = f"{settings.rate:g} req/s" if settings.rate > 0 else "closed loop"
+    print(f"[INFO] {settings.method} http://{HOST}:{entry.port}{settings.path}: {settings.concurrency} connection(s), "
+          f"{mode}, {settings.warmup:g}s warm-up + {settings.duration:g}s measured.", file=sys.stderr)
+    try:
+        summary = run_load(entry.port, settings)
+    except KeyboardInterrupt:
+        print("[WARN] Interrupted; no report.", file=sys.stderr)
+        return 130
+    finally:
+        if proc is not None:
+            _stop(proc)
+    report = {"service": entry.name, "url": f"http://{HOST}:{entry.port}{settings.path}", "time": time.time(),
+              **{k: v for k, v in asdict(settings).items() if k not in ("duration", "warmup", "tolerance")},
+              **summary}
+    if summary["client_cpu"] >= CLIENT_SATURATED:
+        print(f"[WARN] The load generator used {summary['client_cpu']:.0%} of a core; the numbers may reflect "
+              "the client rather than the service. Lower --concurrency or set --rate.", file=sys.stderr)
+    if not summary["ok"]:
+        print(f"[ERROR] No successful responses ({summary['error_kinds'] or summary['status']}).", file=sys.stderr)
+        print(json.dumps(report, indent=2))
+        return 1
+
+    path = Path(args.baseline) if args.baseline else baseline_path(entry.name)
+    baseline = load_baseline(path)
+    code = 0
+    if baseline is not None:
+        if _params(baseline) != _params(report):
+            print(f"[WARN] The baseline was taken with {_params(baseline)}; latencies may not be comparable.",
+                  file=sys.stderr)
+        report["baseline"] = compare(baseline, report, settings.tolerance)
+        print(f"[INFO] Against the baseline in {path}:", file=sys.stderr)
+        print_comparison(report["baseline"])
+        if report["baseline"]["regressions"]:
+            code = 1
+    elif not args.save_baseline:
+        print(f"[INFO] No baseline at {path}; rerun with --save-baseline to record one.", file=sys.stderr)
+    if args.save_baseline:
+        save_baseline(path, report)
+        print(f"[INFO] Saved the baseline to {path}.", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return code
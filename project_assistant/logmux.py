@@ -0,0 +1,274 @@
+# project_assistant/logmux.py
+"""One-thread log multiplexer for supervised child processes.
+
+All children's stdout/stderr pipes are read by a single loop with large
+non-blocking reads. Every line goes to a per-service ring buffer, a
+size-rotated log file under ``.localdev/logs`` and the terminal; each
+read round is written to the terminal in one batch.
+"""
+import atexit
+import collections
+import os
+import queue
+import selectors
+import sys
+import threading
+from pathlib import Path
+from typing import Optional, TextIO
+
+from project_assistant.config import get_config
+from project_assistant.utils import state_dir
+
+READ_SIZE = 64 * 1024
+# Longest line kept whole; a child writing without newlines is passed on in pieces of this size
+MAX_LINE = 64 * 1024
+DEFAULT_RING_LINES = 1000
+DEFAULT_LOG_MAX_MB = 5
+DEFAULT_LOG_BACKUPS = 3
+
+class _RotatingLog:
+    """Append-only log file rotated to ``.1`` .. ``.N`` once it exceeds ``max_bytes``."""
+
+    def __init__(self, path: Path, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "ab")
+        self.size = self._file.tell()
+
+    def write(self, data: bytes):
+        if self.size and self.size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self.size += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        self._file = open(self.path, "wb")
+        self.size = 0
+
+    def close(self):
+        self._file.close()
+
+class _Stream:
+    __slots__ = ("name", "fileobj", "partial")
+
+    def __init__(self, name: str, fileobj):
+        self.name = name
+        self.fileobj = fileobj
+        self.partial = b""
+
+class LogMux:
+    def __init__(self, out: Optional[TextIO] = None, ring_lines: int = DEFAULT_RING_LINES,
+                 log_dir: Optional[Path] = None, max_bytes: int = DEFAULT_LOG_MAX_MB * 1024 * 1024,
+                 backups: int = DEFAULT_LOG_BACKUPS):
+        self.out = out or sys.stdout
+        self.ring_lines = ring_lines
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rings = {}
+        self._logs = {}
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        if os.name == "nt":
+            # Windows cannot select() on pipes: one blocking reader thread per pipe feeds the loop
+            self._queue = queue.SimpleQueue()
+        else:
+            self._selector = selectors.DefaultSelector()
+            self._pending = collections.deque()
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            os.set_blocking(self._wake_w, False)
+            self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread = threading.Thread(target=self._run, name="logmux", daemon=True)
+        self._thread.start()
+
+    def add(self, proc, name: str):
+        """Start multiplexing ``proc``'s stdout and stderr under ``name``."""
+        for fileobj in (proc.stdout, proc.stderr):
+            if fileobj is None:
+                continue
+            stream = _Stream(name, fileobj)
+            with self._cond:
+                self._open += 1
+            if os.name == "nt":
+                threading.Thread(target=self._pump, args=(stream,), daemon=True).start()
+            else:
+                os.set_blocking(fileobj.fileno(), False)
+                self._pending.append(stream)
+                self._wake()
+
+    def tail(self, name: str, n: int = 50) -> list[str]:
+        """The last ``n`` lines ``name`` produced in this process."""
+        with self._cond:
+            ring = self.rings.get(name)
+            lines = list(ring)[-n:] if ring else []
+        return [line.decode("utf-8", errors="replace") for line in lines]
+
+    def close(self, timeout: float = 2.0):
+        """Wait up to ``timeout`` for open pipes to drain, then stop the loop."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._open == 0, timeout)
+            self._stopped = True
+        if os.name == "nt":
+            self._queue.put(None)
+        else:
+            self._wake()
+        self._thread.join(timeout)
+        for log in self._logs.values():
+            log.close()
+        self._logs.clear()
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+
+    def _pump(self, stream: _Stream):
+        read = getattr(stream.fileobj, "read1", stream.fileobj.read)
+        while True:
+            data = read(READ_SIZE)
+            self._queue.put((stream, data))
+            if not data:
+                return
+
+    def _run(self):
+        while True:
+            batch = collections.defaultdict(list)
+            if os.name == "nt":
+                item = self._queue.get()
+                while item is not None:
+                    self._consume(*item, batch)
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                stop = item is None
+            else:
+                stop = self._select_round(batch)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _select_round(self, batch) -> bool:
+        for key, _ in self._selector.select():
+            if key.data is None:
+                try:
+                    while os.read(self._wake_r, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                while self._pending:
+                    stream = self._pending.popleft()
+                    self._selector.register(stream.fileobj, selectors.EVENT_READ, stream)
+                if self._stopped:
+                    return True
+                continue
+            try:
+                data = os.read(key.fd, READ_SIZE)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            if not data:
+                self._selector.unregister(key.fileobj)
+            self._consume(key.data, data, batch)
+        return False
+
+    def _consume(self, stream: _Stream, data: bytes, batch):
+        if data:
+            data = stream.partial + data
+            lines = data.split(b"\n")
+            stream.partial = lines.pop()
+            if len(stream.partial) >= MAX_LINE:
+                partial = stream.partial
+                cut = len(partial) - len(partial) % MAX_LINE
+                lines.extend(partial[i:i + MAX_LINE] for i in range(0, cut, MAX_LINE))
+                stream.partial = partial[cut:]
+        else:
+            # EOF: emit whatever is left without a trailing newline
+            lines = [stream.partial] if stream.partial else []
+            stream.partial = b""
+            try:
+                stream.fileobj.close()
+            except OSError:
+                pass
+            with self._cond:
+                self._open -= 1
+                self._cond.notify_all()
+        if lines:
+            batch[stream.name].extend(lines)
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        chunks = []
+        for name, lines in batch.items():
+            lines = [line.rstrip() for line in lines]
+            with self._cond:
+                ring = self.rings.get(name)
+                if ring is None:
+                    ring = self.rings[name] = collections.deque(maxlen=self.ring_lines)
+                ring.extend(lines)
+            body = b"\n".join(lines) + b"\n"
+            prefix = f"[{name}] ".encode("utf-8")
+            chunks.append(prefix + body.replace(b"\n", b"\n" + prefix)[:-len(prefix)])
+            if self.log_dir is not None:
+                log = self._logs.get(name)
+                if log is None:
+                    log = self._logs[name] = _RotatingLog(self.log_dir / f"{name}.log", self.max_bytes, self.backups)
+                log.write(body)
+        # Decode once per batch rather than once per line
+        self.out.write(b"".join(chunks).decode("utf-8", errors="replace"))
+        self.out.flush()
+
+def tail_log_file(name: str, n: int = 50, log_dir: Optional[Path] = None) -> list[str]:
+    """Last ``n`` lines of ``name``'s log, reading into rotated files if needed."""
+    log_dir = log_dir or state_dir() / "logs"
+    lines = []
+    candidates = [log_dir / f"{name}.log"] + sorted(
+        log_dir.glob(f"{name}.log.*"), key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0)
+    for path in candidates:
+        if len(lines) >= n:
+            break
+        try:
+            lines = path.read_text(encoding="utf-8", errors="replace").splitlines() + lines
+        except FileNotFoundError:
+            continue
+    return lines[-n:]
+
+_default_mux = None
+_default_lock = threading.Lock()
+
+def get_mux() -> LogMux:
+    """The process-wide multiplexer, configured from [run] in config.project.toml."""
+    global _default_mux
+    with _default_lock:
+        if _default_mux is None or _default_mux._stopped:
+            run_config = get_config().run
+            _default_mux = LogMux(
+                ring_lines=run_config.log_ring_lines,
+                log_dir=state_dir() / "logs",
+                max_bytes=int(run_config.log_max_mb * 1024 * 1024),
+                backups=run_config.log_backups)
+            atexit.register(_default_mux.close)
+        return _default_mux
+
+def cmd_logs(args) -> int:
+    lines = tail_log_file(args.service, args.lines)
+    if not lines:
+        print(f"[WARN] No logs recorded for '{args.service}'.")
+        return 1
+    print("\n".join(lines))
+    return 0
@@ -0,0 +1,211 @@
+# project_assistant/orchestrator.py
+"""Multi-service orchestration: start registered services in dependency order and supervise them."""
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from project_assistant import tracing
+from project_assistant.config import get_config
+from project_assistant.debugger import start_monitor
+from project_assistant.service_index import resolve_service
+from project_assistant.services import stream_output, wait_for_port
+from project_assistant.utils import load_service_registry
+
+INITIAL_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30.0
+DEFAULT_READY_TIMEOUT = 60.0
+# A child that stayed up this long is considered healthy again; its backoff resets
+STABLE_AFTER = 30.0
+
+@dataclass
+class ServiceSpec:
+    name: str
+    root: Path
+    cmd: str
+    entrypoint: str
+    port: Optional[int] = None
+    depends_on: list[str] = field(default_factory=list)
+
+def build_spec(name: str) -> ServiceSpec:
+    """Resolve ``name`` through the service index into something we can launch."""
+    entry = resolve_service(name)
+    if entry is None:
+        raise ValueError(f"Could not find service root for '{name}'.")
+    if not entry.launch:
+        raise ValueError(f"No entrypoint found for service '{name}'.")
+    cmd, entrypoint = entry.launch
+    return ServiceSpec(name, Path(entry.root), cmd, entrypoint, entry.port, list(entry.depends_on))
+
+def resolve_services(names: list[str]) -> dict[str, ServiceSpec]:
+    """Specs for ``names`` plus everything they transitively depend on."""
+    specs = {}
+    queue = list(names)
+    while queue:
+        name = queue.pop(0)
+        if name in specs:
+            continue
+        specs[name] = build_spec(name)
+        queue.extend(specs[name].depends_on)
+    return specs
+
+def dependency_levels(specs: dict[str, ServiceSpec]) -> list[list[str]]:
+    """Group services into levels; each level only depends on earlier ones."""
+    remaining = {name: set(spec.depends_on) for name, spec in specs.items()}
+    levels = []
+    while remaining:
+        level = sorted(name for name, deps in remaining.items() if not deps)
+        if not level:
+            raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+        levels.append(level)
+        for name in level:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(level)
+    return levels
+
+def next_backoff(previous: Optional[float], uptime: float, max_backoff: float = DEFAULT_MAX_BACKOFF) -> float:
+    """Seconds to wait before restarting a child that ran for ``uptime`` seconds.
+
+    Doubles with every crash up to ``max_backoff``; the first crash, and any
+    after a run of STABLE_AFTER seconds or more, waits INITIAL_BACKOFF.
+    """
+    if previous is None or uptime >= STABLE_AFTER:
+        return INITIAL_BACKOFF
+    return min(previous * 2, max_backoff)
+
+class Supervisor(threading.Thread):
+    """Runs one service: waits for its dependencies, then restarts it on crash with exponential backoff."""
+
+    def __init__(self, spec: ServiceSpec, depends_on: list["Supervisor"], stopping: threading.Event,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF, ready_timeout: float = DEFAULT_READY_TIMEOUT):
+        super().__init__(name=f"supervise-{spec.name}", daemon=True)
+        self.spec = spec
+        self.depends_on = depends_on
+        self.stopping = stopping
+        self.max_backoff = max_backoff
+        self.ready_timeout = ready_timeout
+        self.ready = threading.Event()
+        self.proc = None
+        self.restarts = 0
+        self._lock = threading.Lock()
+
+    def _spawn(self) -> subprocess.Popen:
+        env = dict(os.environ)
+        if self.spec.port:
+            env["PORT"] = str(self.spec.port)
+        proc = subprocess.Popen([self.spec.cmd, self.spec.entrypoint], stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, env=env, start_new_session=(os.name != "nt"))
+        tracing.process(proc, f"{self.spec.name}: {os.path.basename(self.spec.entrypoint)}",
+                        port=self.spec.port, restarts=self.restarts)
+        return proc
+
+    def run(self):
+        for dep in self.depends_on:
+            while not dep.ready.wait(0.5):
+                if self.stopping.is_set():
+                    return
+        backoff = None
+        while not self.stopping.is_set():
+            started = time.monotonic()
+            with self._lock:
+                if self.stopping.is_set():
+                    return
+                self.proc = proc = self._spawn()
+            stream_output(proc, self.spec.name)
+            if self.spec.port:
+                up = wait_for_port(self.spec.port, proc, self.ready_timeout)
+                where = f"port {self.spec.port} accepting"
+            else:
+                up = proc.poll() is None
+                where = "no port registered"
+            if up:
+                print(f"[orchestrator] {self.spec.name} is up after {time.monotonic() - started:.2f}s ({where}).")
+                self.ready.set()
+            elif proc.poll() is None:
+                # Still running but not listening: do not hold dependents hostage forever
+                print(f"[orchestrator] [WARN] {self.spec.name} not accepting on port {self.spec.port} "
+                      f"after {self.ready_timeout:.0f}s; continuing.")
+                self.ready.set()
+            proc.wait()
+            if self.stopping.is_set():
+                return
+            backoff = next_backoff(backoff, time.monotonic() - started, self.max_backoff)
+            print(f"[orchestrator] {self.spec.name} exited with code {proc.returncode}; "
+                  f"restarting in {backoff:.1f}s.")
+            if self.stopping.wait(backoff):
+                return
+            self.restarts += 1
+
+    def terminate(self, grace: float = 5.0):
+        with self._lock:
+            proc = self.proc
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(grace)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+def run_services(args) -> int:
+    """Entry point for `run --all` and `run svc1 svc2 ...`."""
+    registry = load_service_registry()
+    names = list(registry) if getattr(args, "all", False) else list(args.service)
+    if not names:
+        print("[ERROR] No services registered in workspace/index.toml.")
+        return 2
+    if getattr(args, "watch", False):
+        print("[WARN] --watch applies to single-service runs only; supervising without file watching.")
+    try:
+        specs = resolve_services(names)
+        levels = dependency_levels(specs)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 3
+    run_config = get_config().run
+
+    stopping = threading.Event()
+    supervisors = {}
+    for level in levels:
+        for name in level:
+            supervisors[name] = Supervisor(
+                specs[name], [supervisors[d] for d in specs[name].depends_on], stopping,
+                max_backoff=run_config.max_backoff, ready_timeout=run_config.ready_timeout)
+    monitor = start_monitor(getattr(args, "metrics_port", None))
+    if monitor:
+        for name, supervisor in supervisors.items():
+            monitor.track(name, lambda s=supervisor: s.proc)
+    print("[orchestrator] Starting " + " -> ".join(", ".join(level) for level in levels))
+    started = time.monotonic()
+    for supervisor in supervisors.values():
+        supervisor.start()
+
+    def report_all_up():
+        for supervisor in supervisors.values():
+            while not supervisor.ready.wait(0.5):
+                if stopping.is_set():
+                    return
+        print(f"[orchestrator] All {len(supervisors)} service(s) up in {time.monotonic() - started:.2f}s.")
+    threading.Thread(target=report_all_up, daemon=True).start()
+
+    try:
+        while any(s.is_alive() for s in supervisors.values()):
+            for supervisor in supervisors.values():
+                supervisor.join(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopping.set()
+        # Stop dependents before what they depend on
+        for level in reversed(levels):
+            for name in level:
+                supervisors[name].terminate()
+        if monitor:
+            monitor.stop()
+    print("[orchestrator] Shutting down.")
+    return 0
@@ -0,0 +1,506 @@
+# project_assistant/package_store.py
+"""Shared, content-addressed store of Node packages for workspace services.
+
+Layout under ``.localdev/store`` (or ``[store] dir``)::
+
+    files/ab/<sha256>[-x]             file contents, read-only; -x = executable
+    packages/<name>/<version>.json    package.json fields we need + {relpath: blob}
+
+Packages are added from any service's node_modules. A service's
+node_modules is then rebuilt from the store with hardlinks (or reflinks,
+or copies as a last resort): from its package-lock.json when that is
+present and matches package.json, otherwise by resolving package.json
+ranges against the stored versions with npm's hoisting rules. Every
+service links the same inodes, so disk use stays flat as services are
+added, and nothing needs the network unless a package was never stored.
+
+Stored files are shared by every service that links them: like pnpm's
+store, node_modules must be treated as read-only.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from project_assistant.config import get_config
+from project_assistant.utils import load_service_registry, state_dir
+
+FICLONE = 0x40049409  # linux/fs.h: share extents with another file (btrfs, xfs, ...)
+
+# --- semver ranges, as far as package.json dependencies use them ---
+
+_VERSION = re.compile(r"^v?(\d+)\.(\d+)\.(\d+)(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+_PARTIAL = re.compile(r"^v?(\d+|[xX*])(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+_HYPHEN = re.compile(r"^\s*(\S+)\s+-\s+(\S+)\s*$")
+
+def parse_version(text: str) -> Optional[tuple]:
+    """(major, minor, patch, prerelease) or None; prerelease is '' for releases."""
+    m = _VERSION.match(text.strip())
+    if not m:
+        return None
+    return int(m.group(1)), int(m.group(2)), int(m.group(3)), m.group(4) or ""
+
+def version_key(version: tuple) -> tuple:
+    # A prerelease sorts before its release
+    return version[:3] + ((1, "") if not version[3] else (0, version[3]))
+
+def _partial(text: str) -> Optional[list]:
+    m = _PARTIAL.match(text)
+    if not m:
+        return None
+    parts = [None if p is None or p in "xX*" else int(p) for p in m.groups()[:3]]
+    # "1.x.3" means "1.x"
+    for i, p in enumerate(parts):
+        if p is None:
+            parts[i:] = [None] * (3 - i)
+            break
+    return parts + [m.group(4) or ""]
+
+def _floor(parts: list) -> tuple:
+    return tuple(p or 0 for p in parts[:3]) + (parts[3],)
+
+def _bump(parts: list) -> tuple:
+    """The first version past a partial: 1.2 -> 1.3.0, 1 -> 2.0.0."""
+    known = [p for p in parts[:3] if p is not None]
+    known[-1] += 1
+    return tuple(known + [0] * (3 - len(known))) + ("",)
+
+def _comparators(text: str) -> Optional[list]:
+    """One AND-ed set of (op, version) for a range without ``||``; None if not a semver range."""
+    text = text.strip()
+    if text in ("", "*", "x", "X", "latest"):
+        return []
+    hyphen = _HYPHEN.match(text)
+    if hyphen:
+        low, high = _partial(hyphen.group(1)), _partial(hyphen.group(2))
+        if low is None or high is None:
+            return None
+        upper = ("<=", _floor(high)) if high[2] is not None else ("<", _bump(high)) if high[0] is not None else None
+        return [(">=", _floor(low))] + ([upper] if upper else [])
+    result = []
+    for token in re.sub(r"(>=|<=|>|<|=|\^|~)\s+", r"\1", text).split():
+        op = re.match(r"^(>=|<=|>|<|=|\^|~)?", token).group(1) or ""
+        parts = _partial(token[len(op):])
+        if parts is None:
+            return None
+        if parts[0] is None:
+            if op in ("<", ">"):
+                result.append(("<", (0, 0, 0, "")))  # "<*" / ">*" match nothing
+            continue
+        major, minor, patch = parts[:3]
+        if op == "^":
+            if major > 0 or minor is None:
+                upper = (major + 1, 0, 0, "")
+            elif minor > 0 or patch is None:
+                upper = (0, minor + 1, 0, "")
+            else:
+                upper = (0, 0, patch + 1, "")
+            result += [(">=", _floor(parts)), ("<", upper)]
+        elif op == "~":
+            upper = (major + 1, 0, 0, "") if minor is None else (major, minor + 1, 0, "")
+            result += [(">=", _floor(parts)), ("<", upper)]
+        elif op in ("", "="):
+            if patch is not None:
+                result.append(("=", _floor(parts)))
+            else:
+                result += [(">=", _floor(parts)), ("<", _bump(parts))]
+        elif op == ">":
+            result.append((">", _floor(parts)) if patch is not None else (">=", _bump(parts)))
+        elif op == "<=":
+            result.append(("<=", _floor(parts)) if patch is not None else ("<", _bump(parts)))
+        else:
+            result.append((op, _floor(parts)))
+    return result
+
+def satisfies(version: str, spec: str) -> bool:
+    """Whether ``version`` is in the npm range ``spec``; non-semver specs (git, file:, tags) never match."""
+    v = parse_version(version)
+    if v is None:
+        return False
+    for alternative in spec.split("||"):
+        comparators = _comparators(alternative)
+        if comparators is None:
+            continue
+        # Prereleases only match a comparator that names the same major.minor.patch
+        if v[3] and not any(c[1][:3] == v[:3] and c[1][3] for c in comparators):
+            continue
+        key = version_key(v)
+        if all(_compare(key, op, version_key(bound)) for op, bound in comparators):
+            return True
+    return False
+
+def _compare(key: tuple, op: str, bound: tuple) -> bool:
+    return {"=": key == bound, ">=": key >= bound, ">": key > bound,
+            "<": key < bound, "<=": key <= bound}[op]
+
+# --- the store ---
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _reflink(src: str, dst: str):
+    import fcntl  # POSIX only; raises ImportError elsewhere
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+def _package_dirs(node_modules: Path):
+    """Every installed package directory under ``node_modules``, nested ones included."""
+    try:
+        entries = sorted(os.scandir(node_modules), key=lambda e: e.name)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+            continue
+        if entry.name.startswith("@"):
+            scoped = [e for e in sorted(os.scandir(entry.path), key=lambda e: e.name)
+                      if e.is_dir(follow_symlinks=False)]
+        else:
+            scoped = [entry]
+        for pkg in scoped:
+            yield Path(pkg.path)
+            yield from _package_dirs(Path(pkg.path) / "node_modules")
+
+@dataclass
+class LinkResult:
+    linked: int = 0  # packages (re)linked into node_modules
+    present: int = 0  # packages that were already in place
+    files: int = 0
+    missing: list = field(default_factory=list)  # "name@range" the store cannot satisfy
+
+class PackageStore:
+    def __init__(self, root: Path, link: str = "auto"):
+        self.root = Path(root)
+        self.link = link
+        self._versions = {}
+
+    # -- adding --
+
+    def _blob(self, sha: str, executable: bool) -> Path:
+        return self.root / "files" / sha[:2] / (sha + ("-x" if executable else ""))
+
+    def _put(self, path: str) -> str:
+        """Store the file at ``path`` (unless its content is already there) and return its blob name."""
+        st = os.stat(path)
+        executable = bool(st.st_mode & stat.S_IXUSR)
+        blob = self._blob(_sha256(path), executable)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(blob.name + f".{os.getpid()}.tmp")
+            shutil.copyfile(path, tmp)
+            os.chmod(tmp, 0o555 if executable else 0o444)
+            os.replace(tmp, blob)
+        return blob.name
+
+    def _manifest_path(self, name: str, version: str) -> Path:
+        return self.root / "packages" / name.replace("/", "+") / f"{version}.json"
+
+    def has(self, name: str, version: str) -> bool:
+        return self._manifest_path(name, version).exists()
+
+    def add_package(self, pkg_dir: Path) -> Optional[str]:
+        """Add one installed package; returns "name@version" if it was new to the store."""
+        try:
+            meta = json.loads((pkg_dir / "package.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        name, version = meta.get("name"), meta.get("version")
+        if not name or not version or self.has(name, version):
+            return None
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(pkg_dir):
+            dirnames[:] = [d for d in dirnames if d != "node_modules"]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if os.path.islink(path):
+                    continue
+                files[Path(os.path.relpath(path, pkg_dir)).as_posix()] = self._put(path)
+        manifest = {key: meta[key] for key in ("name", "version", "dependencies", "optionalDependencies", "bin")
+                    if key in meta}
+        manifest["files"] = files
+        target = self._manifest_path(name, version)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp, target)
+        self._versions.pop(name, None)
+        return f"{name}@{version}"
+
+    def add_tree(self, node_modules: Path) -> list[str]:
+        """Add every package installed under ``node_modules``; returns the ones that were new."""
+        return [added for pkg in _package_dirs(node_modules) if (added := self.add_package(pkg))]
+
+    # -- resolving --
+
+    def manifest(self, name: str, version: str) -> dict:
+        return json.loads(self._manifest_path(name, version).read_text(encoding="utf-8"))
+
+    def versions(self, name: str) -> list[str]:
+        if name not in self._versions:
+            try:
+                found = [p.stem for p in (self.root / "packages" / name.replace("/", "+")).glob("*.json")]
+            except OSError:
+                found = []
+            self._versions[name] = sorted((v for v in found if parse_version(v)),
+                                          key=lambda v: version_key(parse_version(v)), reverse=True)
+        return self._versions[name]
+
+    def best(self, name: str, spec: str) -> Optional[str]:
+        """The highest stored version of ``name`` in ``spec``."""
+        return next((v for v in self.versions(name) if satisfies(v, spec)), None)
+
+    def plan(self, service_root: Path) -> tuple[dict, list]:
+        """({install path: (name, version)}, missing) for the service's node_modules."""
+        try:
+            package = json.loads((service_root / "package.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}, []
+        wanted = dict(package.get("devDependencies", {}), **package.get("dependencies", {}))
+        from_lock = self._plan_from_lock(service_root / "package-lock.json", wanted)
+        if from_lock is not None:
+            return from_lock
+        return self._plan_from_ranges(wanted)
+
+    def _plan_from_lock(self, lock_path: Path, wanted: dict) -> Optional[tuple[dict, list]]:
+        try:
+            packages = json.loads(lock_path.read_text(encoding="utf-8")).get("packages")
+        except (OSError, ValueError):
+            return None
+        if not packages:
+            return None  # lockfileVersion 1 has no flat "packages" map
+        # A lock that no longer matches package.json is stale; resolve from ranges instead
+        for name, spec in wanted.items():
+            locked = packages.get(f"node_modules/{name}", {}).get("version")
+            if locked is None or not satisfies(locked, spec):
+                return None
+        placements, missing = {}, []
+        for path, entry in packages.items():
+            if not path or entry.get("link") or "version" not in entry:
+                continue
+            name = entry.get("name") or path.rsplit("node_modules/", 1)[-1]
+            if self.has(name, entry["version"]):
+                placements[path] = (name, entry["version"])
+            elif not entry.get("optional"):
+                missing.append(f"{name}@{entry['version']}")
+        return placements, missing
+
+    def _plan_from_ranges(self, wanted: dict) -> tuple[dict, list]:
+        """npm-style hoisting: each package goes as high in the tree as it can without a conflict."""
+        placements, missing = {}, []
+        queue = [("", name, spec, False) for name, spec in sorted(wanted.items())]
+        while queue:
+            parent, name, spec, optional = queue.pop(0)
+            ancestors = []
+            at = parent
+            while True:
+                ancestors.append(at)
+                if not at:
+                    break
+                at = at.rsplit("/node_modules/", 1)[0] if "/node_modules/" in at else ""
+            target = None
+            for anc in ancestors:  # nearest first, like require()
+                slot = f"{anc}/node_modules/{name}" if anc else f"node_modules/{name}"
+                if slot in placements:
+                    if satisfies(placements[slot][1], spec):
+                        target = ""
+                    break
+                target = slot
+            if target == "":
+                continue  # an existing copy is visible from here and fits
+            version = self.best(name, spec)
+            if version is None or target is None:
+                if not optional:
+                    missing.append(f"{name}@{spec}")
+                continue
+            placements[target] = (name, version)
+            manifest = self.manifest(name, version)
+            queue += [(target, dep, dep_spec, False) for dep, dep_spec in sorted(manifest.get("dependencies", {}).items())]
+            queue += [(target, dep, dep_spec, True)
+                      for dep, dep_spec in sorted(manifest.get("optionalDependencies", {}).items())]
+        return placements, missing
+
+    # -- linking --
+
+    def _place(self, blob: Path, dest: Path):
+        if self.link in ("auto", "hardlink"):
+            try:
+                os.link(blob, dest)
+                return
+            except OSError:
+                if self.link == "hardlink":
+                    raise
+        if self.link in ("auto", "reflink"):
+            try:
+                _reflink(str(blob), str(dest))
+                return
+            except (OSError, ImportError):
+                pass
+        shutil.copyfile(blob, dest)
+        os.chmod(dest, 0o755 if blob.name.endswith("-x") else 0o644)
+
+    def link_service(self, service_root: Path) -> LinkResult:
+        """Populate ``service_root``/node_modules from the store."""
+        placements, missing = self.plan(service_root)
+        result = LinkResult(missing=missing)
+        # Copies npm installed are swapped for hardlinks, unless links cannot cross to the store's filesystem
+        try:
+            by_inode = self.link != "copy" and os.stat(self.root).st_dev == os.stat(service_root).st_dev
+        except OSError:
+            by_inode = False
+        # Parents before the packages nested inside them
+        for path in sorted(placements, key=lambda p: p.count("/node_modules/")):
+            name, version = placements[path]
+            dest = service_root / path
+            manifest = self.manifest(name, version)
+            if self._installed(dest, version, manifest if by_inode else None):
+                result.present += 1
+                continue
+            if dest.exists() or dest.is_symlink():
+                shutil.rmtree(dest) if dest.is_dir() and not dest.is_symlink() else dest.unlink()
+            for rel, blob_name in manifest["files"].items():
+                target = dest / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                self._place(self.root / "files" / blob_name[:2] / blob_name, target)
+                result.files += 1
+            result.linked += 1
+        self._link_bins(service_root, placements)
+        return result
+
+    def _installed(self, dest: Path, version: str, manifest: Optional[dict]) -> bool:
+        """``version`` is at ``dest``, and when ``manifest`` is given, linked from this store."""
+        try:
+            installed = json.loads((dest / "package.json").read_text(encoding="utf-8")).get("version")
+        except (OSError, ValueError):
+            return False
+        if installed != version:
+            return False
+        if manifest is None or "package.json" not in manifest["files"]:
+            return True
+        blob_name = manifest["files"]["package.json"]
+        try:
+            return os.path.samefile(dest / "package.json", self.root / "files" / blob_name[:2] / blob_name)
+        except OSError:
+            return False
+
+    def _link_bins(self, service_root: Path, placements: dict):
+        bin_dir = service_root / "node_modules" / ".bin"
+        for path, (name, version) in placements.items():
+            if path.count("node_modules/") != 1:
+                continue
+            bins = self.manifest(name, version).get("bin") or {}
+            if isinstance(bins, str):
+                bins = {name.rsplit("/", 1)[-1]: bins}
+            for command, script in bins.items():
+                bin_dir.mkdir(parents=True, exist_ok=True)
+                script_path = Path("..") / name / script
+                if os.name == "nt":
+                    shim = bin_dir / f"{command}.cmd"
+                    shim.write_text(f'@node "%~dp0\\{script_path}" %*\r\n', encoding="utf-8")
+                    continue
+                link = bin_dir / command
+                if link.is_symlink() or link.exists():
+                    link.unlink()
+                link.symlink_to(script_path)
+
+    def stats(self) -> dict:
+        blobs = size = shared = 0
+        for blob in (self.root / "files").glob("*/*"):
+            st = blob.stat()
+            blobs += 1
+            size += st.st_size
+            shared += st.st_size * (st.st_nlink - 1)
+        packages = len(list((self.root / "packages").glob("*/*.json")))
+        return {"path": str(self.root), "packages": packages, "files": blobs,
+                "bytes": size, "bytes_saved_by_links": shared}
+
+def get_store() -> PackageStore:
+    settings = get_config().store
+    return PackageStore(Path(settings.dir) if settings.dir else state_dir() / "store", settings.link)
+
+def service_roots(names: list[str]) -> list[Path]:
+    """Roots for ``names``; with no names, every registered service and every folder in workspace/."""
+    from project_assistant.linter import resolve_service_dir
+    if names:
+        roots = []
+        for name in names:
+            root = resolve_service_dir(name)
+            if root is None:
+                print(f"[WARN] Service '{name}' not found.")
+            else:
+                roots.append(root)
+        return roots
+    roots = [Path(e["path"]) for e in load_service_registry().values() if e.get("path")]
+    workspace = Path("workspace")
+    if workspace.is_dir():
+        roots += [p for p in sorted(workspace.iterdir()) if (p / "package.json").exists()]
+    unique = {}
+    for root in roots:
+        if root.is_dir():
+            unique.setdefault(root.resolve(), root)
+    return list(unique.values())
+
+def fill_store(store: PackageStore, roots: list[Path]) -> list[str]:
+    added = []
+    for root in roots:
+        added += store.add_tree(root / "node_modules")
+    return added
+
+def install_dependencies(service_root: Path, store: Optional[PackageStore] = None, offline: bool = False) -> bool:
+    """Link ``service_root``'s dependencies from the store, falling back to npm for the rest.
+
+    Returns False when some dependencies are still missing afterwards.
+    """
+    store = store or get_store()
+    result = store.link_service(service_root)
+    if result.linked or result.present:
+        print(f"[INFO] {service_root}: linked {result.linked} package(s) ({result.files} files) "
+              f"from the store, {result.present} already in place.")
+    if not result.missing:
+        return True
+    npm = shutil.which("npm")
+    if offline or npm is None:
+        print(f"[WARN] {service_root}: not in the package store: {', '.join(result.missing)}. "
+              f"Run `npm install` there{' when online' if offline else ''}.")
+        return False
+    print(f"[INFO] {service_root}: installing {len(result.missing)} missing package(s) with npm.")
+    proc = subprocess.run([npm, "install", "--no-audit", "--no-fund"], cwd=service_root)
+    if proc.returncode != 0:
+        print(f"[WARN] npm install failed in {service_root}.")
+        return False
+    added = store.add_tree(service_root / "node_modules")
+    if added:
+        print(f"[INFO] Added {len(added)} package(s) to the store.")
+    # Swap npm's fresh copies for links into the store
+    store.link_service(service_root)
+    return True
+
+def cmd_store(args) -> int:
+    store = get_store()
+    if args.action == "stats":
+        s = store.stats()
+        print(f"Store: {s['path']}")
+        print(f"Packages: {s['packages']}  Files: {s['files']}  Size: {s['bytes'] / 1e6:.1f} MB  "
+              f"Saved by links: {s['bytes_saved_by_links'] / 1e6:.1f} MB")
+        return 0
+    roots = service_roots(args.service)
+    if args.action == "add":
+        added = fill_store(store, roots)
+        print(f"[INFO] Added {len(added)} package(s) from {len(roots)} service(s) to {store.root}.")
+        return 0
+    # link: make every known package available first, then rebuild each service's node_modules
+    fill_store(store, service_roots([]))
+    ok = True
+    for root in roots:
+        if (root / "package.json").exists():
+            ok = install_dependencies(root, store, offline=args.offline) and ok
+    return 0 if ok else 1
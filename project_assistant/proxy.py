@@ -0,0 +1,109 @@
+# project_assistant/proxy.py
+"""Supervisor-owned TCP proxy that lets a service be replaced without refusing connections."""
+import asyncio
+import collections
+import socket
+import threading
+from typing import Optional
+
+def free_port(host: str = "127.0.0.1") -> int:
+    """An ephemeral port nobody is listening on right now."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+class SwitchingProxy:
+    """Forwards ``listen_port`` to whichever backend port was switched in last.
+
+    New connections always go to the current backend; connections already
+    open stay with the backend they were made to, so the old process can
+    be drained before it is stopped.
+    """
+
+    def __init__(self, listen_port: int, listen_host: str = "0.0.0.0", backend_host: str = "127.0.0.1"):
+        self.listen_port = listen_port
+        self.listen_host = listen_host
+        self.backend_host = backend_host
+        self.backend_port: Optional[int] = None
+        self.active = collections.Counter()
+        self._cond = threading.Condition()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="proxy", daemon=True)
+        self._server = None
+        # asyncio drops its reference to a handler once the client disconnects
+        self._tasks = set()
+
+    def start(self, backend_port: int):
+        """Begin listening, forwarding to ``backend_port``. Raises OSError if the port is taken."""
+        self.backend_port = backend_port
+        self._thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self._listen(), self._loop).result()
+        except OSError:
+            self.close()
+            raise
+
+    async def _listen(self):
+        self._server = await asyncio.start_server(self._handle, self.listen_host, self.listen_port,
+                                                  reuse_address=True)
+
+    def switch(self, backend_port: int):
+        self.backend_port = backend_port
+
+    def drain(self, backend_port: int, timeout: float) -> bool:
+        """Wait until no connection to ``backend_port`` is open; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.active[backend_port] == 0, timeout)
+
+    def close(self):
+        if self._server is not None:
+            async def shutdown():
+                self._server.close()
+                for task in list(self._tasks):
+                    task.cancel()
+                await self._server.wait_closed()
+            try:
+                asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(5)
+            except (Exception, asyncio.CancelledError):
+                pass
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+    async def _handle(self, client_reader, client_writer):
+        self._tasks.add(asyncio.current_task())
+        port = self.backend_port
+        # Count the connection before connecting so a drain cannot miss it
+        with self._cond:
+            self.active[port] += 1
+        backend_writer = None
+        try:
+            backend_reader, backend_writer = await asyncio.open_connection(self.backend_host, port)
+            await asyncio.gather(self._pipe(client_reader, backend_writer),
+                                 self._pipe(backend_reader, client_writer))
+        except OSError:
+            pass
+        finally:
+            for writer in (client_writer, backend_writer):
+                if writer is not None:
+                    writer.close()
+            with self._cond:
+                self.active[port] -= 1
+                self._cond.notify_all()
+            self._tasks.discard(asyncio.current_task())
+
+    @staticmethod
+    async def _pipe(reader, writer):
+        try:
+            while True:
+                data = await reader.read(64 * 1024)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (ConnectionError, OSError):
+            writer.close()
@@ -0,0 +1,401 @@
+# project_assistant/retrieval.py
+"""Local code retrieval: which functions elsewhere in the workspace a file is about.
+
+Every function in the indexed directories (as the analyzer finds them; a
+file without functions is one unit) is a document whose terms are its
+identifiers, lower-cased and also split at ``snake_case`` and
+``camelCase`` boundaries, with the function's own name counted extra.
+Documents are ranked with BM25 against the identifiers of the file being
+reviewed, so its callees, its callers and code sharing its vocabulary
+come first.
+
+The inverted index lives in ``.localdev/retrieval.sqlite3``. A refresh
+stats the indexed files and re-tokenizes only those whose mtime or size
+changed. Document frequencies and collection statistics are kept
+up to date with each change, so a lookup reads only the postings of the
+query's most selective terms.
+"""
+import collections
+import functools
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from project_assistant.analyzer import PARALLEL_MIN_FILES, analyze_files, analyze_source, supported
+from project_assistant.config import get_config
+from project_assistant.tracing import span
+from project_assistant.utils import state_dir
+
+# Bump when tokenizing or units change, so an older index is rebuilt
+INDEX_VERSION = 1
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# A function's name is counted this many extra times among its terms
+NAME_BOOST = 3
+# Only this many of the query's most selective terms are looked up
+MAX_QUERY_TERMS = 48
+# A refresh within this many seconds of the last one is skipped
+REFRESH_INTERVAL = 1.0
+# Related code may use at most 1/RELATED_SHARE of the context window
+RELATED_SHARE = 4
+# A snippet cut shorter than this many lines is left out instead
+MIN_SNIPPET_LINES = 3
+
+_WORD = re.compile(r"[A-Za-z_$][\w$]*")
+_PARTS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+")
+STOPWORDS = frozenset("""
+    and as assert async await break case catch class const continue def default del delete do elif else
+    except export extends false finally for from function global if import in instanceof is lambda let
+    new none nonlocal not null of or pass raise return self static super switch this throw true try
+    typeof undefined var void while with yield cls args kwargs str int float bool dict list tuple set
+    len range print require module exports the get
+""".split())
+
+@functools.lru_cache(maxsize=1 << 16)
+def _word_terms(word: str) -> tuple:
+    lowered = word.lower().strip("_$")
+    if len(lowered) < 2 or lowered in STOPWORDS:
+        return ()
+    found = [lowered]
+    parts = _PARTS.findall(word)
+    if len(parts) > 1:
+        found += [p for p in (part.lower() for part in parts) if len(p) >= 3 and p != lowered and p not in STOPWORDS]
+    return tuple(found)
+
+def terms(text: str) -> collections.Counter:
+    """Identifier terms of ``text``: each identifier lower-cased, plus its snake/camel-case parts."""
+    counts = collections.Counter()
+    for word, n in collections.Counter(_WORD.findall(text)).items():
+        for term in _word_terms(word):
+            counts[term] += n
+    return counts
+
+@dataclass
+class Hit:
+    """A related function; ``start``/``end`` are 1-based, inclusive."""
+    path: str
+    name: str
+    start: int
+    end: int
+    score: float
+    matched: list
+
+def _units(source: str, functions: list) -> list[tuple[str, int, int, str]]:
+    """(name, start, end, text) per outermost function, or the whole file if it has none."""
+    lines = source.splitlines(keepends=True)
+    units = []
+    for f in sorted(functions, key=lambda f: (f.start, -f.end)):
+        if units and f.end <= units[-1][2]:
+            continue  # nested in the previous unit
+        units.append((f.name, f.start, f.end, "".join(lines[f.start - 1:f.end])))
+    if not units and lines:
+        units.append(("<module>", 1, len(lines), source))
+    return units
+
+def _index_file(path: str, functions: Optional[list] = None) -> tuple[str, Optional[list]]:
+    """(path, [(name, start, end, term counts)] or None if unreadable); parses ``path`` unless given its functions."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            source = f.read()
+    except OSError:
+        return path, None
+    if functions is None:
+        try:
+            functions = analyze_source(path, source)
+        except (SyntaxError, ValueError, RecursionError):
+            functions = []
+    units = []
+    for name, start, end, text in _units(source, functions):
+        counts = terms(text)
+        for term in terms(name.replace(".<locals>.", ".").replace(".", " ")):
+            counts[term] += NAME_BOOST
+        units.append((name, start, end, dict(counts)))
+    return path, units
+
+def _scan(root: str, ignore_dirs: set, found: dict):
+    """abs path -> (mtime_ns, size) for every indexable source below ``root``."""
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in ignore_dirs:
+                    _scan(entry.path, ignore_dirs, found)
+            elif supported(entry.name):
+                st = entry.stat()
+                found[entry.path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            continue
+
+class RetrievalIndex:
+    """SQLite-backed BM25 index of function-sized units under ``roots``."""
+
+    def __init__(self, path: Path, roots: Iterable[str] = ("workspace",)):
+        self.path = Path(path)
+        self.roots = list(roots)
+        self.refreshed = None  # time.monotonic() of the last refresh
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != INDEX_VERSION:
+            self._db.executescript("""
+                DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS docs;
+                DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS terms; DELETE FROM meta;
+            """)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                name TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                end INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS docs_path ON docs (path);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (term, doc)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                df INTEGER NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (INDEX_VERSION,))
+
+    def source_files(self) -> dict:
+        """abs path -> (mtime_ns, size) of the indexable sources under ``roots``."""
+        ignore_dirs = set(get_config().integrity.ignore_dirs)
+        found = {}
+        for root in self.roots:
+            _scan(os.path.abspath(root), ignore_dirs, found)
+        return found
+
+    def refresh(self, force: bool = False) -> tuple[int, int]:
+        """Re-index files that changed since the last refresh; returns (indexed, removed)."""
+        with self._lock:
+            if not force and self.refreshed is not None and time.monotonic() - self.refreshed < REFRESH_INTERVAL:
+                return 0, 0
+            with span("retrieval.refresh"):
+                result = self._refresh()
+            self.refreshed = time.monotonic()
+            return result
+
+    def _refresh(self) -> tuple[int, int]:
+        known = {path: (mtime, size) for path, mtime, size in self._db.execute("SELECT path, mtime_ns, size FROM files")}
+        current = self.source_files()
+        changed = [path for path, stamp in current.items() if known.get(path) != stamp]
+        removed = [path for path in known if path not in current]
+        if not changed and not removed:
+            return 0, 0
+        with span("retrieval.parse", files=len(changed)):
+            if len(changed) >= PARALLEL_MIN_FILES:
+                # Many files: share the analyzer's content-hash cache and worker processes with `analyze`
+                functions = {path: [] for path in changed}
+                for f in analyze_files(changed, state_dir() / "analyze_cache.json").functions:
+                    functions[f.path].append(f)
+                parsed = [_index_file(path, functions[path]) for path in changed]
+            else:
+                parsed = [_index_file(path) for path in changed]
+        df = collections.Counter()
+        postings = []
+        with self._db:
+            for path in removed:
+                self._drop(path, df)
+            for path, units in parsed:
+                if path in known:
+                    self._drop(path, df)
+                if units is None:
+                    continue
+                for name, start, end, counts in units:
+                    length = sum(counts.values())
+                    doc = self._db.execute("INSERT INTO docs (path, name, start, end, length) VALUES (?, ?, ?, ?, ?)",
+                                           (path, name, start, end, length)).lastrowid
+                    postings += [(term, doc, tf, length) for term, tf in counts.items()]
+                    df.update(counts.keys())
+            self._db.executemany("INSERT INTO postings (term, doc, tf, length) VALUES (?, ?, ?, ?)", postings)
+            self._db.executemany("INSERT INTO terms (term, df) VALUES (?, ?) "
+                                 "ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                                 [item for item in df.items() if item[1]])
+            self._db.executemany("DELETE FROM terms WHERE term = ? AND df <= 0",
+                                 [(term,) for term, delta in df.items() if delta < 0])
+            self._db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+            self._db.executemany("INSERT OR REPLACE INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                                 [(path, *current[path]) for path, units in parsed if units is not None])
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+            self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                 [("docs", count), ("avg_length", total / count if count else 0.0)])
+        return len(changed), len(removed)
+
+    def _drop(self, path: str, df: collections.Counter):
+        """Remove ``path``'s units, counting their terms off ``df``."""
+        docs = "SELECT id FROM docs WHERE path = ?"
+        df.subtract(row[0] for row in self._db.execute(f"SELECT term FROM postings WHERE doc IN ({docs})", (path,)))
+        self._db.execute(f"DELETE FROM postings WHERE doc IN ({docs})", (path,))
+        self._db.execute("DELETE FROM docs WHERE path = ?", (path,))
+
+    def search(self, query: collections.Counter, top_k: int = 5, exclude: Optional[str] = None) -> list[Hit]:
+        """The ``top_k`` units scoring highest for the ``query`` terms, leaving out those in ``exclude``."""
+        exclude = os.path.abspath(exclude) if exclude else None
+        with self._lock, span("retrieval.search", terms=len(query)):
+            meta = dict(self._db.execute("SELECT key, value FROM meta"))
+            n, avg_length = meta.get("docs", 0), meta.get("avg_length", 0.0)
+            if not n or not query:
+                return []
+            df = {}
+            words = list(query)
+            for i in range(0, len(words), 500):
+                batch = words[i:i + 500]
+                df.update(self._db.execute(
+                    f"SELECT term, df FROM terms WHERE term IN ({','.join('?' * len(batch))})", batch))
+            # Rare terms say the most about which code is related; frequent ones cost the most to read
+            weights = {t: (1 + math.log(query[t])) * math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+            chosen = sorted(weights, key=weights.get, reverse=True)[:MAX_QUERY_TERMS]
+            scores = collections.defaultdict(float)
+            matched = collections.defaultdict(list)
+            for term in chosen:
+                for doc, tf, length in self._db.execute("SELECT doc, tf, length FROM postings WHERE term = ?",
+                                                        (term,)):
+                    norm = K1 * (1 - B + B * length / avg_length) if avg_length else K1
+                    scores[doc] += weights[term] * tf * (K1 + 1) / (tf + norm)
+                    matched[doc].append(term)
+            hits = []
+            for doc in sorted(scores, key=scores.get, reverse=True):
+                path, name, start, end = self._db.execute(
+                    "SELECT path, name, start, end FROM docs WHERE id = ?", (doc,)).fetchone()
+                if path == exclude:
+                    continue
+                hits.append(Hit(path, name, start, end, round(scores[doc], 3), matched[doc]))
+                if len(hits) >= top_k:
+                    break
+            return hits
+
+    def stats(self) -> dict:
+        with self._lock:
+            files = self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            meta = dict(self._db.execute("SELECT key, value FROM meta"))
+            terms_count = self._db.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {"files": files, "units": int(meta.get("docs", 0)), "terms": terms_count}
+
+    def close(self):
+        self._db.close()
+
+_default_index = None
+_default_lock = threading.Lock()
+
+def get_index() -> Optional[RetrievalIndex]:
+    """The process-wide index over [retrieval] paths, or None when [retrieval] enabled = false."""
+    global _default_index
+    settings = get_config().retrieval
+    if not settings.enabled:
+        return None
+    path = state_dir() / "retrieval.sqlite3"
+    with _default_lock:
+        if _default_index is None or _default_index.path != path:
+            _default_index = RetrievalIndex(path, settings.paths)
+        _default_index.roots = list(settings.paths)
+        return _default_index
+
+def _snippet(hit: Hit, budget: int) -> Optional[str]:
+    """``hit``'s code with a location header, cut to ``budget`` tokens; None if too little fits."""
+    from ai_engine.client import estimate_tokens
+    try:
+        with open(hit.path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()[hit.start - 1:hit.end]
+    except OSError:
+        return None
+    header = f"# {os.path.relpath(hit.path)}:{hit.start}-{hit.end} ({hit.name})"
+    used = estimate_tokens(header)
+    kept = []
+    for line in lines:
+        used += estimate_tokens(line)
+        if used > budget:
+            break
+        kept.append(line)
+    if len(kept) < min(MIN_SNIPPET_LINES, len(lines)):
+        return None
+    if len(kept) < len(lines):
+        kept.append("...")
+    return "\n".join([header] + kept)
+
+def related_code(file_path: str, query_text: str, top_k: Optional[int] = None,
+                 max_tokens: Optional[int] = None) -> list[str]:
+    """Snippets of the functions elsewhere most related to ``query_text``, most related first, within ``max_tokens``.
+
+    Defaults come from [retrieval]; empty when retrieval is off or nothing relevant is indexed.
+    """
+    from ai_engine.client import estimate_tokens
+    settings = get_config().retrieval
+    top_k = settings.top_k if top_k is None else top_k
+    max_tokens = settings.max_tokens if max_tokens is None else max_tokens
+    index = get_index() if top_k > 0 else None
+    if index is None:
+        return []
+    index.refresh()
+    snippets = []
+    budget = max_tokens
+    for hit in index.search(terms(query_text), top_k, exclude=file_path):
+        snippet = _snippet(hit, budget)
+        if snippet is None:
+            continue
+        snippets.append(snippet)
+        budget -= estimate_tokens(snippet) + 1
+        if budget <= 0:
+            break
+    return snippets
+
+def cmd_related(args) -> int:
+    """`related <file>`: what suggest would add to the file's prompt, with lookup timings."""
+    if not os.path.isfile(args.file):
+        print(f"[ERROR] File not found: {args.file}")
+        return 2
+    index = get_index()
+    if index is None:
+        print("[ERROR] Retrieval is off ([retrieval] enabled = false).")
+        return 2
+    start = time.perf_counter()
+    indexed, removed = index.refresh(force=True)
+    refreshed = time.perf_counter()
+    with open(args.file, "r", encoding="utf-8", errors="replace") as f:
+        query = terms(f.read())
+    top = args.top if args.top is not None else get_config().retrieval.top_k
+    hits = index.search(query, top, exclude=args.file)
+    searched = time.perf_counter()
+    stats = index.stats()
+    if args.json:
+        print(json.dumps({"file": args.file, "hits": [asdict(h) for h in hits], "index": stats,
+                          "refresh_ms": round((refreshed - start) * 1000, 1),
+                          "search_ms": round((searched - refreshed) * 1000, 1)}, indent=2))
+    else:
+        for h in hits:
+            print(f"{h.score:>7.2f}  {os.path.relpath(h.path)}:{h.start}-{h.end} {h.name}")
+            print(f"{'':>9}{', '.join(h.matched[:8])}{', ...' if len(h.matched) > 8 else ''}")
+        if not hits:
+            print("[INFO] Nothing related found in the index.")
+    print(f"[INFO] {stats['units']} unit(s) from {stats['files']} file(s) in {', '.join(index.roots)}; "
+          f"refresh {(refreshed - start) * 1000:.1f} ms ({indexed} file(s) re-indexed, {removed} removed), "
+          f"lookup {(searched - refreshed) * 1000:.1f} ms.", file=sys.stderr)
+    return 0
@@ -7,7 +7,7 @@ def create_microservice(service_name, git=False, docker_compose=False, port="300
     base_path = Path("workspace") / service_name
     if base_path.exists():
         print(f"[WARN] Service folder '{base_path}' already exists. Skipping creation.")
-        return
+        return None
 
     # Folder structure
     folders = [
@@ -64,12 +64,11 @@ Minimal Express.js microservice scaffolded by localdev-ai.
 ## Getting Started
 
 ```bash
-cd workspace/{service_name}/src
-npm install express ejs
-node app.js
+python main.py store link {service_name}   # node_modules from the shared package store
+python main.py run {service_name}
 ```
 
-Open http://localhost:3000
+Open http://localhost:{port}
 """
     (base_path / "README.md").write_text(readme, encoding="utf-8")
 
@@ -138,21 +137,76 @@ CMD ["npm", "start"]
         print(f"[INFO] Added '{service_name}' to docker-compose.yml.")
 
     # --- Registry update ---
-    import toml
-    registry_path = Path("workspace") / "index.toml"
-    service_entry = {
-        "name": service_name,
+    register_service(service_name, {
         "path": f"workspace/{service_name}",
         "port": int(port),
         "description": f"Express.js {service_name} microservice.",
         "entrypoint": "app.js"
-    }
-    if registry_path.exists():
-        with open(registry_path, "r", encoding="utf-8") as f:
-            registry = toml.load(f)
+    })
+    return base_path
+
+def register_service(service_name, entry, registry_path="workspace/index.toml"):
+    """Append ``service_name`` to workspace/index.toml and the service index.
+
+    The registry is appended to rather than rewritten, so hand edits and
+    comments survive and either registry layout keeps working.
+    """
+    import toml
+    from pathlib import Path
+    from project_assistant.service_index import get_service_index
+    from project_assistant.utils import load_service_registry
+    registry_path = Path(registry_path)
+    if service_name in load_service_registry(str(registry_path)):
+        print(f"[INFO] '{service_name}' is already registered in {registry_path}.")
+    else:
+        block = toml.dumps({"service": [dict(name=service_name, **entry)]})
+        existing = registry_path.read_text(encoding="utf-8") if registry_path.exists() else ""
+        separator = "" if not existing else "\n" if existing.endswith("\n") else "\n\n"
+        with open(registry_path, "a", encoding="utf-8") as f:
+            f.write(separator + block)
+        print(f"[INFO] Registered '{service_name}' in {registry_path}.")
+    get_service_index().update(service_name)
+
+def _free_ports(start: int, count: int) -> list[int]:
+    """``count`` ports from ``start`` up that no registered service uses."""
+    from project_assistant.utils import load_service_registry
+    taken = {int(e["port"]) for e in load_service_registry().values() if str(e.get("port", "")).isdigit()}
+    ports = []
+    port = start
+    while len(ports) < count:
+        if port not in taken:
+            ports.append(port)
+        port += 1
+    return ports
+
+def cmd_init(args) -> int:
+    if args.interactive:
+        import questionary
+        service_name = (args.servicename[0] if args.servicename else None) or questionary.text("Service name:").ask()
+        port = questionary.text("Port:", default="3000").ask()
+        git = questionary.confirm("Initialize git repo?", default=True).ask()
+        docker_compose = questionary.confirm("Add to docker-compose.yml?", default=False).ask()
+        names, ports = [service_name], [port]
     else:
-        registry = {"services": {}}
-    registry["services"].setdefault(service_name, {}).update(service_entry)
-    with open(registry_path, "w", encoding="utf-8") as f:
-        toml.dump(registry, f)
-    print(f"[INFO] Registered '{service_name}' in workspace/index.toml.")
\ No newline at end of file
+        names = list(args.servicename)
+        if not names:
+            args._parser.error("give at least one service name, or use --interactive")
+        if args.count:
+            if len(names) != 1:
+                args._parser.error("--count takes a single name prefix")
+            names = [f"{names[0]}-{i}" for i in range(1, args.count + 1)]
+        git = args.git
+        docker_compose = args.docker_compose
+        ports = [str(p) for p in _free_ports(args.port, len(names))]
+    created = [path for name, port in zip(names, ports)
+               if (path := create_microservice(name, git=git, docker_compose=docker_compose, port=port))]
+    if not created or not args.install:
+        return 0
+    from project_assistant.package_store import service_roots, fill_store, get_store, install_dependencies
+    store = get_store()
+    # Whatever other services already installed can be linked instead of downloaded
+    fill_store(store, service_roots([]))
+    ok = True
+    for path in created:
+        ok = install_dependencies(path, store, offline=args.offline) and ok
+    return 0 if ok else 1
@@ -0,0 +1,154 @@
+# project_assistant/service_index.py
+"""Persistent index of services: name -> root, entrypoint, runtime, port and dependencies.
+
+Resolving a service from scratch means probing several paths, parsing
+service.toml and package.json and globbing for an entrypoint. The index
+keeps the result in ``.localdev/services.json`` together with the
+mtimes of everything the result was derived from (the service root, its
+src/, service.toml, package.json, the entrypoint and workspace/index.toml). A lookup
+re-stats those few paths and only re-probes when one of them changed.
+"""
+import json
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from project_assistant.config import read_service_toml
+from project_assistant.tracing import traced
+from project_assistant.utils import load_service_registry, probe_service_root, state_dir
+
+INDEX_VERSION = 2
+REGISTRY_PATH = "workspace/index.toml"
+
+@dataclass
+class ServiceEntry:
+    name: str
+    root: str
+    entrypoint: Optional[str] = None
+    runtime: Optional[str] = None  # "node" or "python"
+    port: Optional[int] = None
+    depends_on: list = field(default_factory=list)
+    fingerprint: dict = field(default_factory=dict)
+
+    @property
+    def launch(self) -> Optional[tuple[str, str]]:
+        """(command, entrypoint) as find_entrypoint() returns it, or None."""
+        if not self.entrypoint:
+            return None
+        return ("node" if self.runtime == "node" else sys.executable, self.entrypoint)
+
+def _fingerprint(root: Path, registry_path: str, entrypoint: Optional[str] = None) -> dict:
+    stamps = {}
+    paths = [root, root / "src", root / "service.toml", root / "package.json", Path(registry_path)]
+    if entrypoint:
+        paths.append(Path(entrypoint))
+    for path in paths:
+        try:
+            stamps[str(path)] = os.stat(path).st_mtime_ns
+        except OSError:
+            stamps[str(path)] = None
+    return stamps
+
+def _runtime(cmd: str) -> str:
+    return "node" if cmd == "node" else "python"
+
+class ServiceIndex:
+    def __init__(self, path: Optional[Path], registry_path: str = REGISTRY_PATH):
+        self.path = path
+        self.registry_path = registry_path
+        self.cwd = os.getcwd()
+        self.entries: dict[str, ServiceEntry] = {}
+        self._lock = threading.Lock()
+        if path is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                # Relative names resolve against the CWD, so an index is only valid where it was built
+                if data.get("version") == INDEX_VERSION and data.get("cwd") == self.cwd:
+                    self.entries = {name: ServiceEntry(**e) for name, e in data.get("services", {}).items()}
+            except (OSError, ValueError, TypeError):
+                pass
+
+    def lookup(self, name: str) -> Optional[ServiceEntry]:
+        """The entry for ``name``, re-probed only if a file it was derived from changed."""
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is not None and entry.fingerprint == _fingerprint(
+                    Path(entry.root), self.registry_path, entry.entrypoint):
+                return entry
+            return self._refresh(name)
+
+    def update(self, name: str) -> Optional[ServiceEntry]:
+        """Re-probe ``name`` unconditionally, e.g. right after scaffolding it."""
+        with self._lock:
+            return self._refresh(name)
+
+    def _refresh(self, name: str) -> Optional[ServiceEntry]:
+        entry = self._probe(name)
+        if entry is None:
+            if self.entries.pop(name, None) is not None:
+                self._save()
+            return None
+        self.entries[name] = entry
+        self._save()
+        return entry
+
+    def _probe(self, name: str) -> Optional[ServiceEntry]:
+        from project_assistant.services import find_entrypoint, service_port
+        registered = load_service_registry(self.registry_path).get(name, {})
+        if registered.get("path") and Path(registered["path"]).is_dir():
+            root = Path(registered["path"]).absolute()
+        else:
+            root = probe_service_root(name)
+        if root is None:
+            return None
+        launch = None
+        if registered.get("entrypoint"):
+            for candidate in (root / registered["entrypoint"], root / "src" / registered["entrypoint"]):
+                if candidate.is_file() and candidate.suffix in (".js", ".py"):
+                    launch = ("node" if candidate.suffix == ".js" else sys.executable, str(candidate))
+                    break
+        launch = launch or find_entrypoint(root)
+        port = registered.get("port") or service_port(root)
+        depends_on = registered.get("depends_on", read_service_toml(root).get("depends_on", []))
+        return ServiceEntry(
+            name=name,
+            root=str(root),
+            entrypoint=launch[1] if launch else None,
+            runtime=_runtime(launch[0]) if launch else None,
+            port=int(port) if port else None,
+            depends_on=list(depends_on),
+            fingerprint=_fingerprint(root, self.registry_path, launch[1] if launch else None),
+        )
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "cwd": self.cwd,
+                           "services": {name: asdict(e) for name, e in self.entries.items()}}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+_default_index = None
+_default_lock = threading.Lock()
+
+def get_service_index() -> ServiceIndex:
+    """The index for the current CWD and state directory."""
+    global _default_index
+    path = state_dir() / "services.json"
+    with _default_lock:
+        if _default_index is None or _default_index.path != path or _default_index.cwd != os.getcwd():
+            _default_index = ServiceIndex(path)
+        return _default_index
+
+@traced()
+def resolve_service(name: str) -> Optional[ServiceEntry]:
+    return get_service_index().lookup(name)
@@ -6,9 +6,16 @@ import threading
 import time
 import os
 import signal
+import socket
+import fnmatch
 from pathlib import Path
-from typing import Optional
-from project_assistant.utils import find_service_root, load_model_from_config
+from typing import Callable, Optional
+from project_assistant.proxy import SwitchingProxy, free_port
+from project_assistant.service_index import resolve_service
+from project_assistant.config import read_service_toml, service_config
+from project_assistant.debugger import start_monitor
+from project_assistant.utils import load_model_from_config
+from project_assistant import tracing
 
 try:
     from watchdog.observers import Observer
@@ -19,83 +26,332 @@ except ImportError:
     FileSystemEventHandler = object
     WATCHDOG_AVAILABLE = False
 
+RESTART_STRATEGIES = ("stop-start", "zero-downtime")
+# Editor swap/backup files and the probe file vim writes on save
+EDITOR_IGNORES = ["*.swp", "*.swx", "*.swo", "*~", ".#*", "#*#", "4913", "*.tmp"]
+
 def stream_output(proc, prefix):
-    def stream_reader(stream):
-        for line in iter(stream.readline, b""):
-            print(f"[{prefix}] {line.decode().rstrip()}")
-    threads = []
-    for stream in [proc.stdout, proc.stderr]:
-        t = threading.Thread(target=stream_reader, args=(stream,))
-        t.daemon = True
-        t.start()
-        threads.append(t)
-    return threads
+    """Hand the child's stdout/stderr to the shared log multiplexer, prefixed with ``prefix``."""
+    from project_assistant.logmux import get_mux
+    mux = get_mux()
+    mux.add(proc, prefix)
+    return mux
+
+def load_watch_settings(service_root: Path, config_path: Optional[str] = None) -> tuple[list[str], float]:
+    """Collect ignore globs and the debounce window (seconds) for watching ``service_root``.
+
+    Ignores come from [integrity] ignore_dirs and [run] watch_ignore in the
+    project config, the service's .gitignore and ``watch_ignore`` in its
+    service.toml; service.toml may also override ``debounce_ms``.
+    """
+    config = service_config(service_root, config_path)
+    patterns = list(EDITOR_IGNORES)
+    patterns += [f"{d}/" for d in config.integrity.ignore_dirs]
+    patterns += config.run.watch_ignore
+    gitignore = service_root / ".gitignore"
+    if gitignore.is_file():
+        for line in gitignore.read_text(encoding="utf-8", errors="replace").splitlines():
+            line = line.strip()
+            # Negated patterns cannot un-ignore anything here; skip them with comments
+            if line and not line.startswith(("#", "!")):
+                patterns.append(line)
+    return patterns, config.run.debounce_ms / 1000.0
+
+def load_restart_settings(service_root: Path, config_path: Optional[str] = None) -> tuple[str, float, float]:
+    """(strategy, drain timeout, ready timeout) for restarts under --watch.
+
+    [run] ``restart`` sets the default strategy; a service's service.toml
+    may override ``restart`` and ``drain_timeout``.
+    """
+    run = service_config(service_root, config_path).run
+    strategy = run.restart
+    if strategy not in RESTART_STRATEGIES:
+        print(f"[WARN] Unknown restart strategy '{strategy}'; using stop-start.")
+        strategy = "stop-start"
+    return strategy, float(run.drain_timeout), float(run.ready_timeout)
+
+class WatchFilter:
+    """Decide whether a changed path should trigger a restart, gitignore-style.
+
+    Patterns without a slash match any path component (``node_modules``,
+    ``*.log``); a trailing slash restricts them to directories; patterns
+    containing a slash are anchored at the service root.
+    """
+
+    def __init__(self, root: Path, patterns: list[str]):
+        self.root = os.path.abspath(str(root))
+        self.names = []
+        self.dir_names = []
+        self.anchored = []
+        for pattern in patterns:
+            directory = pattern.endswith("/")
+            pattern = pattern.strip("/")
+            if not pattern:
+                continue
+            if "/" in pattern:
+                self.anchored.append(pattern)
+            elif directory:
+                self.dir_names.append(pattern)
+            else:
+                self.names.append(pattern)
+
+    def ignored(self, path: str) -> bool:
+        rel = os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+        if rel.startswith("../"):
+            return True
+        parts = rel.split("/")
+        for part in parts[:-1]:
+            if any(fnmatch.fnmatch(part, p) for p in self.dir_names + self.names):
+                return True
+        if any(fnmatch.fnmatch(parts[-1], p) for p in self.names):
+            return True
+        return any(fnmatch.fnmatch(rel, p) or rel.startswith(p + "/") for p in self.anchored)
+
+class Debouncer:
+    """Collapse a burst of triggers into one ``callback(first_trigger_time)``.
+
+    The callback fires once no trigger has arrived for ``window`` seconds;
+    times are ``time.monotonic()`` values.
+    """
+
+    def __init__(self, callback: Callable[[float], None], window: float):
+        self.callback = callback
+        self.window = window
+        self._cond = threading.Condition()
+        self._first = None
+        self._deadline = 0.0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        with self._cond:
+            now = time.monotonic()
+            if self._first is None:
+                self._first = now
+            self._deadline = now + self.window
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._first is None and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                first, self._first = self._first, None
+            self.callback(first)
+
+# Opened/closed events fire when the service merely reads its own sources
+CHANGE_EVENTS = {"created", "modified", "deleted", "moved"}
 
 class RestartOnChangeHandler(FileSystemEventHandler):
-    def __init__(self, restart_callback):
+    def __init__(self, restart_callback, ignore: Optional[WatchFilter] = None):
         super().__init__()
         self.restart_callback = restart_callback
+        self.ignore = ignore
     def on_any_event(self, event):
-        if not event.is_directory:
+        if event.is_directory or event.event_type not in CHANGE_EVENTS:
+            return
+        paths = [event.src_path, getattr(event, "dest_path", None)]
+        if self.ignore is None or any(p and not self.ignore.ignored(p) for p in paths):
             self.restart_callback()
 
+def service_port(service_root: Path) -> Optional[int]:
+    """The port declared in the service's service.toml, if any."""
+    port = read_service_toml(service_root).get("port")
+    try:
+        return int(port) if port else None
+    except ValueError:
+        return None
+
+def wait_for_port(port: int, proc: Optional[subprocess.Popen] = None, timeout: float = 30.0,
+                  host: str = "127.0.0.1") -> bool:
+    """Block until ``host:port`` accepts connections; give up if ``proc`` exits or on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            return False
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+def _wait_for_backend(backend: int, port: int, proc: subprocess.Popen, timeout: float) -> bool:
+    """Wait for ``proc`` to accept on ``backend``; give up early if it took the registered port instead."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if wait_for_port(backend, proc, 0.5):
+            return True
+        if proc.poll() is not None or wait_for_port(port, timeout=0.1):
+            return False
+    return False
+
+def _stop(proc: subprocess.Popen, grace: float = 5.0):
+    proc.terminate()
+    try:
+        proc.wait(grace)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+def _wait(event: threading.Event):
+    # A bounded wait keeps Ctrl+C responsive on Windows, where an untimed wait is not interruptible
+    while not event.wait(1.0):
+        pass
+
 def run_service(args):
     service = args.service
     watch = getattr(args, "watch", False)
     model = getattr(args, "model", None) or load_model_from_config()
     if model:
         print(f"[INFO] Using model: {model}")
-    service_root = find_service_root(service)
-    if not service_root:
+    resolved = resolve_service(service)
+    if not resolved:
         print(f"[ERROR] Could not find service root for '{service}'.")
         sys.exit(2)
-    entry = find_entrypoint(service_root)
-    if not entry:
+    service_root = Path(resolved.root)
+    if not resolved.launch:
         print(f"[ERROR] No entrypoint found for service '{service}'.")
         sys.exit(3)
-    cmd, entrypoint = entry
+    cmd, entrypoint = resolved.launch
     prefix = service
+    monitor = start_monitor(getattr(args, "metrics_port", None))
 
-    def start():
-        return subprocess.Popen([cmd, entrypoint], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    def start(env_port=None):
+        env = None
+        if env_port is not None:
+            env = dict(os.environ, PORT=str(env_port))
+        child = subprocess.Popen([cmd, entrypoint], stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        tracing.process(child, f"{prefix}: {os.path.basename(cmd)} {os.path.basename(entrypoint)}", port=env_port)
+        return child
 
     proc = None
     observer = None
+    debouncer = None
+    proxy = None
+    if monitor:
+        # Follows restarts: whatever proc is current when a sample is taken
+        monitor.track(prefix, lambda: proc)
     try:
         if watch:
-            if cmd == "node":
+            if not WATCHDOG_AVAILABLE:
                 import shutil
-                if shutil.which("nodemon"):
+                if cmd == "node" and shutil.which("nodemon"):
                     proc = subprocess.Popen(["nodemon", entrypoint])
                     proc.wait()
                     return proc.returncode
-                elif not WATCHDOG_AVAILABLE:
-                    print("[ERROR] --watch requires: pip install watchdog OR npm i -g nodemon")
-                    sys.exit(4)
-            if not WATCHDOG_AVAILABLE:
                 print("[ERROR] --watch requires: pip install watchdog OR npm i -g nodemon")
                 sys.exit(4)
-            restart_flag = {"restart": False}
-            def restart():
-                restart_flag["restart"] = True
-                if proc and proc.poll() is None:
-                    proc.terminate()
-            event_handler = RestartOnChangeHandler(restart)
+            patterns, window = load_watch_settings(service_root)
+            strategy, drain_timeout, ready_timeout = load_restart_settings(service_root)
+            if getattr(args, "zero_downtime", False):
+                strategy = "zero-downtime"
+            port = resolved.port
+            if strategy == "zero-downtime" and not port:
+                print(f"[{prefix}] [WARN] Zero-downtime restarts need a port in service.toml; using stop-start.")
+                strategy = "stop-start"
+            wake = threading.Event()
+            pending = {"first": None}
+            pending_lock = threading.Lock()
+            def restart(first_event):
+                with pending_lock:
+                    if pending["first"] is None:
+                        pending["first"] = first_event
+                wake.set()
+            debouncer = Debouncer(restart, window)
+            event_handler = RestartOnChangeHandler(debouncer.trigger, WatchFilter(service_root, patterns))
             observer = Observer()
             observer.schedule(event_handler, str(service_root), recursive=True)
             observer.start()
-            while True:
-                proc = start()
-                threads = stream_output(proc, prefix)
-                while proc.poll() is None and not restart_flag["restart"]:
-                    time.sleep(0.2)
-                if restart_flag["restart"]:
-                    restart_flag["restart"] = False
-                    proc.terminate()
-                    proc.wait()
-                    print(f"[{prefix}] Restarting due to file change...")
+
+            def spawn(env_port=None):
+                child = start(env_port)
+                stream_output(child, prefix)
+                threading.Thread(target=lambda p=child: (p.wait(), wake.set()), daemon=True).start()
+                return child
+
+            if strategy == "zero-downtime":
+                # The child listens on an internal port; we own the registered one
+                backend = free_port()
+                proc = spawn(backend)
+                if _wait_for_backend(backend, port, proc, ready_timeout):
+                    proxy = SwitchingProxy(port)
+                    try:
+                        proxy.start(backend)
+                        print(f"[{prefix}] Zero-downtime restarts on: port {port} -> internal port {backend}.")
+                    except OSError as e:
+                        print(f"[{prefix}] [WARN] Could not listen on port {port} ({e}); using stop-start.")
+                        proxy.close()
+                        proxy = None
+                        proc.terminate()
+                        proc.wait()
+                        proc = spawn()
                 else:
+                    if proc.poll() is None and not wait_for_port(port, timeout=0.1):
+                        # Still starting on the internal port, where nothing would forward to it
+                        _stop(proc)
+                        proc = spawn()
+                    print(f"[{prefix}] [WARN] Service did not listen on $PORT; zero-downtime restarts need it to. "
+                          "Using stop-start.")
+            else:
+                proc = spawn()
+            while True:
+                # Sleep until a debounced change or the child exiting wakes us
+                while True:
+                    _wait(wake)
+                    wake.clear()
+                    with pending_lock:
+                        changed_at, pending["first"] = pending["first"], None
+                    if changed_at is not None or proc.poll() is not None:
+                        break
+                if changed_at is None:
                     break
+                # Pick up edits to config.project.toml / service.toml; both are cached until they change
+                new_patterns, debouncer.window = load_watch_settings(service_root)
+                if new_patterns != patterns:
+                    patterns = new_patterns
+                    event_handler.ignore = WatchFilter(service_root, patterns)
+                _, drain_timeout, ready_timeout = load_restart_settings(service_root)
+                if proxy is not None:
+                    print(f"[{prefix}] Starting replacement due to file change...")
+                    new_backend = free_port()
+                    candidate = spawn(new_backend)
+                    if wait_for_port(new_backend, candidate, ready_timeout):
+                        proxy.switch(new_backend)
+                        print(f"[{prefix}] Switched in {time.monotonic() - changed_at:.2f}s "
+                              f"(file change -> replacement accepting, port {port} -> {new_backend})")
+                        old, old_backend = proc, backend
+                        proc, backend = candidate, new_backend
+                        if not proxy.drain(old_backend, drain_timeout):
+                            print(f"[{prefix}] [WARN] {proxy.active[old_backend]} connection(s) still open "
+                                  f"after {drain_timeout:.0f}s; stopping the old process anyway.")
+                        _stop(old)
+                    else:
+                        print(f"[{prefix}] [WARN] Replacement did not come up; keeping the running process.")
+                        _stop(candidate)
+                    continue
+                print(f"[{prefix}] Restarting due to file change...")
+                proc.terminate()
+                proc.wait()
+                proc = spawn()
+                ready = wait_for_port(port, proc, ready_timeout) if port else proc.poll() is None
+                if ready:
+                    target = f"port {port} accepting" if port else "process started"
+                    print(f"[{prefix}] Restarted in {time.monotonic() - changed_at:.2f}s (file change -> {target})")
+                else:
+                    print(f"[{prefix}] [WARN] Service did not come back up after restart.")
         else:
             proc = start()
             threads = stream_output(proc, prefix)
@@ -117,20 +373,23 @@ def run_service(args):
         if observer:
             observer.stop()
             observer.join()
+        if debouncer:
+            debouncer.stop()
+        if proxy:
+            proxy.close()
+        if monitor:
+            monitor.stop()
 
+@tracing.traced()
 def find_entrypoint(service_root: Path) -> Optional[tuple[str, str]]:
-    toml_path = service_root / "service.toml"
-    if toml_path.exists():
-        import toml
-        config = toml.load(toml_path)
-        entry = config.get("entrypoint")
-        if entry:
-            entry_path = service_root / entry
-            if entry_path.exists():
-                if entry_path.suffix == ".js":
-                    return ("node", str(entry_path))
-                elif entry_path.suffix == ".py":
-                    return (sys.executable, str(entry_path))
+    entry = read_service_toml(service_root).get("entrypoint")
+    if entry:
+        entry_path = service_root / entry
+        if entry_path.exists():
+            if entry_path.suffix == ".js":
+                return ("node", str(entry_path))
+            elif entry_path.suffix == ".py":
+                return (sys.executable, str(entry_path))
     for fname in ["index.js", "main.js", "app.js", "main.py", "app.py"]:
         f = service_root / fname
         if f.exists():
@@ -138,7 +397,25 @@ def find_entrypoint(service_root: Path) -> Optional[tuple[str, str]]:
                 return ("node", str(f))
             elif f.suffix == ".py":
                 return (sys.executable, str(f))
+    package_json = service_root / "package.json"
+    if package_json.exists():
+        import json
+        try:
+            main = json.loads(package_json.read_text(encoding="utf-8")).get("main")
+        except ValueError:
+            main = None
+        if main and (service_root / main).is_file():
+            return ("node", str(service_root / main))
     for ext, cmd in [(".js", "node"), (".py", sys.executable)]:
         for f in service_root.glob(f"*{ext}"):
             return (cmd, str(f))
     return None
+
+def cmd_run(args) -> int:
+    if args.all or len(args.service) > 1:
+        from project_assistant.orchestrator import run_services
+        return run_services(args)
+    if not args.service:
+        args._parser.error("give a service name, several names, or --all")
+    args.service = args.service[0]
+    return run_service(args)
@@ -1,13 +1,268 @@
 import os
-from ai_engine.interface import query_llama
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from ai_engine.cache import ResponseCache, get_cache, make_key
+from ai_engine.client import estimate_tokens, get_client
+from ai_engine.prompts import PROMPT_VERSION, build_prompt
+from project_assistant.chunker import Chunk, language_for, outline, plan_chunks, span_chunks
+from project_assistant.retrieval import RELATED_SHARE, related_code
 
-def suggest_code_improvement(file_path: str, task: str = "refactor") -> str:
-    if not os.path.isfile(file_path):
-        return f"[ERROR] File not found: {file_path}"
+# The file outline may use at most 1/OUTLINE_SHARE of the context window
+OUTLINE_SHARE = 8
 
+def _read_source(file_path: str):
+    if not os.path.isfile(file_path):
+        return None
     with open(file_path, "r", encoding="utf-8") as f:
-        file_content = f.read()
+        return f.read()
+
+def _cache_key(content: str, task: str, n_predict: int) -> str:
+    client = get_client()
+    return make_key(content, f"{task}@{PROMPT_VERSION}", client.model or "", client.temperature, n_predict)
+
+@dataclass
+class _Job:
+    """One file's suggestion: its chunks, their prompts and whatever answers we already have."""
+    file_path: str
+    task: str
+    report: Optional[str] = None
+    chunks: list[Chunk] = field(default_factory=list)
+    prompts: list[str] = field(default_factory=list)
+    answers: list[Optional[str]] = field(default_factory=list)
+    keys: list[Optional[str]] = field(default_factory=list)
+    cache: Optional[ResponseCache] = None
+    file_key: Optional[str] = None
+    tokens: int = 0
+    prompt_tokens: int = 0
+    prompt_ms: float = 0.0
+    cached_tokens: int = 0
+    hotspots: Optional[list] = None  # FunctionMetrics sent instead of the whole file
+    related: Optional[str] = None  # code from other files added to every prompt
+
+    @property
+    def affinity(self) -> str:
+        """Slot affinity key: every chunk of a file shares the file's prompt prefix."""
+        return os.path.abspath(self.file_path)
+
+    @property
+    def whole(self) -> bool:
+        """True when the answer is for the whole file and needs no section headers."""
+        return len(self.chunks) == 1 and self.hotspots is None
+
+    @property
+    def failed(self) -> bool:
+        """True when the file could not be read or any chunk's request failed."""
+        if self.report is not None and self.report.startswith("[ERROR]"):
+            return True
+        return any(a is not None and a.startswith("[ERROR]") for a in self.answers)
+
+    def merge(self) -> str:
+        if self.whole:
+            return self.answers[0]
+        return "\n\n".join(_section(c, a) for c, a in zip(self.chunks, self.answers))
+
+def _section(chunk: Chunk, answer: str) -> str:
+    return f"### Lines {chunk.start}-{chunk.end} ({chunk.name})\n\n{answer}"
+
+def _spans(hotspots: list) -> list[tuple[str, int, int]]:
+    """(name, start, end) per hotspot in file order, leaving out those inside another one."""
+    spans = []
+    for h in sorted(hotspots, key=lambda h: (h.start, -h.end)):
+        if spans and h.end <= spans[-1][2]:
+            continue
+        spans.append((h.name, h.start, h.end))
+    return spans
+
+def _notes(hotspots: list, chunk: Chunk) -> Optional[str]:
+    owner = next((h for h in hotspots if h.start <= chunk.start <= h.end), None)
+    return "; ".join(owner.reasons()) if owner is not None and owner.reasons() else None
+
+def _prepare(file_path: str, task: str, use_cache: bool, refresh: bool, hotspots: Optional[list] = None,
+             related: Optional[int] = None) -> _Job:
+    """Read, chunk and consult the cache; pending chunks are left with answer None.
+
+    With ``hotspots`` (analyzer FunctionMetrics) only those functions are sent.
+    ``related`` functions from other files ([retrieval] top_k by default) go with them.
+    """
+    job = _Job(file_path, task, hotspots=hotspots)
+    file_content = _read_source(file_path)
+    if file_content is None:
+        job.report = f"[ERROR] File not found: {file_path}"
+        return job
+    spans = _spans(hotspots) if hotspots else None
+    if hotspots is not None and not spans:
+        job.report = (f"[INFO] No hotspots in {file_path}: no function scores [analyze] min_score or more. "
+                      "Use --hotspots 0 to send the whole file.")
+        return job
+    # Chunks sent with analyzer notes get their own cache entries
+    label = f"{task}-hotspots" if spans else task
+    # Retrieved by what the code being sent mentions; answers are cached per related code too
+    query = "".join(c.text for c in span_chunks(file_content, spans)) if spans else file_content
+    snippets = related_code(file_path, query, related)
+    job.related = "\n\n".join(snippets) or None
+    client = get_client()
+    job.cache = get_cache() if use_cache else None
+    if job.cache is not None:
+        # Whole-file entry first, so an unchanged file needs no tokenize round trips
+        keyed = file_content if spans is None else f"{file_content}\0{spans!r}"
+        if job.related:
+            keyed = f"{keyed}\0{job.related}"
+        job.file_key = _cache_key(keyed, label, client.max_n_predict or 0)
+        if not refresh:
+            job.report = job.cache.get(job.file_key)
+            if job.report is not None:
+                return job
+
+    language = language_for(file_path)
+    n_ctx = client.context_size()
+    # The outline is repeated in every chunk's prompt; keep it to a fraction of the window
+    context = outline(file_path, file_content)
+    while context and estimate_tokens(context) > n_ctx // OUTLINE_SHARE:
+        context = context.rsplit("\n", 1)[0] if "\n" in context else ""
+    while snippets and estimate_tokens(job.related) > n_ctx // RELATED_SHARE:
+        snippets.pop()
+        job.related = "\n\n".join(snippets) or None
+    overhead = client.count_tokens([build_prompt("", task, language, (99999, 99999), file_path, context,
+                                                 related=job.related)])[0]
+    chunks = span_chunks(file_content, spans) if spans else None
+    job.chunks = plan_chunks(file_path, file_content, n_ctx, overhead, client.count_tokens, client.max_n_predict,
+                             chunks)
+    whole = len(job.chunks) == 1 and not spans
+    for chunk in job.chunks:
+        if whole:
+            job.prompts.append(build_prompt(chunk.text, task, language, file_name=file_path, related=job.related))
+        elif spans:
+            job.prompts.append(build_prompt(chunk.text, task, language, (chunk.start, chunk.end), file_path, context,
+                                            _notes(hotspots, chunk), job.related))
+        else:
+            job.prompts.append(build_prompt(chunk.text, task, language, (chunk.start, chunk.end), file_path, context,
+                                            related=job.related))
+        keyed = f"{chunk.text}\0{job.related}" if job.related else chunk.text
+        key = _cache_key(keyed, label, chunk.n_predict) if job.cache is not None else None
+        job.keys.append(key)
+        job.answers.append(job.cache.get(key) if key and not refresh else None)
+    return job
+
+def _record(job: _Job, index: int, result) -> str:
+    job.tokens += result.tokens
+    job.prompt_tokens += result.prompt_tokens
+    job.prompt_ms += result.prompt_ms
+    job.cached_tokens += result.cached_tokens
+    if job.cache is not None and not result.error:
+        job.cache.put(job.keys[index], result.content)
+    job.answers[index] = result.text
+    return job.answers[index]
+
+def _finish(job: _Job) -> str:
+    if job.report is None:
+        job.report = job.merge()
+        if job.cache is not None and not job.failed:
+            job.cache.put(job.file_key, job.report)
+    return job.report
+
+def _submit_pending(job: _Job) -> dict:
+    client = get_client()
+    return {i: client.submit(job.prompts[i], job.chunks[i].n_predict, job.affinity)
+            for i, answer in enumerate(job.answers) if answer is None}
+
+@dataclass
+class Suggestion:
+    """A finished suggestion for one file, as reported by batch runs."""
+    file: str
+    task: str
+    output: str
+    latency: float
+    tokens: int
+    cached: bool
+    prompt_tokens: int = 0
+    prompt_ms: float = 0.0
+    cached_tokens: int = 0
+    error: bool = False  # a chunk failed, even if its section is not the first in ``output``
+
+    @property
+    def failed(self) -> bool:
+        return self.error or self.output.startswith("[ERROR]")
+
+def run_suggestion(file_path: str, task: str = "refactor", use_cache: bool = True, refresh: bool = False,
+                   hotspots: Optional[list] = None, related: Optional[int] = None) -> Suggestion:
+    start = time.perf_counter()
+    job = _prepare(file_path, task, use_cache, refresh, hotspots, related)
+    cached = job.report is not None and job.file_key is not None
+    if job.report is None:
+        for i, future in _submit_pending(job).items():
+            _record(job, i, future.result())
+    output = _finish(job)
+    return Suggestion(file_path, task, output, time.perf_counter() - start, job.tokens, cached,
+                      job.prompt_tokens, job.prompt_ms, job.cached_tokens, job.failed)
+
+def suggest_code_improvement(file_path: str, task: str = "refactor",
+                             use_cache: bool = True, refresh: bool = False) -> str:
+    return run_suggestion(file_path, task, use_cache, refresh).output
+
+def suggest_many(file_paths: list[str], task: str = "refactor", use_cache: bool = True, refresh: bool = False,
+                 hotspots: Optional[dict] = None, related: Optional[int] = None) -> list[str]:
+    """Suggest for several files at once, as many chunks in flight as the server has slots.
+
+    ``hotspots`` maps a path to the functions to send for it; other files are sent whole.
+    """
+    hotspots = hotspots or {}
+    jobs = [_prepare(p, task, use_cache, refresh, hotspots.get(p), related) for p in file_paths]
+    pending = [(job, _submit_pending(job)) for job in jobs if job.report is None]
+    for job, futures in pending:
+        for i, future in futures.items():
+            _record(job, i, future.result())
+    return [_finish(job) for job in jobs]
+
+def stream_code_improvement(file_path: str, task: str = "refactor", stats: dict = None,
+                            use_cache: bool = True, refresh: bool = False, hotspots: Optional[list] = None,
+                            related: Optional[int] = None):
+    """Like suggest_code_improvement, but yields the answer as it is generated.
+
+    Single-chunk files stream token by token. Larger files are answered
+    chunk-concurrently and each section is yielded, in file order, as soon
+    as it is done. On a whole-file cache hit ``stats["cached"]`` is set.
+    """
+    if stats is None:
+        stats = {}
+    job = _prepare(file_path, task, use_cache, refresh, hotspots, related)
+    stats["cached"] = job.report is not None and job.file_key is not None
+    if job.report is not None:
+        yield job.report
+        return
+
+    if job.whole and job.answers[0] is None:
+        # Match the blocking path's .strip(): drop leading whitespace before the first token
+        started = False
+        parts = []
+        for piece in get_client().stream(job.prompts[0], job.chunks[0].n_predict, stats=stats,
+                                         affinity=job.affinity):
+            if not started:
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+                started = True
+            parts.append(piece)
+            yield piece
+        job.answers[0] = "".join(parts).rstrip()
+        if job.cache is not None:
+            job.cache.put(job.keys[0], job.answers[0])
+        _finish(job)
+        return
 
-    instruction = f"{task.capitalize()} the following Python code."
-    prompt = f"{instruction}\n\n{file_content}"
-    return query_llama(prompt)
+    start = time.perf_counter()
+    stats.update(ttft=None, tokens=0, prompt_tokens=0, prompt_ms=0.0, cached_tokens=0)
+    futures = _submit_pending(job)
+    for i, chunk in enumerate(job.chunks):
+        if i in futures:
+            result = futures[i].result()
+            stats["tokens"] += result.tokens
+            stats["prompt_tokens"] += result.prompt_tokens
+            stats["prompt_ms"] += result.prompt_ms
+            stats["cached_tokens"] += result.cached_tokens
+            _record(job, i, result)
+        if stats["ttft"] is None:
+            stats["ttft"] = time.perf_counter() - start
+        yield ("" if i == 0 else "\n\n") + (job.answers[0] if job.whole else _section(chunk, job.answers[i]))
+    stats["elapsed"] = time.perf_counter() - start
+    _finish(job)
@@ -0,0 +1,163 @@
+# project_assistant/tracing.py
+"""Nested timing spans for ``main.py --trace FILE``, written as Chrome trace-event JSON.
+
+Open the file in chrome://tracing or https://ui.perfetto.dev. Spans nest
+by time within a thread; subprocesses get a track of their own, named
+after the command, spanning from spawn to exit.
+
+With tracing off ``span()`` hands back one shared no-op object, so an
+instrumented call costs a global lookup and two empty method calls.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: dict):
+        self.tracer, self.name, self.cat, self.args = tracer, name, cat, args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.cat, self.args)
+        return False
+
+    def set(self, **args):
+        """Attach arguments learned inside the span (counts, status codes, ...)."""
+        self.args.update(args)
+
+class Tracer:
+    def __init__(self, path: str, origin: Optional[float] = None):
+        self.path = path
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self._threads = set()
+        self._running = {}  # child pid -> (name, start, args) for processes that have not exited
+        self._lock = threading.Lock()
+        self.events.append({"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+                            "args": {"name": "main.py " + " ".join(sys.argv[1:])}})
+
+    def _us(self, seconds: float) -> float:
+        return round((seconds - self.origin) * 1e6, 1)
+
+    def record(self, name: str, start: float, end: float, cat: str = "cli", args: Optional[dict] = None,
+               pid: Optional[int] = None, tid: Optional[int] = None):
+        """A complete ("X") event; ``start``/``end`` are perf_counter() readings."""
+        new_thread = None
+        if tid is None:
+            tid = threading.get_ident()
+            if tid not in self._threads:
+                new_thread = {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                              "args": {"name": threading.current_thread().name}}
+        event = {"name": name, "cat": cat, "ph": "X", "ts": self._us(start),
+                 "dur": round((end - start) * 1e6, 1), "pid": pid or self.pid, "tid": tid}
+        if args:
+            event["args"] = {k: v if isinstance(v, (int, float, str, bool, type(None))) else str(v)
+                             for k, v in args.items()}
+        with self._lock:
+            if new_thread is not None and tid not in self._threads:
+                self._threads.add(tid)
+                self.events.append(new_thread)
+            self.events.append(event)
+
+    def process(self, proc, name: str, args: dict):
+        start = time.perf_counter()
+        with self._lock:
+            self._running[proc.pid] = (name, start, args)
+            self.events.append({"name": "process_name", "ph": "M", "pid": proc.pid, "tid": proc.pid,
+                                "args": {"name": name}})
+
+        def wait():
+            code = proc.wait()
+            self._process_ended(proc.pid, time.perf_counter(), returncode=code)
+        threading.Thread(target=wait, name=f"trace-wait-{proc.pid}", daemon=True).start()
+
+    def _process_ended(self, pid: int, end: float, **extra):
+        with self._lock:
+            running = self._running.pop(pid, None)
+        if running is not None:
+            name, start, args = running
+            self.record(name, start, end, "subprocess", dict(args, **extra), pid=pid, tid=pid)
+
+    def save(self):
+        import json
+        end = time.perf_counter()
+        for pid in list(self._running):
+            self._process_ended(pid, end, returncode="still running")
+        with self._lock:
+            data = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        print(f"[INFO] Wrote {sum(e['ph'] == 'X' for e in data['traceEvents'])} trace events to {self.path} "
+              "(open in chrome://tracing or ui.perfetto.dev).", file=sys.stderr)
+
+_tracer: Optional[Tracer] = None
+
+def start(path: str, origin: Optional[float] = None) -> Tracer:
+    global _tracer
+    _tracer = Tracer(path, origin)
+    return _tracer
+
+def stop():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.save()
+
+def span(name: str, cat: str = "cli", **args):
+    """Context manager timing a block under ``name``; use ``.set()`` on it to add arguments."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, cat, args)
+
+def traced(name: Optional[str] = None, cat: str = "cli"):
+    """Decorator form of span(), named after the function by default."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with _Span(tracer, label, cat, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def record(name: str, start: float, end: float, cat: str = "cli", **args):
+    """Record an already-measured interval (perf_counter() readings)."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.record(name, start, end, cat, args)
+
+def process(proc, name: str, **args):
+    """Give ``proc`` (a Popen) a track from now until it exits."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.process(proc, name, args)
@@ -1,10 +1,69 @@
 # project_assistant/utils.py
 """Utility functions for path, config, and file operations."""
+import json
+import os
+import threading
 from pathlib import Path
 from typing import Optional
-import toml
 
+from project_assistant.config import get_config, read_toml
+from project_assistant.tracing import traced
+
+def state_dir() -> Path:
+    """Directory for local tool state (caches, indexes); override with LOCALDEV_STATE_DIR."""
+    return Path(os.environ.get("LOCALDEV_STATE_DIR") or Path.cwd() / ".localdev")
+
+class VersionedCache:
+    """Per-file entries in a JSON state file, dropped wholesale when its ``version`` changes.
+
+    Subclasses keep entries in ``self.files`` (keyed by absolute path), update
+    them under ``self._lock`` and set ``self._dirty``; save() writes the file
+    atomically, and only if something changed.
+    """
+
+    def __init__(self, path: Optional[Path], version: int):
+        self.path = path
+        self.version = version
+        self.files = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == version:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError):
+                pass
+
+    def forget_missing(self, root: str, seen: set):
+        """Drop entries under ``root`` for files that are not in ``seen``."""
+        prefix = os.path.join(root, "")
+        with self._lock:
+            for path in [p for p in self.files if p.startswith(prefix) and p not in seen]:
+                del self.files[path]
+                self._dirty = True
+
+    def save(self):
+        if self.path is None or not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with self._lock, open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "files": self.files}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+@traced()
 def find_service_root(service: str) -> Optional[Path]:
+    """Root directory of ``service``, answered from the service index when it is still valid."""
+    from project_assistant.service_index import resolve_service
+    entry = resolve_service(service)
+    return Path(entry.root) if entry else None
+
+def probe_service_root(service: str) -> Optional[Path]:
     """Find the root directory for a service, preferring service.toml, else heuristics."""
     cwd = Path.cwd()
     candidate = cwd / service
@@ -27,9 +86,21 @@ def find_service_root(service: str) -> Optional[Path]:
         return candidate.parent
     return None
 
-def load_model_from_config(config_path: str = "config.project.toml") -> Optional[str]:
-    try:
-        config = toml.load(config_path)
-        return config.get("ai", {}).get("model", None)
-    except Exception:
-        return None
+def load_model_from_config(config_path: Optional[str] = None) -> Optional[str]:
+    return get_config(config_path).ai.model
+
+def load_service_registry(registry_path: str = "workspace/index.toml") -> dict[str, dict]:
+    """Read workspace/index.toml into {name: entry}.
+
+    Accepts both layouts found in the wild: ``[services.<name>]`` tables
+    (written by the scaffolder) and ``[[service]]`` arrays.
+    """
+    registry = read_toml(registry_path)
+    services = {}
+    for entry in registry.get("service", []):
+        name = entry.get("name") or entry.get("service_name")
+        if name:
+            services[name] = dict(entry, name=name)
+    for name, entry in registry.get("services", {}).items():
+        services[name] = dict(services.get(name, {}), **entry, name=name)
+    return services
@@ -0,0 +1,38 @@
+# project_assistant/vscode.py
+"""Generate a VS Code tasks.json for a microservice."""
+import json
+
+from project_assistant.linter import resolve_service_dir
+
+def cmd_vscode_tasks(args) -> int:
+    service_root = resolve_service_dir(args.service)
+    if service_root is None:
+        print(f"[ERROR] Service '{args.service}' not found.")
+        return 2
+    vscode_dir = service_root / ".vscode"
+    vscode_dir.mkdir(exist_ok=True)
+    tasks = {
+        "version": "2.0.0",
+        "tasks": [
+            {
+                "label": "Start Service",
+                "type": "shell",
+                "command": "python" if (service_root / "service.toml").exists() and any(f.suffix == ".py" for f in service_root.glob("src/*")) else "npm",
+                "args": ["run", "start"] if (service_root / "package.json").exists() else ["src/app.py"],
+                "group": "build",
+                "problemMatcher": []
+            },
+            {
+                "label": "Lint Service",
+                "type": "shell",
+                "command": "python" if (service_root / "service.toml").exists() and any(f.suffix == ".py" for f in service_root.glob("src/*")) else "npx",
+                "args": ["ruff", "."] if any(f.suffix == ".py" for f in service_root.glob("src/*")) else ["eslint", "src"],
+                "group": "test",
+                "problemMatcher": []
+            }
+        ]
+    }
+    with open(vscode_dir / "tasks.json", "w", encoding="utf-8") as f:
+        json.dump(tasks, f, indent=2)
+    print(f"[INFO] VS Code tasks.json generated at {vscode_dir / 'tasks.json'}.")
+    return 0
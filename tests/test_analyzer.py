@@ -0,0 +1,102 @@
+from project_assistant.analyzer import analyze_files, analyze_js, analyze_python, mask_js, rank
+
+PY_SOURCE = '''\
+def flat(x):
+    return x + 1
+
+def slow(paths, names):
+    out = []
+    for p in paths:
+        for n in names:
+            if n in p:
+                out.append(n)
+        with open(p) as f:
+            out.append(f.read())
+    return out
+
+class Store:
+    def load(self, keys):
+        return [self.db.get(k) for k in keys]
+'''
+
+JS_SOURCE = '''\
+const fs = require("fs");
+// function commented() { for (;;) {} }
+const text = "function inString() {}";
+
+function loadAll(dirs) {
+  const out = [];
+  for (const d of dirs) {
+    fs.readdirSync(d).forEach((name) => {
+      out.push(fs.readFileSync(name, "utf8"));
+    });
+  }
+  return out;
+}
+
+class Api {
+  handle(req) {
+    if (req.ok) { return 1; }
+    return 0;
+  }
+}
+
+app.get("/", async (req, res) => {
+  res.send(await render());
+});
+'''
+
+
+def test_python_metrics_flag_nested_loops_and_loop_io():
+    found = {f.name: f for f in analyze_python("a.py", PY_SOURCE)}
+    assert set(found) == {"flat", "slow", "Store.load"}
+    slow = found["slow"]
+    assert (slow.start, slow.end) == (4, 12)
+    assert slow.nested_loops == 1 and "open" in slow.loop_io
+    assert slow.complexity == 4
+    assert found["flat"].score < slow.score
+    assert rank(found.values(), top=1)[0].name == "slow"
+
+
+def test_js_scanner_finds_functions_and_ignores_strings_and_comments():
+    masked = mask_js(JS_SOURCE)
+    assert len(masked) == len(JS_SOURCE) and "inString" not in masked and "commented" not in masked
+    found = {f.name: f for f in analyze_js("a.js", JS_SOURCE)}
+    assert set(found) == {"loadAll", "Api.handle", "app.get callback"}
+    load = found["loadAll"]
+    assert (load.start, load.end) == (5, 13)
+    assert load.nested_loops == 1
+    assert {"fs.readdirSync", "fs.readFileSync"} <= set(load.loop_io)
+    assert found["Api.handle"].complexity == 2
+
+
+def test_js_regex_literals_do_not_close_functions():
+    source = (
+        "function a(urls) {\n"
+        "  const re = /}/g, half = urls.length / 2;\n"
+        "  for (const u of urls) {\n"
+        "    if (re.test(u) || /[/}]\\//.test(u)) { fetch(u); }\n"
+        "  }\n"
+        "  return half;\n"
+        "}\n"
+    )
+    masked = mask_js(source)
+    assert "}/g" not in masked and "length / 2" in masked
+    (found,) = analyze_js("a.js", source)
+    assert (found.name, found.start, found.end) == ("a", 1, 7)
+    assert "fetch" in found.loop_io
+
+
+def test_unchanged_files_come_from_the_cache(tmp_path):
+    (tmp_path / "a.py").write_text(PY_SOURCE)
+    (tmp_path / "b.js").write_text(JS_SOURCE)
+    paths = [str(tmp_path / "a.py"), str(tmp_path / "b.js")]
+    cache = tmp_path / "cache.json"
+    first = analyze_files(paths, cache)
+    second = analyze_files(paths, cache)
+    assert first.parsed == 2 and second.parsed == 0
+    assert sorted(f.to_dict().items() for f in first.functions) == \
+        sorted(f.to_dict().items() for f in second.functions)
+    (tmp_path / "a.py").write_text(PY_SOURCE + "\ndef extra():\n    pass\n")
+    third = analyze_files(paths, cache)
+    assert third.parsed == 1 and len(third.functions) == len(first.functions) + 1
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ai_engine.balancer import MIN_SAMPLES
+from ai_engine.client import LlamaClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(503 if self.server.fail else 200, b'{"status": "ok"}')
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+        if self.server.fail:
+            return self._reply(500, b'{"error": "down"}')
+        time.sleep(self.server.delay)
+        events = [{"content": self.server.tag, "stop": False}, {"content": "", "stop": True, "tokens_predicted": 1}]
+        self._reply(200, b"".join(b"data: " + json.dumps(e).encode() + b"\n\n" for e in events), "text/event-stream")
+
+
+class _StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, tag: str, delay: float = 0.0, fail: bool = False):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.tag, self.delay, self.fail, self.requests = tag, delay, fail, 0
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/completion"
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def handle_error(self, request, client_address):
+        pass  # hedged requests that lost the race hang up on us
+
+
+def _client(*servers, **kwargs):
+    kwargs.setdefault("hedge_percentile", 0)
+    return LlamaClient(servers[0].url, slots=1, endpoints=[s.url for s in servers], **kwargs)
+
+
+def test_failing_endpoint_is_ejected_and_requests_fail_over():
+    down, up = _StandIn("down", fail=True), _StandIn("up")
+    client = _client(down, up, breaker_failures=2, breaker_cooldown=60)
+    try:
+        results = [client.complete("p", 5) for _ in range(4)]
+        assert [r.text for r in results] == ["up"] * 4
+        assert down.requests == 2
+        assert client.balancer.endpoints[0].breaker.state == "open"
+    finally:
+        client.close()
+        down.shutdown()
+        up.shutdown()
+
+
+def test_ejected_endpoint_is_probed_and_readmitted():
+    flaky = _StandIn("flaky", fail=True)
+    client = _client(flaky, breaker_failures=1, breaker_cooldown=0.1)
+    try:
+        assert client.complete("p", 5).error
+        # With every endpoint ejected the client answers at once instead of timing out
+        assert "no healthy model endpoint" in client.complete("p", 5).error
+        flaky.fail = False
+        deadline = time.monotonic() + 5
+        while client.balancer.endpoints[0].breaker.state == "open" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert client.complete("p", 5).text == "flaky"
+        assert client.balancer.endpoints[0].breaker.state == "closed"
+    finally:
+        client.close()
+        flaky.shutdown()
+
+
+def test_slow_first_token_is_hedged_to_another_endpoint():
+    slow, fast = _StandIn("slow", delay=2.0), _StandIn("fast")
+    client = _client(slow, fast, hedge_percentile=95, hedge_min_delay=0.05)
+    try:
+        for endpoint in client.balancer.endpoints:
+            for _ in range(MIN_SAMPLES):
+                endpoint.record_latency(0.05)
+        stats = {}
+        started = time.monotonic()
+        assert "".join(client.stream("p", 5, stats=stats)) == "fast"
+        assert time.monotonic() - started < 1.5
+        assert stats["hedged"] and stats["endpoint"] == fast.url
+        assert slow.requests == 1 and fast.requests == 1
+    finally:
+        client.close()
+        slow.shutdown()
+        fast.shutdown()
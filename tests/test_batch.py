@@ -0,0 +1,97 @@
+import io
+import json
+import os
+from concurrent.futures import Future
+
+from ai_engine.client import CompletionResult
+from project_assistant import suggester
+from project_assistant.batch import cmd_suggest, expand_targets, run_batch
+from project_assistant.chunker import Chunk
+from project_assistant.cli import build_parser
+
+
+def _done(result: CompletionResult) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class _FakeClient:
+    """Answers every prompt with "ok", except that prompts containing "bad" fail."""
+
+    def submit(self, prompt, max_tokens=200, affinity=None):
+        if "bad" in prompt:
+            return _done(CompletionResult(error="HTTP 500"))
+        return _done(CompletionResult(content="ok", tokens=1))
+
+
+def _fake_prepare(file_path, task, use_cache, refresh, hotspots=None, related=None):
+    job = suggester._Job(file_path, task)
+    with open(file_path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    for i, line in enumerate(lines, 1):
+        job.chunks.append(Chunk(f"line{i}", i, i, line))
+        job.prompts.append(line)
+        job.keys.append(None)
+        job.answers.append(None)
+    return job
+
+
+def test_expand_targets_dedupes_and_skips_ignored_dirs(tmp_path):
+    (tmp_path / "src" / "node_modules").mkdir(parents=True)
+    (tmp_path / "src" / "a.py").write_text("x = 1\n")
+    (tmp_path / "src" / "b.js").write_text("let y;\n")
+    (tmp_path / "src" / "notes.txt").write_text("skip\n")
+    (tmp_path / "src" / "node_modules" / "dep.js").write_text("skip\n")
+    src = str(tmp_path / "src")
+    files = expand_targets([src, os.path.join(src, "a.py"), os.path.join(src, "*.js")], ["node_modules"])
+    assert files == [os.path.join(src, "a.py"), os.path.join(src, "b.js")]
+    # A file named explicitly is kept even inside an ignored directory
+    named = os.path.join(src, "node_modules", "dep.js")
+    assert expand_targets([named], ["node_modules"]) == [named]
+    assert expand_targets([os.path.join(src, "node_modules", "*.js")], ["node_modules"]) == []
+
+
+def test_run_batch_writes_records_and_fails_on_any_failed_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(suggester, "_prepare", _fake_prepare)
+    monkeypatch.setattr(suggester, "get_client", lambda: _FakeClient())
+    good = tmp_path / "good.py"
+    good.write_text("one\ntwo\n")
+    mixed = tmp_path / "mixed.py"
+    mixed.write_text("fine\nbad\n")
+
+    out = io.StringIO()
+    assert run_batch([str(good)], "refactor", out, workers=1, use_cache=False) == 0
+    record = json.loads(out.getvalue())
+    assert record["file"] == str(good) and record["task"] == "refactor"
+    assert record["output"].startswith("### Lines 1-1") and record["tokens"] == 2
+
+    out = io.StringIO()
+    assert run_batch([str(good), str(mixed)], "refactor", out, workers=2, use_cache=False) == 1
+    records = {r["file"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert set(records) == {str(good), str(mixed)}
+    # The failed chunk is the second section, so the merged report does not start with [ERROR]
+    assert records[str(mixed)]["output"].startswith("### Lines 1-1")
+    assert "[ERROR] Failed to query model: HTTP 500" in records[str(mixed)]["output"]
+
+
+def test_files_the_analyzer_cannot_read_are_sent_whole(tmp_path, monkeypatch):
+    sent = []
+
+    def fake_prepare(file_path, task, use_cache, refresh, hotspots=None, related=None):
+        sent.append(hotspots)
+        return _fake_prepare(file_path, task, use_cache, refresh)
+
+    monkeypatch.setattr(suggester, "_prepare", fake_prepare)
+    monkeypatch.setattr(suggester, "get_client", lambda: _FakeClient())
+    page = tmp_path / "page.ejs"
+    page.write_text("<p>hi</p>\n")
+    # select_hotspots() returns {} when no file in the batch is analyzable
+    assert run_batch([str(page)], "optimize", io.StringIO(), workers=1, use_cache=False, hotspots={}) == 0
+    assert sent == [None]
+
+
+def test_suggest_on_a_missing_file_is_an_error(tmp_path, capsys):
+    args = build_parser().parse_args(["suggest", str(tmp_path / "missing.py"), "--jsonl"])
+    assert cmd_suggest(args) == 2
+    assert "[ERROR] No source files matched" in capsys.readouterr().out
@@ -0,0 +1,37 @@
+import toml
+
+from ai_engine.client import LlamaClient
+from benchmarks.compare import compare
+from benchmarks.fake_llama import FakeLlamaServer, Latency
+from benchmarks.workspace import build_project
+
+
+def test_fake_server_streams_and_reuses_the_slot_prefix():
+    server = FakeLlamaServer(slots=1, latency=Latency(base_ms=0, prompt_ms=0, token_ms=0, tokens=3)).start()
+    client = LlamaClient(server.url, slots=1)
+    try:
+        first = client.complete("x" * 400 + "first", 10, affinity="a")
+        second = client.complete("x" * 400 + "second", 10, affinity="a")
+        assert first.text.split() == ["tok0", "tok1", "tok2"]
+        assert first.cached_tokens == 0 and second.cached_tokens == 100
+        assert server.requests == 2
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_synthetic_project_is_registered_and_deterministic(tmp_path):
+    build_project(tmp_path / "a", services=6, files=2, seed=3)
+    build_project(tmp_path / "b", services=6, files=2, seed=3)
+    registry = toml.load(tmp_path / "a" / "workspace" / "index.toml")["service"]
+    assert [s["name"] for s in registry] == [f"svc-{n:05d}" for n in range(6)]
+    assert (tmp_path / "a" / "workspace" / "svc-00000" / "node_modules" / "express" / "package.json").is_file()
+    source = "workspace/svc-00001/src/handlers_0.py"
+    assert (tmp_path / "a" / source).read_text() == (tmp_path / "b" / source).read_text()
+
+
+def test_compare_ignores_small_absolute_changes():
+    def report(**medians):
+        return {"results": {name: {"median": m} for name, m in medians.items()}}
+    rows = compare(report(fast=0.010, slow=1.0), report(fast=0.013, slow=1.5), threshold=0.1)
+    assert [r["regression"] for r in rows] == [False, True]
@@ -0,0 +1,26 @@
+from ai_engine.cache import ResponseCache, make_key
+
+
+def test_make_key_covers_sampling_parameters():
+    base = make_key("print('hi')", "refactor", "m.gguf", 0.8, 200)
+    assert base == make_key("print('hi')", "refactor", "m.gguf", 0.8, 200)
+    assert base != make_key("print('hi') ", "refactor", "m.gguf", 0.8, 200)
+    assert base != make_key("print('hi')", "optimize", "m.gguf", 0.8, 200)
+    assert base != make_key("print('hi')", "refactor", "other.gguf", 0.8, 200)
+    assert base != make_key("print('hi')", "refactor", "m.gguf", 0.2, 200)
+    assert base != make_key("print('hi')", "refactor", "m.gguf", 0.8, 400)
+
+
+def test_lru_eviction_and_stats(tmp_path):
+    cache = ResponseCache(tmp_path / "c.sqlite3", max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"  # a is now more recently used than b
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 3 and stats["misses"] == 1
+    cache.close()
@@ -0,0 +1,59 @@
+from project_assistant.chunker import fit_to_budget, plan_chunks, split_lines, split_python
+
+SOURCE = '''import os
+
+
+@decorator
+def first():
+    return 1
+
+
+class Thing:
+    """Doc."""
+
+    def a(self):
+        return 1
+
+    def b(self):
+        return 2
+'''
+
+
+def count_lines(texts):
+    return [t.count("\n") for t in texts]
+
+
+def test_split_python_units_and_ranges():
+    chunks = split_python(SOURCE)
+    assert [(c.name, c.start, c.end) for c in chunks] == [
+        ("module", 1, 3),
+        ("def first", 4, 6),
+        ("class Thing", 9, 16),
+    ]
+    assert chunks[1].text.startswith("@decorator")
+
+
+def test_split_python_falls_back_to_lines_on_syntax_error():
+    chunks = split_python("def broken(:\n    pass\n")
+    assert [c.name for c in chunks] == ["lines"]
+
+
+def test_oversized_class_is_split_into_members_then_merged():
+    chunks = fit_to_budget(split_python(SOURCE), 5, count_lines)
+    assert all(c.tokens <= 5 for c in chunks)
+    assert [(c.name, c.start, c.end) for c in chunks[2:]] == [
+        ("class Thing, class Thing.a", 9, 13),
+        ("class Thing.b", 15, 16),
+    ]
+
+
+def test_split_lines_numbers_windows():
+    chunks = split_lines("a\nb\nc\nd\ne\n", window=2)
+    assert [(c.start, c.end) for c in chunks] == [(1, 2), (3, 4), (5, 5)]
+
+
+def test_plan_chunks_sizes_n_predict_to_fit_context():
+    chunks = plan_chunks("x.js", "x\n" * 1000, n_ctx=600, overhead=20, count_tokens=count_lines)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.tokens + chunk.n_predict <= 580
@@ -0,0 +1,21 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from project_assistant.cli import COMMANDS, build_parser, resolve
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_every_command_resolves_to_a_handler():
+    build_parser()
+    for cmd in COMMANDS.values():
+        assert callable(resolve(cmd)), cmd.name
+
+
+def test_check_does_not_import_the_model_client():
+    code = ("import sys; from project_assistant.cli import COMMANDS, resolve; "
+            "resolve(COMMANDS['check']); "
+            "print(sorted(m for m in ('requests', 'ai_engine.client') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
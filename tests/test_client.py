@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ai_engine.balancer import _SlotPool
+from ai_engine.client import LlamaClient, get_client, prompt_stats
+from ai_engine.prompts import SYSTEM_PREFIX, build_prompt
+
+
+def test_slot_pool_prefers_the_slot_that_served_the_same_key():
+    pool = _SlotPool(2)
+    a = pool.acquire("a.py")
+    b = pool.acquire("b.py")
+    pool.release(a)
+    pool.release(b)
+    # a's slot was released first, but b.py still gets its own slot back
+    assert pool.acquire("b.py") == b
+    # while busy, the key falls back to another free slot instead of waiting
+    assert pool.acquire("b.py") == a
+
+
+def test_payload_pins_slot_and_caches_prompt():
+    client = LlamaClient("http://127.0.0.1:1/completion", slots=2)
+    payload = client._payload("p", 10, slot=1)
+    assert payload["cache_prompt"] is True and payload["id_slot"] == 1
+    client.pin_slots = False
+    assert "id_slot" not in client._payload("p", 10, slot=1)
+    client.close()
+
+
+def test_chunks_of_a_file_share_everything_before_their_code():
+    first = build_prompt("def a(): pass", "refactor", "Python", (1, 1), "x.py", "def a\ndef b")
+    second = build_prompt("def b(): pass", "refactor", "Python", (2, 2), "x.py", "def a\ndef b")
+    assert first.startswith(SYSTEM_PREFIX)
+    shared = first[:first.index("It is lines")]
+    assert second.startswith(shared) and "Outline of the file:" in shared
+
+
+def test_prompt_stats_reads_old_and_new_server_fields():
+    assert prompt_stats({"tokens_cached": 7, "timings": {"prompt_n": 3, "prompt_ms": 1.5}}) == \
+        {"prompt_tokens": 3, "prompt_ms": 1.5, "cached_tokens": 7}
+    assert prompt_stats({"timings": {"prompt_n": 3, "cache_n": 9}})["cached_tokens"] == 9
+
+
+class _Echo(BaseHTTPRequestHandler):
+    """Streams the prompt back after a short delay, tracking how many requests overlap."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["prompt"]
+        with self.server.lock:
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+        time.sleep(0.05)
+        with self.server.lock:
+            self.server.active -= 1
+        body = b"data: " + json.dumps({"content": prompt, "stop": True, "tokens_predicted": 1}).encode() + b"\n\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _echo_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Echo)
+    server.daemon_threads = True
+    server.lock, server.active, server.peak = threading.Lock(), 0, 0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/completion"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_pooled_client_caps_in_flight_requests_at_slots():
+    server = _echo_server()
+    client = LlamaClient(server.url, slots=2, hedge_percentile=0)
+    try:
+        prompts = [f"p{i}" for i in range(6)]
+        assert [r.text for r in client.map(prompts, [5] * 6)] == prompts
+        assert server.peak == 2
+        futures = [client.submit(p, 5) for p in prompts]
+        assert [f.result().text for f in futures] == prompts
+        assert server.peak == 2
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_replaced_client_is_closed_once_its_calls_finish(monkeypatch):
+    server = _echo_server()
+    monkeypatch.setenv("LOCALDEV_AI_REMOTE_URL", server.url)
+    monkeypatch.setenv("LOCALDEV_AI_TEMPERATURE", "0.1")
+    old = get_client()
+    closed = []
+    real_close = old.close
+    monkeypatch.setattr(old, "close", lambda: (closed.append(1), real_close()))
+    try:
+        running = old.stream("p", 5)
+        assert next(running) == "p"
+        monkeypatch.setenv("LOCALDEV_AI_TEMPERATURE", "0.2")
+        new = get_client()
+        assert new is not old and closed == []
+        assert list(running) == []
+        assert closed == [1]
+        new.close()
+    finally:
+        server.shutdown()
@@ -0,0 +1,51 @@
+import os
+
+from project_assistant.config import get_config, service_config
+
+CONFIG = """
+[ai]
+remote_url = "http://a:1/completion"
+slots = 2
+
+[run]
+debounce_ms = 300
+watch_ignore = ["*.gen.js"]
+"""
+
+
+def test_reload_only_when_file_changes(tmp_path, capsys):
+    path = tmp_path / "config.project.toml"
+    path.write_text(CONFIG)
+    first = get_config(path)
+    assert first.ai.slots == 2 and first.cache.enabled
+    assert get_config(path) is first
+
+    path.write_text(CONFIG.replace("slots = 2", "slots = 6"))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+    assert get_config(path).ai.slots == 6
+
+    # A broken edit keeps the last good settings and says so on stderr only
+    path.write_text("[ai\nslots = ")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2_000_000))
+    assert get_config(path).ai.slots == 6
+    out, err = capsys.readouterr()
+    assert out == "" and "[WARN] Could not parse" in err
+
+
+def test_service_overlay_and_env_overrides(tmp_path, monkeypatch):
+    path = tmp_path / "config.project.toml"
+    path.write_text(CONFIG)
+    service = tmp_path / "svc"
+    service.mkdir()
+    (service / "service.toml").write_text('debounce_ms = 50\nwatch_ignore = ["dist/"]\n[ai]\nslots = 1\n')
+
+    config = service_config(service, path)
+    assert config.run.debounce_ms == 50
+    assert config.run.watch_ignore == ["*.gen.js", "dist/"]
+    assert config.ai.slots == 1 and config.ai.remote_url == "http://a:1/completion"
+
+    monkeypatch.setenv("LOCALDEV_AI_REMOTE_URL", "http://b:2/completion")
+    monkeypatch.setenv("LOCALDEV_RUN_DEBOUNCE_MS", "75")
+    config = service_config(service, path)
+    assert config.ai.remote_url == "http://b:2/completion"
+    assert config.run.debounce_ms == 75
@@ -0,0 +1,49 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from project_assistant import daemon
+
+ROOT = Path(__file__).resolve().parents[1]
+MAIN = str(ROOT / "main.py")
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "send_fds"), reason="needs Unix descriptor passing")
+
+
+def test_command_name_skips_global_options():
+    assert daemon._command(["--trace", "t.json", "--timings", "check", "--json"]) == "check"
+    assert daemon._command(["--profile", "-", "run", "api"]) == "run"
+    assert daemon._command(["--version"]) is None
+
+
+def test_forwarded_commands_match_in_process_runs(tmp_path):
+    (tmp_path / "a.py").write_text("def f(xs):\n    for x in xs:\n        for y in xs:\n            print(x, y)\n")
+    env = dict(os.environ, LOCALDEV_STATE_DIR=str(tmp_path / "state"))
+    # Fill the analyze cache first so both runs report the same cache hits
+    subprocess.run([sys.executable, MAIN, "analyze", "a.py"], cwd=tmp_path, env=env, capture_output=True, check=True)
+    server = subprocess.Popen([sys.executable, MAIN, "serve"], cwd=tmp_path, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        assert "Listening" in server.stdout.readline()
+        for argv in (["analyze", "a.py", "--min-score", "0"], ["lint"], ["debug", "stats", "nothing"]):
+            served = subprocess.run([sys.executable, MAIN, *argv], cwd=tmp_path, env=env,
+                                    capture_output=True, text=True)
+            local = subprocess.run([sys.executable, MAIN, *argv], cwd=tmp_path,
+                                   env=dict(env, LOCALDEV_NO_DAEMON="1"), capture_output=True, text=True)
+            assert (served.returncode, served.stdout, served.stderr) == \
+                (local.returncode, local.stdout, local.stderr), argv
+        status = subprocess.run([sys.executable, MAIN, "serve", "--stop"], cwd=tmp_path, env=env,
+                                capture_output=True, text=True)
+        assert "3 command(s) served" in status.stdout
+        server.wait(10)
+    finally:
+        if server.poll() is None:
+            server.kill()
+        server.stdout.close()
+    time.sleep(0.1)
+    assert not (tmp_path / "state" / daemon.SOCKET_NAME).exists()
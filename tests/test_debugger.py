@@ -0,0 +1,45 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from project_assistant import debugger
+from project_assistant.config import MonitorSettings
+
+pytestmark = pytest.mark.skipif(not debugger.supported(), reason="needs Linux /proc")
+
+CHILD = "import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']); time.sleep(30)"
+
+
+def test_samples_the_service_and_its_descendants(tmp_path):
+    proc = subprocess.Popen([sys.executable, "-c", CHILD])
+    try:
+        monitor = debugger.ResourceMonitor(MonitorSettings(), tmp_path)
+        monitor.track("api", lambda: proc)
+        deadline = time.monotonic() + 10
+        while True:
+            monitor.sample()
+            stats = debugger.load_stats("api", tmp_path)
+            if stats["totals"]["processes"] == 2 or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        assert stats["pid"] == proc.pid and stats["starts"] == 1
+        assert [p["ppid"] for p in stats["processes"]][1] == proc.pid
+        assert stats["totals"]["rss"] > 0 and stats["totals"]["fds"] >= 3 and stats["totals"]["threads"] >= 2
+        metrics = monitor.metrics_text()
+        assert 'localdev_service_up{service="api"} 1' in metrics
+        assert 'localdev_service_processes{service="api"} 2' in metrics
+    finally:
+        proc.kill()
+        proc.wait()
+    monitor.sample()
+    assert debugger.load_stats("api", tmp_path)["totals"]["processes"] == 0
+
+
+def test_steady_growth_is_a_leak_and_churn_is_not():
+    steady = [(t, 100e6 + t * 50_000) for t in range(0, 301, 10)]
+    slope, correlation = debugger.rss_trend(steady)
+    assert slope == pytest.approx(50_000) and correlation == pytest.approx(1.0)
+    churn = [(t, 100e6 + (40e6 if t % 20 else 0) + t * 1_000) for t in range(0, 301, 10)]
+    assert debugger.rss_trend(churn)[1] < debugger.LEAK_MIN_CORRELATION
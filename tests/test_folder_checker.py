@@ -0,0 +1,37 @@
+from project_assistant.folder_checker import check_folder_integrity, compile_forbid_patterns
+
+
+def make_service(root, name, files):
+    for rel in ["src/routes", "src/controllers", "views", "public", "tests", "docs"]:
+        (root / name / rel).mkdir(parents=True, exist_ok=True)
+    for rel in files:
+        path = root / name / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+
+
+def test_compiled_matcher_is_case_insensitive():
+    matcher = compile_forbid_patterns(["*.tmp", ".DS_Store"])
+    assert matcher.match("notes.TMP".lower())
+    assert matcher.match(".ds_store")
+    assert not matcher.match("app.js")
+
+
+def test_cached_run_matches_and_changed_only(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALDEV_STATE_DIR", str(tmp_path / "state"))
+    ws = tmp_path / "ws"
+    make_service(ws, "a", ["src/x.log", "node_modules/pkg/y.log"])
+    make_service(ws, "b", ["views/old.bak"])
+
+    first = check_folder_integrity(base_path=str(ws))
+    forbidden = [p for p in first if p.startswith("[FORBIDDEN]")]
+    assert len(forbidden) == 2
+    assert any(p.startswith("[FORBIDDEN] a/ Matches '*.log'") and p.endswith("x.log") for p in forbidden)
+    assert any(p.startswith("[FORBIDDEN] b/ Matches '*.bak'") and p.endswith("old.bak") for p in forbidden)
+    assert check_folder_integrity(base_path=str(ws)) == first
+
+    assert check_folder_integrity(base_path=str(ws), changed_only=True) == []
+    (ws / "b" / "docs" / "new.tmp").write_text("")
+    changed = check_folder_integrity(base_path=str(ws), changed_only=True)
+    assert changed and all(p.split(" ", 2)[1] == "b/" for p in changed)
+    assert any(p.endswith("new.tmp") for p in changed)
@@ -0,0 +1,98 @@
+import shutil
+import sys
+
+import pytest
+
+from project_assistant import formatter
+
+FAKE_PRETTIER = """
+exports.getFileInfo = async (p) => ({ ignored: p.endsWith("skip.js"), inferredParser: "babel" });
+exports.resolveConfig = async () => null;
+exports.format = async (src) => {
+  if (src.includes("SYNTAX")) throw new Error("Unexpected token");
+  return src.replace(/ +/g, " ").replace(/\\n*$/, "\\n");
+};
+"""
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="needs node")
+def test_prettier_worker_formats_batches_and_skips_unchanged_files(tmp_path, monkeypatch):
+    root = tmp_path / "web"
+    package = root / "node_modules" / "prettier"
+    package.mkdir(parents=True)
+    (package / "package.json").write_text('{"name": "prettier", "main": "index.js"}')
+    (package / "index.js").write_text(FAKE_PRETTIER)
+    (root / "package.json").write_text('{"name": "web"}\n')
+    for i in range(3):
+        (root / f"f{i}.js").write_text(f"const  a  = {i};")
+    (root / "skip.js").write_text("const  kept =  1;")
+    (root / "bad.js").write_text("SYNTAX")
+    pool = formatter._WorkerPool()
+    monkeypatch.setattr(formatter, "get_pool", lambda: pool)
+    cache = tmp_path / "format_cache.json"
+
+    report = formatter.format_services([str(root)], cache)
+    job = report["jobs"][0]
+    assert sorted(job["changed"]) == ["f0.js", "f1.js", "f2.js"]
+    assert job["failed"] == {"bad.js": "Unexpected token"}
+    assert (root / "f0.js").read_text() == "const a = 0;\n"
+    assert (root / "skip.js").read_text() == "const  kept =  1;"
+    [worker] = [w for idle in pool._idle.values() for w in idle]
+
+    (root / "f1.js").write_text("let  b = 1;\n")
+    job = formatter.format_services([str(root)], cache)["jobs"][0]
+    assert job["checked"] == 2 and job["changed"] == ["f1.js"]  # the edit, plus bad.js still failing
+    # One warm worker served both runs
+    assert [w for idle in pool._idle.values() for w in idle] == [worker] and worker.proc.poll() is None
+    pool.close()
+
+
+# Warns on stderr for every request, as Prettier plugins do, then answers; "die" makes it exit
+NOISY_WORKER = """
+import json, sys
+for line in sys.stdin:
+    req = json.loads(line)
+    sys.stderr.write("warning: deprecated option\\n" * 200)
+    if req.get("die"):
+        sys.stderr.write("fatal: plugin crashed\\n")
+        sys.exit(1)
+    print(json.dumps({"id": req["id"], "output": "ok"}), flush=True)
+"""
+
+
+def test_worker_stderr_is_drained_and_kept_for_errors():
+    worker = formatter._Worker([sys.executable, "-c", NOISY_WORKER])
+    try:
+        # Far more stderr than a pipe buffer holds; an undrained pipe would stall the worker here
+        for _ in range(3):
+            replies = worker.request([{"id": i} for i in range(50)])
+            assert len(replies) == 50
+        with pytest.raises(formatter.FormatterError, match="fatal: plugin crashed"):
+            worker.request([{"id": 0, "die": True}])
+        assert worker.broken and len(worker.stderr_tail) == formatter.STDERR_TAIL
+    finally:
+        worker.close()
+
+
+@pytest.mark.skipif(not shutil.which("ruff"), reason="needs ruff")
+def test_ruff_check_mode_reports_without_writing(tmp_path):
+    root = tmp_path / "api"
+    root.mkdir()
+    (root / "a.py").write_text('x = {  "a":1 }\n')
+    (root / "b.py").write_text("y = 1\n")
+    cache = tmp_path / "format_cache.json"
+    job = formatter.format_services([str(root)], cache, check=True)["jobs"][0]
+    assert job["changed"] == ["a.py"] and (root / "a.py").read_text() == 'x = {  "a":1 }\n'
+    job = formatter.format_services([str(root)], cache)["jobs"][0]
+    assert job["checked"] == 1 and job["changed"] == ["a.py"]
+    assert (root / "a.py").read_text() == 'x = {"a": 1}\n'
+
+
+def test_missing_formatters_warn_on_stderr(tmp_path, monkeypatch, capsys):
+    (tmp_path / "package.json").write_text("{}")
+    (tmp_path / "a.py").write_text("x = 1\n")
+    monkeypatch.setattr(formatter.shutil, "which", lambda name: None)
+    assert formatter._plan(tmp_path, set()) == []
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "Prettier not found" in err and "Ruff not found" in err
@@ -0,0 +1,57 @@
+import os
+
+from project_assistant import linter
+
+
+def test_only_changed_files_are_relinted(tmp_path, monkeypatch):
+    root = tmp_path / "svc"
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "a.py").write_text("import os\n")
+    (root / "src" / "b.py").write_text("x = 1\n")
+    calls = []
+
+    def fake_ruff(service_root, files):
+        calls.append(sorted(files))
+        return {f: [[1, 1, "F401", "unused", "error"]] for f in files if "import" in (service_root / f).read_text()}
+
+    monkeypatch.setattr(linter.shutil, "which", lambda name: name if name == "ruff" else None)
+    monkeypatch.setitem(linter.RUNNERS, "ruff", fake_ruff)
+    cache_path = tmp_path / "lint_cache.json"
+
+    report = linter.lint_services([str(root)], cache_path)
+    assert calls == [[os.path.join("src", "a.py"), os.path.join("src", "b.py")]]
+    assert [(f.path, f.rule) for f in report["findings"]] == [(os.path.join("src", "a.py"), "F401")]
+    assert linter.exit_code(report) == 1
+
+    # Unchanged files come from the cache, even after a touch
+    os.utime(root / "src" / "a.py")
+    report = linter.lint_services([str(root)], cache_path)
+    assert len(calls) == 1
+    assert len(report["findings"]) == 1
+
+    (root / "src" / "a.py").write_text("x = 2\n")
+    report = linter.lint_services([str(root)], cache_path)
+    assert calls[1] == [os.path.join("src", "a.py")]
+    assert report["findings"] == [] and linter.exit_code(report) == 0
+
+def test_missing_linters_warn_on_stderr(tmp_path, monkeypatch, capsys):
+    (tmp_path / "package.json").write_text("{}")
+    (tmp_path / "a.py").write_text("x = 1\n")
+    monkeypatch.setattr(linter.shutil, "which", lambda name: None)
+    monkeypatch.setattr(linter, "_eslint_command", lambda root: None)
+    assert linter._plan(tmp_path, set()) == []
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "ESLint not found" in err and "Ruff/flake8 not found" in err
+
+
+def test_linter_upgrade_invalidates_cached_findings(tmp_path, monkeypatch):
+    tool = tmp_path / "bin" / "ruff"
+    tool.parent.mkdir()
+    tool.write_text("v1")
+    monkeypatch.setattr(linter.shutil, "which", lambda name: str(tool) if name == "ruff" else None)
+    before = linter._config_digest(tmp_path, "ruff")
+    assert linter._config_digest(tmp_path, "ruff") == before
+    tool.write_text("v2")
+    os.utime(tool, ns=(0, os.stat(tool).st_mtime_ns + 1_000_000))
+    assert linter._config_digest(tmp_path, "ruff") != before
@@ -0,0 +1,56 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from project_assistant import loadgen
+from project_assistant.config import BenchSettings
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/chunked":
+            self.wfile.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n0\r\n\r\n")
+        elif self.path == "/close":
+            self.wfile.write(b"HTTP/1.1 503 Unavailable\r\nConnection: close\r\n\r\nbusy")
+            self.close_connection = True
+        else:
+            self.wfile.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def port():
+    Handler.protocol_version = "HTTP/1.1"
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("path", ["/", "/chunked"])
+def test_keep_alive_load_reports_percentiles(port, path):
+    report = loadgen.run_load(port, BenchSettings(path=path, concurrency=4, duration=0.3, warmup=0.1))
+    assert report["ok"] == report["requests"] > 10 and report["errors"] == 0
+    assert report["status"] == {"200": report["ok"]}
+    latency = report["latency_ms"]
+    assert 0 < latency["min"] <= latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    assert report["throughput"] > 0
+
+
+def test_open_loop_rate_and_server_errors(port):
+    report = loadgen.run_load(port, BenchSettings(path="/close", concurrency=2, rate=50, duration=0.4, warmup=0))
+    assert 15 <= report["requests"] <= 20
+    assert report["ok"] == 0 and report["errors"] == report["status"]["503"] == report["requests"]
+
+
+def test_compare_flags_regressions_beyond_tolerance_and_noise():
+    baseline = {"throughput": 1000.0, "latency_ms": {"p50": 2.0, "p95": 10.0, "p99": 20.0}}
+    report = {"throughput": 850.0, "latency_ms": {"p50": 2.6, "p95": 10.5, "p99": 30.0}}
+    comparison = loadgen.compare(baseline, report, 0.10)
+    # p50 grew 30% but by less than MIN_DELTA_MS; p95 grew by 5%
+    assert comparison["regressions"] == ["throughput", "p99"]
@@ -0,0 +1,68 @@
+import io
+import os
+import time
+
+from project_assistant import logmux
+from project_assistant.logmux import LogMux, _RotatingLog, tail_log_file
+
+
+class _Proc:
+    """Just enough of a Popen for LogMux.add: a stdout pipe the test writes to."""
+
+    def __init__(self):
+        read_fd, self.write_fd = os.pipe()
+        self.stdout = os.fdopen(read_fd, "rb", buffering=0)
+        self.stderr = None
+
+    def write(self, data: bytes):
+        os.write(self.write_fd, data)
+        time.sleep(0.05)  # let the mux read each write on its own
+
+    def exit(self):
+        os.close(self.write_fd)
+
+
+def test_lines_split_across_reads_are_joined(tmp_path):
+    out = io.StringIO()
+    mux = LogMux(out=out, ring_lines=2, log_dir=tmp_path)
+    proc = _Proc()
+    mux.add(proc, "api")
+    proc.write(b"hel")
+    proc.write(b"lo\nwor")
+    proc.write(b"ld\nlast line\nno newline")
+    proc.exit()
+    mux.close()
+    assert out.getvalue() == "[api] hello\n[api] world\n[api] last line\n[api] no newline\n"
+    # The ring keeps only the newest ring_lines lines
+    assert mux.tail("api") == ["last line", "no newline"]
+    assert mux.tail("api", 1) == ["no newline"] and mux.tail("other") == []
+    assert (tmp_path / "api.log").read_text() == "hello\nworld\nlast line\nno newline\n"
+
+
+def test_output_without_newlines_is_not_buffered_forever(monkeypatch):
+    monkeypatch.setattr(logmux, "MAX_LINE", 8)
+    out = io.StringIO()
+    mux = LogMux(out=out)
+    proc = _Proc()
+    mux.add(proc, "spin")
+    proc.write(b"." * 20)
+    deadline = time.monotonic() + 2
+    while out.getvalue().count("\n") < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Full pieces are passed on while the pipe is still open; the rest waits for a newline or EOF
+    assert out.getvalue() == "[spin] ........\n[spin] ........\n"
+    proc.exit()
+    mux.close()
+    assert out.getvalue().endswith("[spin] ....\n")
+
+
+def test_log_rotation_keeps_backups_and_tail_reads_across_them(tmp_path):
+    log = _RotatingLog(tmp_path / "svc.log", max_bytes=10, backups=2)
+    for i in range(5):
+        log.write(f"line {i}\n".encode())  # 7 bytes: one line per file
+    log.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["svc.log", "svc.log.1", "svc.log.2"]
+    assert (tmp_path / "svc.log").read_text() == "line 4\n"
+    assert (tmp_path / "svc.log.2").read_text() == "line 2\n"
+    assert tail_log_file("svc", 2, tmp_path) == ["line 3", "line 4"]
+    assert tail_log_file("svc", 10, tmp_path) == ["line 2", "line 3", "line 4"]
@@ -0,0 +1,59 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from project_assistant import orchestrator
+from project_assistant.orchestrator import (INITIAL_BACKOFF, STABLE_AFTER, ServiceSpec, Supervisor,
+                                            dependency_levels, next_backoff)
+
+
+def _specs(graph: dict) -> dict:
+    return {name: ServiceSpec(name, Path("."), "node", "index.js", depends_on=deps) for name, deps in graph.items()}
+
+
+def test_dependency_levels_start_dependencies_first():
+    levels = dependency_levels(_specs({
+        "gateway": ["users", "orders"],
+        "orders": ["db", "users"],
+        "users": ["db"],
+        "db": [],
+        "metrics": [],
+    }))
+    assert levels == [["db", "metrics"], ["users"], ["orders"], ["gateway"]]
+
+
+def test_dependency_cycle_names_the_services_involved():
+    with pytest.raises(ValueError, match="cycle between: a, b, c"):
+        dependency_levels(_specs({"a": ["b"], "b": ["c"], "c": ["a"], "root": []}))
+
+
+def test_backoff_doubles_up_to_the_cap_and_resets_after_a_stable_run():
+    delays = []
+    backoff = None
+    for _ in range(8):
+        backoff = next_backoff(backoff, uptime=1.0, max_backoff=10.0)
+        delays.append(backoff)
+    assert delays == [INITIAL_BACKOFF * 2 ** i for i in range(5)] + [10.0, 10.0, 10.0]
+    assert next_backoff(10.0, uptime=STABLE_AFTER, max_backoff=10.0) == INITIAL_BACKOFF
+
+
+def test_supervisor_restarts_a_crashing_child(tmp_path, monkeypatch):
+    monkeypatch.setattr(orchestrator, "INITIAL_BACKOFF", 0.01)
+    script = tmp_path / "crash.py"
+    script.write_text("import sys\nsys.exit(3)\n")
+    stopping = threading.Event()
+    supervisor = Supervisor(ServiceSpec("crash", tmp_path, sys.executable, str(script)), [], stopping,
+                            max_backoff=0.02)
+    supervisor.start()
+    try:
+        deadline = time.monotonic() + 10
+        while supervisor.restarts < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert supervisor.restarts >= 2
+    finally:
+        stopping.set()
+        supervisor.join(5)
+    assert not supervisor.is_alive()
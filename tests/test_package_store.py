@@ -0,0 +1,44 @@
+import json
+import os
+
+from project_assistant.package_store import PackageStore, satisfies
+
+
+def _package(node_modules, name, version, dependencies=None):
+    pkg = node_modules / name
+    pkg.mkdir(parents=True)
+    (pkg / "package.json").write_text(json.dumps({"name": name, "version": version,
+                                                  "dependencies": dependencies or {}}))
+    (pkg / "index.js").write_text(f"module.exports = '{name}@{version}';\n")
+    return pkg
+
+
+def test_satisfies_common_ranges():
+    assert satisfies("4.21.2", "^4.18.0")
+    assert not satisfies("5.0.0", "^4.18.0")
+    assert satisfies("0.2.5", "^0.2.1") and not satisfies("0.3.0", "^0.2.1")
+    assert satisfies("2.1.35", "~2.1.24") and not satisfies("2.2.0", "~2.1.24")
+    assert satisfies("1.3.1", ">= 1.2.0 < 2") and satisfies("1.0.0", "1.x || >=3")
+    assert not satisfies("2.0.0-beta.1", "^1.0.0") and not satisfies("1.0.0", "github:user/repo")
+
+
+def test_services_link_shared_files_and_report_what_is_missing(tmp_path):
+    installed = tmp_path / "gateway" / "node_modules"
+    _package(installed, "a", "1.0.0", {"b": "^1.0.0"})
+    _package(installed, "b", "1.2.0")
+    # a second copy of b, nested because some other package needed 2.x
+    _package(installed / "a" / "node_modules", "b", "2.0.0")
+    store = PackageStore(tmp_path / "store")
+    assert sorted(store.add_tree(installed)) == ["a@1.0.0", "b@1.2.0", "b@2.0.0"]
+
+    service = tmp_path / "new"
+    service.mkdir()
+    (service / "package.json").write_text(json.dumps({"dependencies": {"a": "^1.0.0", "c": "^1.0.0"}}))
+    result = store.link_service(service)
+    assert result.missing == ["c@^1.0.0"]
+    blob = store.manifest("a", "1.0.0")["files"]["index.js"]
+    assert os.path.samefile(service / "node_modules" / "a" / "index.js", store.root / "files" / blob[:2] / blob)
+    assert json.loads((service / "node_modules" / "b" / "package.json").read_text())["version"] == "1.2.0"
+
+    again = store.link_service(service)
+    assert (again.linked, again.present) == (0, 2)
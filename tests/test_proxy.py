@@ -0,0 +1,67 @@
+import socket
+import socketserver
+import threading
+import time
+
+from project_assistant.proxy import SwitchingProxy, free_port
+
+
+def _tagged_server(tag: bytes):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            self.wfile.write(tag + line)
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _ask(port: int, sock=None) -> bytes:
+    sock = sock or socket.create_connection(("127.0.0.1", port), timeout=5)
+    with sock:
+        sock.sendall(b"ping\n")
+        return sock.makefile("rb").readline()
+
+
+def test_switch_sends_new_connections_to_new_backend_and_drains_old():
+    old, new = _tagged_server(b"old:"), _tagged_server(b"new:")
+    proxy = SwitchingProxy(free_port(), listen_host="127.0.0.1")
+    try:
+        proxy.start(old.server_address[1])
+        assert _ask(proxy.listen_port) == b"old:ping\n"
+        assert proxy.drain(old.server_address[1], timeout=5)
+
+        held = socket.create_connection(("127.0.0.1", proxy.listen_port), timeout=5)
+        deadline = time.monotonic() + 5
+        while proxy.active[old.server_address[1]] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        proxy.switch(new.server_address[1])
+        assert _ask(proxy.listen_port) == b"new:ping\n"
+        # The connection opened before the switch still reaches the old backend
+        assert not proxy.drain(old.server_address[1], timeout=0.2)
+        assert _ask(proxy.listen_port, held) == b"old:ping\n"
+        assert proxy.drain(old.server_address[1], timeout=5)
+    finally:
+        proxy.close()
+        old.shutdown()
+        new.shutdown()
+
+
+def test_failed_bind_stops_the_proxy_loop():
+    taken = socket.socket()
+    taken.bind(("127.0.0.1", 0))
+    taken.listen()
+    proxy = SwitchingProxy(taken.getsockname()[1], listen_host="127.0.0.1")
+    try:
+        try:
+            proxy.start(free_port())
+        except OSError:
+            pass
+        else:
+            raise AssertionError("binding a port that is in use must fail")
+        assert not proxy._thread.is_alive() and proxy._loop.is_closed()
+        proxy.close()  # the caller's own cleanup stays harmless
+    finally:
+        taken.close()
@@ -0,0 +1,60 @@
+import os
+
+from project_assistant.retrieval import RetrievalIndex, terms
+
+STORE = '''\
+def fetch_user_record(conn, user_id):
+    row = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+    return dict(row) if row else None
+
+def render_invoice(order):
+    return f"{order.total:.2f}"
+'''
+
+HANDLERS = '''\
+from store import fetch_user_record
+
+def list_users(conn, user_ids):
+    return [fetch_user_record(conn, user_id) for user_id in user_ids]
+'''
+
+def _project(tmp_path):
+    root = tmp_path / "workspace"
+    root.mkdir()
+    (root / "store.py").write_text(STORE)
+    (root / "handlers.py").write_text(HANDLERS)
+    return root
+
+def test_terms_split_identifiers():
+    counts = terms("fetchUserRecord(user_id); fetch_user_record()")
+    assert counts["fetchuserrecord"] == 1
+    assert counts["fetch_user_record"] == 1
+    assert counts["fetch"] == 2 and counts["user"] == 3 and counts["record"] == 2
+
+def test_search_finds_callee_in_other_file(tmp_path):
+    root = _project(tmp_path)
+    index = RetrievalIndex(tmp_path / "retrieval.sqlite3", [str(root)])
+    try:
+        assert index.refresh(force=True) == (2, 0)
+        handlers = str(root / "handlers.py")
+        hits = index.search(terms(HANDLERS), top_k=3, exclude=handlers)
+        assert hits and hits[0].name == "fetch_user_record"
+        assert hits[0].path == os.path.abspath(root / "store.py")
+        assert all(hit.path != os.path.abspath(handlers) for hit in hits)
+    finally:
+        index.close()
+
+def test_refresh_only_touches_changed_files(tmp_path):
+    root = _project(tmp_path)
+    index = RetrievalIndex(tmp_path / "retrieval.sqlite3", [str(root)])
+    try:
+        index.refresh(force=True)
+        assert index.refresh(force=True) == (0, 0)
+        (root / "store.py").write_text(STORE + "\ndef archive_orders(orders):\n    return list(orders)\n")
+        assert index.refresh(force=True) == (1, 0)
+        assert index.search(terms("archive_orders"), top_k=1)[0].name == "archive_orders"
+        (root / "handlers.py").unlink()
+        assert index.refresh(force=True) == (0, 1)
+        assert index.stats()["files"] == 1
+    finally:
+        index.close()
@@ -5,7 +5,8 @@ import sys
 import types
 import pytest
 from pathlib import Path
-from run_helper import find_service_root, find_entrypoint, run
+from project_assistant.services import find_entrypoint, run_service as run
+from project_assistant.utils import find_service_root
 
 
 def test_find_service_root(tmp_path):
@@ -62,11 +63,19 @@ def test_find_entrypoint_minimal(tmp_path):
     assert entry.endswith("main.js")
 
     # Create a dummy Python service
-    (tmp_path / "main.py").write_text("print('hi')\n")
-    cmd, entry = find_entrypoint(tmp_path)
+    py_root = tmp_path / "py"
+    py_root.mkdir()
+    (py_root / "main.py").write_text("print('hi')\n")
+    cmd, entry = find_entrypoint(py_root)
     assert cmd == sys.executable
     assert entry.endswith("main.py")
 
+    # With both, the JS entry point is found first
+    (tmp_path / "main.py").write_text("print('hi')\n")
+    cmd, entry = find_entrypoint(tmp_path)
+    assert cmd == "node"
+    assert entry.endswith("main.js")
+
     # service.toml with entrypoint
     (tmp_path / "service.toml").write_text("entrypoint = 'main.py'\n")
     cmd, entry = find_entrypoint(tmp_path)
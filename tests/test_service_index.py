@@ -0,0 +1,35 @@
+import os
+
+from project_assistant.service_index import ServiceIndex
+
+
+def test_index_persists_and_revalidates_on_change(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = tmp_path / "workspace" / "api"
+    service.mkdir(parents=True)
+    (service / "service.toml").write_text("port = 8001\n")
+    (service / "app.py").write_text("print('hi')\n")
+    index_path = tmp_path / ".localdev" / "services.json"
+
+    entry = ServiceIndex(index_path).lookup("api")
+    assert entry.root == str(service) and entry.runtime == "python" and entry.port == 8001
+
+    reloaded = ServiceIndex(index_path)
+    assert reloaded.entries["api"] == entry
+    assert reloaded.lookup("api") is reloaded.entries["api"]  # still valid, not re-probed
+
+    (service / "service.toml").write_text("port = 8002\n")
+    os.utime(service / "service.toml", ns=(0, os.stat(service / "service.toml").st_mtime_ns + 1_000_000))
+    assert reloaded.lookup("api").port == 8002
+
+
+def test_service_dir_follows_registry_paths(tmp_path, monkeypatch):
+    from project_assistant.linter import resolve_service_dir
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LOCALDEV_STATE_DIR", str(tmp_path / ".localdev"))
+    elsewhere = tmp_path / "services" / "billing-v2"
+    elsewhere.mkdir(parents=True)
+    (tmp_path / "workspace").mkdir()
+    (tmp_path / "workspace" / "index.toml").write_text(f'[services.billing]\npath = "{elsewhere.as_posix()}"\n')
+    assert resolve_service_dir("billing") == elsewhere
+    assert resolve_service_dir("missing") is None
@@ -0,0 +1,90 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ai_engine import interface
+from ai_engine.client import LlamaClient, iter_sse_events
+
+
+def _event(**fields) -> bytes:
+    return b"data: " + json.dumps(fields).encode() + b"\n\n"
+
+
+STOP = _event(content="", stop=True, tokens_predicted=2,
+              timings={"prompt_n": 5, "prompt_ms": 1.5, "cache_n": 3})
+SCRIPTS = {
+    # A keep-alive comment, two tokens, the final event, then anything after it is ignored
+    "ok": [b": ping\n\n", _event(content="Hel", stop=False), _event(content="lo", stop=False), STOP,
+           _event(content=" trailing", stop=False)],
+    "broken": [_event(content="par", stop=False), b"data: {not json\n\n"],
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.server.payloads.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for line in SCRIPTS[self.server.script]:
+            self.wfile.write(line)
+            self.wfile.flush()
+
+
+class _StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, script: str):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.script, self.payloads = script, []
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/completion"
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+def test_sse_lines_are_decoded_until_done():
+    lines = [b"", b": comment", b'data: {"content": "a"}', 'data: {"content": "b"}', b"data: [DONE]",
+             b'data: {"content": "late"}']
+    assert [e["content"] for e in iter_sse_events(lines)] == ["a", "b"]
+
+
+def test_stream_yields_tokens_and_reads_the_stop_event(monkeypatch):
+    server = _StandIn("ok")
+    client = LlamaClient(server.url, slots=1, hedge_percentile=0)
+    monkeypatch.setattr(interface, "get_client", lambda: client)
+    try:
+        stats = {}
+        assert list(interface.stream_llama("p", 7, stats=stats)) == ["Hel", "lo"]
+        assert stats["tokens"] == 2 and stats["ttft"] is not None
+        assert (stats["prompt_tokens"], stats["prompt_ms"], stats["cached_tokens"]) == (5, 1.5, 3)
+        payload = server.payloads[0]
+        assert payload["stream"] and payload["n_predict"] == 7 and payload["cache_prompt"]
+        assert client.complete("p", 7).text == "Hello"
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_error_mid_stream_is_raised_after_the_tokens_so_far():
+    server = _StandIn("broken")
+    client = LlamaClient(server.url, slots=1, hedge_percentile=0)
+    try:
+        received = []
+        try:
+            for piece in client.stream("p", 5):
+                received.append(piece)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("a malformed event must not end the stream silently")
+        assert received == ["par"]
+        result = client.complete("p", 5)
+        assert result.error and result.text.startswith("[ERROR] Failed to query model:")
+        # The slot is released either way, so the next request does not wait for it
+        assert client.complete("p", 5).error
+    finally:
+        client.close()
+        server.shutdown()
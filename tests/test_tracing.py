@@ -0,0 +1,36 @@
+import json
+import subprocess
+import sys
+
+from project_assistant import tracing
+
+
+def test_spans_are_free_when_tracing_is_off():
+    assert tracing.span("a") is tracing.span("b")
+    with tracing.span("a") as s:
+        s.set(x=1)
+
+
+def test_trace_file_holds_nested_spans_and_subprocesses(tmp_path):
+    path = tmp_path / "trace.json"
+
+    @tracing.traced()
+    def lookup():
+        return 42
+
+    tracing.start(str(path))
+    try:
+        with tracing.span("outer", items=2) as outer:
+            assert lookup() == 42
+            outer.set(found=True)
+        proc = subprocess.Popen([sys.executable, "-c", "pass"])
+        tracing.process(proc, "child")
+        proc.wait()
+    finally:
+        tracing.stop()
+    events = {e["name"]: e for e in json.loads(path.read_text())["traceEvents"] if e["ph"] == "X"}
+    outer, inner = events["outer"], events["test_trace_file_holds_nested_spans_and_subprocesses.<locals>.lookup"]
+    assert outer["args"] == {"items": 2, "found": True}
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert events["child"]["pid"] == proc.pid and events["child"]["args"]["returncode"] in (0, "still running")
+    assert tracing.span("after") is tracing.span("off again")
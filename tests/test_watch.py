@@ -0,0 +1,63 @@
+import threading
+import time
+
+from watchdog.events import FileModifiedEvent, FileMovedEvent, FileOpenedEvent
+
+from project_assistant.services import (EDITOR_IGNORES, Debouncer, RestartOnChangeHandler, WatchFilter,
+                                        load_watch_settings)
+
+
+def test_watch_filter_matches_gitignore_style(tmp_path):
+    watch = WatchFilter(tmp_path, EDITOR_IGNORES + ["node_modules/", "*.log", "build/out", "/dist/"])
+    assert not watch.ignored(str(tmp_path / "src" / "app.py"))
+    assert watch.ignored(str(tmp_path / "src" / ".app.py.swp"))
+    assert watch.ignored(str(tmp_path / "node_modules" / "x" / "index.js"))
+    assert watch.ignored(str(tmp_path / "logs" / "today.log"))
+    assert watch.ignored(str(tmp_path / "build" / "out" / "bundle.js"))
+    assert not watch.ignored(str(tmp_path / "src" / "build" / "out"))
+    assert watch.ignored(str(tmp_path / "dist" / "main.js"))
+    # A file named like an ignored directory is still watched
+    assert not watch.ignored(str(tmp_path / "node_modules"))
+    assert watch.ignored(str(tmp_path.parent / "elsewhere.py"))
+
+
+def test_watch_settings_read_gitignore(tmp_path):
+    (tmp_path / ".gitignore").write_text("# generated\ncoverage/\n!keep.log\n")
+    patterns, window = load_watch_settings(tmp_path)
+    assert "coverage/" in patterns and "!keep.log" not in patterns and "# generated" not in patterns
+    assert window > 0
+
+
+def test_handler_skips_ignored_paths_and_non_change_events(tmp_path):
+    calls = []
+    handler = RestartOnChangeHandler(lambda: calls.append(1), WatchFilter(tmp_path, ["*.tmp"]))
+    handler.on_any_event(FileModifiedEvent(str(tmp_path / "a.tmp")))
+    handler.on_any_event(FileOpenedEvent(str(tmp_path / "a.py")))
+    assert calls == []
+    # An editor's atomic save renames a temp file onto the real one
+    handler.on_any_event(FileMovedEvent(str(tmp_path / "a.tmp"), str(tmp_path / "a.py")))
+    assert calls == [1]
+
+
+def test_debouncer_collapses_a_burst_into_one_call():
+    fired = []
+    done = threading.Event()
+
+    def callback(first):
+        fired.append(first)
+        done.set()
+
+    debouncer = Debouncer(callback, window=0.05)
+    try:
+        start = time.monotonic()
+        for _ in range(10):
+            debouncer.trigger()
+            time.sleep(0.005)
+        assert done.wait(2)
+        time.sleep(0.1)
+        assert len(fired) == 1 and start <= fired[0] < start + 0.05
+        done.clear()
+        debouncer.trigger()
+        assert done.wait(2) and len(fired) == 2
+    finally:
+        debouncer.stop()